@@ -0,0 +1,163 @@
+"""Shared helpers for the benchmark scripts (stdlib only)."""
+
+import contextlib
+import importlib.util
+import io
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load_module(rev=None):
+    """Import nvidia_check.py from the working tree, or from git revision rev."""
+    path = os.path.join(REPO, 'nvidia_check.py')
+    if rev:
+        source = subprocess.run(['git', '-C', REPO, 'show', f"{rev}:nvidia_check.py"],
+                                check=True, capture_output=True).stdout
+        path = os.path.join(tempfile.mkdtemp(prefix='nvidia-check-'), 'nvidia_check.py')
+        with open(path, 'wb') as f:
+            f.write(source)
+    spec = importlib.util.spec_from_file_location('nvidia_check_bench', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+FAKE_NVIDIA_SMI = r'''#!{python}
+import os, sys, time
+if os.environ.get('FAKE_NVIDIA_SMI_LOG'):
+    with open(os.environ['FAKE_NVIDIA_SMI_LOG'], 'a') as log:
+        log.write(' '.join(sys.argv[1:]) + '\n')
+time.sleep(float(os.environ.get('FAKE_NVIDIA_SMI_COST', '0')))
+values = {{
+    'index': '{{index}}', 'uuid': 'GPU-fake-{{index}}', 'pci.bus_id': '00000000:0{{index}}:00.0',
+    'driver_version': '{version}', 'cuda_version': '12.4', 'name': 'NVIDIA A100-SXM4-80GB',
+    'memory.total': '81920 MiB', 'memory.used': '1 MiB', 'memory.free': '81919 MiB',
+}}
+query = [a.split('=', 1)[1] for a in sys.argv[1:] if a.startswith('--query-gpu=')]
+if not query:
+    print('NVIDIA-SMI version  : {version}')
+    sys.exit(0)
+for index in range(2):
+    print(', '.join(values[f].format(index=index) for f in query[0].split(',')))
+'''
+
+
+def fake_nvidia_smi(bindir: str, version: str, cost: float = 0.0, log: str = None) -> None:
+    """
+    Put a fake nvidia-smi reporting two GPUs with driver version first on
+    PATH. Each call takes cost seconds, like a driver initialization, and
+    appends its arguments to log if given.
+    """
+    os.makedirs(bindir, exist_ok=True)
+    path = os.path.join(bindir, 'nvidia-smi')
+    with open(path, 'w') as f:
+        f.write(FAKE_NVIDIA_SMI.format(python=sys.executable, version=version))
+    os.chmod(path, 0o755)
+    os.environ['PATH'] = bindir + os.pathsep + os.environ.get('PATH', '')
+    os.environ['FAKE_NVIDIA_SMI_COST'] = str(cost)
+    if log:
+        os.environ['FAKE_NVIDIA_SMI_LOG'] = log
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """Files under directory, with single byte ranges, an answer delay and a per-connection rate limit."""
+    
+    protocol_version = 'HTTP/1.1'
+    directory = '.'
+    delay = 0.0
+    rate = None  # bytes per second per connection, or None for unlimited
+    
+    def log_message(self, format, *args):
+        pass
+    
+    def do_HEAD(self):
+        self._answer(send_body=False)
+    
+    def do_GET(self):
+        self._answer(send_body=True)
+    
+    def _answer(self, send_body: bool):
+        time.sleep(self.delay)
+        path = os.path.join(self.directory, self.path.split('?', 1)[0].lstrip('/'))
+        if not os.path.isfile(path):
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        
+        size = os.path.getsize(path)
+        start, end = 0, size - 1
+        match = re.fullmatch(r'bytes=(\d+)-(\d*)', self.headers.get('Range', ''))
+        if match:
+            start = int(match.group(1))
+            end = min(int(match.group(2)), end) if match.group(2) else end
+            self.send_response(206)
+            self.send_header('Content-Range', f"bytes {start}-{end}/{size}")
+        else:
+            self.send_response(200)
+        self.send_header('Accept-Ranges', 'bytes')
+        self.send_header('Content-Length', str(end - start + 1))
+        self.end_headers()
+        if not send_body:
+            return
+        
+        block = 64 * 1024
+        started = time.monotonic()
+        sent = 0
+        with open(path, 'rb') as f:
+            f.seek(start)
+            while sent < end - start + 1:
+                data = f.read(min(block, end - start + 1 - sent))
+                self.wfile.write(data)
+                sent += len(data)
+                if self.rate:
+                    # Sleep until this connection is back under its rate
+                    ahead = sent / self.rate - (time.monotonic() - started)
+                    if ahead > 0:
+                        time.sleep(ahead)
+
+
+@contextlib.contextmanager
+def serve_directory(directory: str, delay: float = 0.0, rate: Optional[float] = None):
+    """
+    Serve directory over HTTP on 127.0.0.1, answering after delay seconds
+    and sending each connection at most rate bytes per second; yields the
+    base URL.
+    """
+    handler = type('Handler', (_Handler,), {'directory': directory, 'delay': delay, 'rate': rate})
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    # Never send benchmark traffic through a configured proxy
+    for name in ('NO_PROXY', 'no_proxy'):
+        os.environ[name] = '127.0.0.1'
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def write_latest(site: str, version: str, arch: str = 'x86_64') -> None:
+    """Write a mirror's Linux-<arch>/latest.txt naming version."""
+    directory = os.path.join(site, f"Linux-{arch}")
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, 'latest.txt'), 'w') as f:
+        f.write(f"{version} {version}/NVIDIA-Linux-{arch}-{version}.run\n")
+
+
+@contextlib.contextmanager
+def quiet():
+    """Swallow the checker's progress output."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
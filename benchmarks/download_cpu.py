@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+CPU seconds per GB spent in the download loop.
+
+A --size MiB file is served by python -m http.server in a separate
+process, so only the client's CPU time (time.process_time) is counted.
+The "before" row is download_driver from --rev (by default the original
+8 KiB read()-and-print loop); the "after" row is fetch_driver from the
+working tree, which reads into one buffer with readinto and hashes the
+data as it streams. SHA-256 of the same bytes in memory is shown for
+reference, since the old loop did not hash at all.
+
+    python3 benchmarks/download_cpu.py --size 1024
+"""
+
+import argparse
+import contextlib
+import hashlib
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+from common import load_module, quiet
+
+GB = 1024 ** 3
+
+
+@contextlib.contextmanager
+def http_server_process(directory: str):
+    """Serve directory from a separate python -m http.server process; yields the base URL."""
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        port = s.getsockname()[1]
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'http.server', '--bind', '127.0.0.1', '--directory', directory, str(port)],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    for name in ('NO_PROXY', 'no_proxy'):
+        os.environ[name] = '127.0.0.1'
+    url = f"http://127.0.0.1:{port}"
+    try:
+        for _ in range(100):
+            try:
+                urllib.request.urlopen(url, timeout=1).close()
+                break
+            except OSError:
+                time.sleep(0.05)
+        yield url
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def cpu_per_gb(function, size: int) -> float:
+    started = time.process_time()
+    with quiet():
+        function()
+    return (time.process_time() - started) * GB / size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--size', type=int, default=512, help='MiB to download (default: %(default)s)')
+    parser.add_argument('--rev', default='10db190',
+                        help='git revision for the "before" row (default: %(default)s, the original loop)')
+    args = parser.parse_args()
+    size = args.size * 1024 * 1024
+    
+    workdir = tempfile.mkdtemp(prefix='download-cpu-')
+    site = os.path.join(workdir, 'site')
+    os.makedirs(site)
+    with open(os.path.join(site, 'driver.run'), 'wb') as f:
+        f.truncate(size)
+    
+    before_module, after_module = load_module(args.rev), load_module()
+    with http_server_process(site) as base:
+        url = f"{base}/driver.run"
+        before = cpu_per_gb(lambda: before_module.NvidiaDriverCheck().download_driver(
+            url, os.path.join(workdir, 'before.run')), size)
+        os.remove(os.path.join(workdir, 'before.run'))
+        
+        checker = after_module.NvidiaDriverCheck(cache_dir=os.path.join(workdir, 'cache'))
+        after = cpu_per_gb(lambda: checker.fetch_driver(url, os.path.join(workdir, 'after.run')), size)
+        os.remove(os.path.join(workdir, 'after.run'))
+    
+    data = bytes(8 * 1024 * 1024)
+    digest = hashlib.sha256()
+    started = time.process_time()
+    for _ in range(size // len(data)):
+        digest.update(data)
+    hashing = (time.process_time() - started) * GB / size
+    
+    print(f"downloaded {args.size} MiB; CPU seconds per GB:")
+    for label, seconds in ((f"before ({args.rev})", before), ('after (working tree)', after),
+                           ('SHA-256 alone', hashing)):
+        print(f"  {label:<22} {seconds:.2f}")
+
+
+if __name__ == '__main__':
+    main()
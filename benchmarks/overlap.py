@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Show that run_check overlaps local probing with the latest-version lookup.
+
+The fake nvidia-smi takes --probe seconds and the local mirror answers
+latest.txt after --network seconds. Each phase is timed on its own with a
+fresh checker, then run_check end to end: overlapped, its wall time is
+close to max(probe, network) rather than the sum.
+
+    python3 benchmarks/overlap.py --probe 0.5 --network 1.0
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from common import fake_nvidia_smi, load_module, quiet, serve_directory, write_latest
+
+VERSION = '550.54.14'
+
+
+def timed(function) -> float:
+    started = time.monotonic()
+    with quiet():
+        function()
+    return time.monotonic() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--probe', type=float, default=0.5,
+                        help='seconds the fake nvidia-smi takes (default: %(default)s)')
+    parser.add_argument('--network', type=float, default=1.0,
+                        help='seconds the mirror takes to answer (default: %(default)s)')
+    args = parser.parse_args()
+    
+    workdir = tempfile.mkdtemp(prefix='overlap-')
+    fake_nvidia_smi(os.path.join(workdir, 'bin'), VERSION, args.probe)
+    site = os.path.join(workdir, 'site')
+    write_latest(site, VERSION)
+    root = os.path.join(workdir, 'root')
+    os.makedirs(root)
+    module = load_module()
+    
+    with serve_directory(site, delay=args.network) as mirror:
+        def checker():
+            # A fresh cache each time, so no phase is answered from disk
+            return module.NvidiaDriverCheck(
+                backend='nvidia-smi', root=root, mirrors=[mirror], arch='x86_64',
+                cache_dir=tempfile.mkdtemp(dir=workdir),
+            )
+        
+        probe = timed(lambda: checker().check_status(fetch_latest=False))
+        network = timed(lambda: checker().get_latest_driver_version())
+        together = timed(lambda: checker().run_check())
+    
+    print(f"probe alone:     {probe:.2f}s")
+    print(f"lookup alone:    {network:.2f}s")
+    print(f"sequential sum:  {probe + network:.2f}s")
+    print(f"run_check:       {together:.2f}s (max of the two: {max(probe, network):.2f}s)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Time segmented downloads against a server that throttles each connection.
+
+Mirrors and CDNs often cap the rate of a single connection well below the
+link speed; segmented downloads open one connection per segment. The local
+server here sends each connection at most --rate MiB/s, and the same
+--size MiB file is fetched with each --segments count in turn.
+
+    python3 benchmarks/segments.py --size 64 --rate 8 --segments 1,2,4,8
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from common import load_module, quiet, serve_directory
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--size', type=int, default=64, help='MiB to download (default: %(default)s)')
+    parser.add_argument('--rate', type=float, default=8.0,
+                        help='MiB/s the server sends per connection (default: %(default)s)')
+    parser.add_argument('--segments', default='1,2,4,8',
+                        help='comma-separated segment counts to time (default: %(default)s)')
+    args = parser.parse_args()
+    size = args.size * 1024 * 1024
+    
+    workdir = tempfile.mkdtemp(prefix='segments-')
+    site = os.path.join(workdir, 'site')
+    os.makedirs(site)
+    with open(os.path.join(site, 'driver.run'), 'wb') as f:
+        f.write(os.urandom(size))
+    module = load_module()
+    
+    print(f"{args.size} MiB at {args.rate:g} MiB/s per connection:")
+    baseline = None
+    with serve_directory(site, rate=args.rate * 1024 * 1024) as base:
+        for segments in (int(n) for n in args.segments.split(',')):
+            checker = module.NvidiaDriverCheck(cache_dir=tempfile.mkdtemp(dir=workdir))
+            dest = os.path.join(workdir, f"driver-{segments}.run")
+            started = time.monotonic()
+            with quiet():
+                sha256 = checker.fetch_driver(f"{base}/driver.run", dest, retries=0, segments=segments)
+            elapsed = time.monotonic() - started
+            if sha256 is None:
+                print(f"  --segments {segments}: download failed")
+                continue
+            os.remove(dest)
+            baseline = baseline or elapsed
+            print(f"  --segments {segments:<3} {elapsed:6.2f}s  {args.size / elapsed:7.1f} MiB/s"
+                  f"  x{baseline / elapsed:.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Count the nvidia-smi processes one run_check spawns.
+
+A fake nvidia-smi on PATH logs every invocation and sleeps --spawn-cost
+seconds to stand in for driver initialization; a local HTTP server answers
+the latest-version lookup with the installed version, so the run ends at
+"up to date" without prompting. Pass --rev to measure another revision of
+nvidia_check.py instead (e.g. --rev 10db190 for the per-field queries).
+
+    python3 benchmarks/spawn_count.py
+    python3 benchmarks/spawn_count.py --rev 10db190
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from common import fake_nvidia_smi, load_module, quiet, serve_directory, write_latest
+
+VERSION = '550.54.14'
+
+def make_checker(module, workdir, mirror, backend):
+    """A checker pointed at the local mirror, whichever revision it is."""
+    cls = module.NvidiaDriverCheck
+    if hasattr(cls, 'NVIDIA_LINUX_LATEST_URL'):
+        checker = cls()
+        checker.NVIDIA_LINUX_LATEST_URL = f"{mirror}/Linux-x86_64/latest.txt"
+        return checker
+    # An empty root: no procfs answer and an unknown PCI bus, so nvidia-smi
+    # does the probing and the update check still runs
+    root = os.path.join(workdir, 'root')
+    os.makedirs(root, exist_ok=True)
+    return cls(backend=backend, root=root, mirrors=[mirror], arch='x86_64',
+               cache_dir=os.path.join(workdir, 'cache'))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rev', help='git revision of nvidia_check.py to measure')
+    parser.add_argument('--spawn-cost', type=float, default=0.1,
+                        help='seconds each fake nvidia-smi takes (default: %(default)s)')
+    parser.add_argument('--backend', default='nvidia-smi',
+                        help='probe backend for revisions that have them (default: %(default)s)')
+    args = parser.parse_args()
+    
+    workdir = tempfile.mkdtemp(prefix='spawn-count-')
+    log = os.path.join(workdir, 'nvidia-smi.log')
+    fake_nvidia_smi(os.path.join(workdir, 'bin'), VERSION, args.spawn_cost, log)
+    site = os.path.join(workdir, 'site')
+    write_latest(site, VERSION)
+    
+    with serve_directory(site) as mirror:
+        checker = make_checker(load_module(args.rev), workdir, mirror, args.backend)
+        started = time.monotonic()
+        with quiet():
+            exit_code = checker.run_check()
+        elapsed = time.monotonic() - started
+    
+    with open(log) as f:
+        calls = f.read().splitlines()
+    print(f"revision:    {args.rev or 'working tree'}")
+    print(f"exit code:   {exit_code}")
+    print(f"spawns:      {len(calls)}")
+    for call in calls:
+        print(f"  nvidia-smi {call}")
+    print(f"wall time:   {elapsed:.2f}s at {args.spawn_cost:g}s per spawn")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Time 100k driver version comparisons, and sorting/max over 100k versions.
+
+The versions are drawn from a fixed pool of catalog-like strings, so they
+repeat the way they do in catalogs and fleet reports. "before" is
+compare_versions from --rev (by default the original re.findall path) and
+a sort keyed on the same regex; "after" is the working tree's
+compare_versions, sort_versions and max_version over DriverVersion.
+
+    python3 benchmarks/version_compare.py --count 100000
+"""
+
+import argparse
+import random
+import re
+import tempfile
+import time
+
+from common import load_module
+
+
+def regex_key(version: str):
+    """The original parse: every run of digits, re-found on each call."""
+    return tuple(map(int, re.findall(r'\d+', version)))
+
+
+def timed(function) -> float:
+    started = time.perf_counter()
+    function()
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--count', type=int, default=100000, help='comparisons and list size (default: %(default)s)')
+    parser.add_argument('--rev', default='10db190',
+                        help='git revision for the "before" compare_versions (default: %(default)s)')
+    args = parser.parse_args()
+    
+    rng = random.Random(20)
+    pool = sorted({f"{rng.randint(390, 580)}.{rng.randint(0, 150)}"
+                   + (f".{rng.randint(1, 20):02d}" if rng.random() < 0.7 else '')
+                   for _ in range(300)})
+    pairs = [(rng.choice(pool), rng.choice(pool)) for _ in range(args.count)]
+    versions = [rng.choice(pool) for _ in range(args.count)]
+    
+    before_module, after_module = load_module(args.rev), load_module()
+    before_check = before_module.NvidiaDriverCheck()
+    after_check = after_module.NvidiaDriverCheck(cache_dir=tempfile.mkdtemp(prefix='version-compare-'))
+    
+    rows = [
+        ('compare_versions',
+         timed(lambda: [before_check.compare_versions(a, b) for a, b in pairs]),
+         timed(lambda: [after_check.compare_versions(a, b) for a, b in pairs])),
+        ('sort + max',
+         timed(lambda: (sorted(versions, key=regex_key), max(versions, key=regex_key))),
+         timed(lambda: (after_module.sort_versions(versions), after_module.max_version(versions)))),
+    ]
+    
+    print(f"{args.count} versions from a pool of {len(pool)}; seconds:")
+    print(f"  {'':<18} {'before':>8} {'after':>8}")
+    for label, before, after in rows:
+        print(f"  {label:<18} {before:>8.3f} {after:>8.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -4,194 +4,2399 @@ NVIDIA Driver Check Tool
 A utility to check NVIDIA driver installation and version information.
 """
 
+import asyncio
+import bisect
+import contextlib
+import copy
+import ctypes
+import fcntl
+import functools
+import hashlib
+import json
+import operator
+import platform
+import ssl
 import subprocess
 import sys
 import re
 import os
+import random
+import shlex
+import shutil
 import stat
 import tempfile
-from typing import Optional, Dict
-from urllib.request import urlopen, Request
-from urllib.error import URLError
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Iterable, Optional, Dict, List, NamedTuple, Tuple
+from urllib.parse import urljoin, urlsplit
+from urllib.request import getproxies, proxy_bypass, urlopen, url2pathname, Request
+from urllib.error import HTTPError, URLError
+
+
+class GpuRecord(NamedTuple):
+    """One installed GPU, as reported by a single probe."""
+    index: int
+    uuid: str
+    pci_bus_id: str
+    name: str
+    memory_total: Optional[str] = None
+    memory_used: Optional[str] = None
+    memory_free: Optional[str] = None
+
+
+class GpuSnapshot(NamedTuple):
+    """Driver-wide facts plus one GpuRecord per GPU, captured in one probe."""
+    driver_version: Optional[str]
+    cuda_version: Optional[str]
+    gpus: Tuple[GpuRecord, ...]
+
+
+class HttpResponse(NamedTuple):
+    """Status, lower-cased headers and body of one HTTP exchange."""
+    status: int
+    reason: str
+    headers: Dict[str, str]
+    body: bytes
+
+
+async def _read_http_body(reader: asyncio.StreamReader, headers: Dict[str, str]) -> bytes:
+    if headers.get('transfer-encoding', '').lower() == 'chunked':
+        chunks = []
+        while True:
+            size_line = await reader.readline()
+            size = int(size_line.split(b';', 1)[0].strip() or b'0', 16)
+            if size == 0:
+                # Skip trailers up to the terminating blank line
+                while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                    pass
+                return b''.join(chunks)
+            chunks.append(await reader.readexactly(size))
+            await reader.readline()
+    if 'content-length' in headers:
+        return await reader.readexactly(int(headers['content-length']))
+    return await reader.read()
+
+
+def _settle(future: asyncio.Future, result, error: Optional[BaseException]) -> None:
+    if future.done():
+        return
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(result)
+
+
+async def run_in_daemon_thread(function, *args):
+    """
+    await function(*args), run on a fresh daemon thread. Unlike
+    run_in_executor, nothing waits for the thread when the event loop
+    shuts down: if the awaiting task is cancelled (the deadline), a
+    call stuck in the kernel or a C library is abandoned, not joined.
+    """
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+    
+    def target():
+        result, error = None, None
+        try:
+            result = function(*args)
+        except BaseException as e:
+            error = e
+        try:
+            loop.call_soon_threadsafe(_settle, future, result, error)
+        except RuntimeError:
+            pass  # The loop is gone: nobody is waiting any more
+    
+    threading.Thread(target=target, name=f"blocking-{getattr(function, '__name__', 'call')}",
+                     daemon=True).start()
+    return await future
+
+
+def _uses_proxy(url: str) -> bool:
+    """Whether urllib would send a request for url through a proxy (http_proxy, https_proxy, no_proxy)."""
+    parts = urlsplit(url)
+    return parts.scheme in getproxies() and not proxy_bypass(parts.hostname or '')
+
+
+def _urllib_request(url: str, method: str, headers: Optional[Dict[str, str]]) -> HttpResponse:
+    """
+    async_http_request through a proxy, via urllib (which also tunnels
+    https with CONNECT), like the installer downloads. Blocking: run it
+    with run_in_daemon_thread.
+    """
+    try:
+        with urlopen(Request(url, headers=headers or {}, method=method), timeout=30) as response:
+            return HttpResponse(
+                response.status, response.reason,
+                {name.lower(): value for name, value in response.headers.items()},
+                response.read(),
+            )
+    except HTTPError as e:
+        return HttpResponse(
+            e.code, e.reason,
+            {name.lower(): value for name, value in (e.headers or {}).items()},
+            e.read() or b'',
+        )
+
+
+async def async_http_request(url: str, method: str = 'GET',
+                             headers: Optional[Dict[str, str]] = None,
+                             max_redirects: int = 5) -> HttpResponse:
+    """
+    Minimal stdlib-only HTTP/1.1 client on asyncio streams, for the small
+    metadata requests the check makes. Follows redirects; never raises
+    for HTTP error statuses (callers inspect HttpResponse.status).
+    Requests that the environment routes through a proxy go through
+    urllib on a daemon thread instead. Bound the whole call with
+    asyncio.wait_for.
+    """
+    for _ in range(max_redirects + 1):
+        parts = urlsplit(url)
+        if parts.scheme not in ('http', 'https'):
+            raise URLError(f"unsupported URL scheme: {parts.scheme!r}")
+        if _uses_proxy(url):
+            return await run_in_daemon_thread(_urllib_request, url, method, headers)
+        
+        https = parts.scheme == 'https'
+        port = parts.port or (443 if https else 80)
+        reader, writer = await asyncio.open_connection(
+            parts.hostname, port, ssl=ssl.create_default_context() if https else None
+        )
+        try:
+            path = parts.path or '/'
+            if parts.query:
+                path += '?' + parts.query
+            request_headers = {
+                'Host': parts.netloc.rpartition('@')[2],
+                'Connection': 'close',
+                'Accept-Encoding': 'identity',
+            }
+            request_headers.update(headers or {})
+            lines = [f"{method} {path} HTTP/1.1"]
+            lines += [f"{name}: {value}" for name, value in request_headers.items()]
+            writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1'))
+            await writer.drain()
+            
+            status_line = (await reader.readline()).decode('latin-1').rstrip('\r\n')
+            status_parts = status_line.split(' ', 2)
+            if len(status_parts) < 2 or not status_parts[1].isdigit():
+                raise URLError(f"malformed HTTP status line: {status_line!r}")
+            status = int(status_parts[1])
+            reason = status_parts[2] if len(status_parts) > 2 else ''
+            
+            response_headers = {}
+            while True:
+                line = (await reader.readline()).decode('latin-1')
+                if line in ('\r\n', '\n', ''):
+                    break
+                name, _, value = line.partition(':')
+                response_headers[name.strip().lower()] = value.strip()
+            
+            if method == 'HEAD' or status in (204, 304) or 100 <= status < 200:
+                body = b''
+            else:
+                body = await _read_http_body(reader, response_headers)
+        finally:
+            writer.close()
+        
+        if status in (301, 302, 303, 307, 308) and 'location' in response_headers:
+            url = urljoin(url, response_headers['location'])
+            continue
+        return HttpResponse(status, reason, response_headers, body)
+    
+    raise URLError(f"too many redirects fetching {url}")
+
+
+def default_cache_dir() -> str:
+    """Per-user cache directory, following the XDG base directory spec."""
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'nvidia-driver-check')
+
+
+# platform.machine() spellings of the architectures NVIDIA publishes
+# Linux drivers for, mapped to NVIDIA's names (Linux-<arch>/ on its server)
+ARCHITECTURES = {
+    'x86_64': 'x86_64',
+    'amd64': 'x86_64',
+    'aarch64': 'aarch64',
+    'arm64': 'aarch64',
+}
+
+
+def detect_arch(machine: Optional[str] = None) -> str:
+    """NVIDIA's name for machine (default: this host's). Raises ValueError if unsupported."""
+    machine = machine or platform.machine()
+    arch = ARCHITECTURES.get(machine.lower())
+    if arch is None:
+        supported = ', '.join(sorted(set(ARCHITECTURES.values())))
+        raise ValueError(f"unsupported architecture {machine!r} (NVIDIA Linux drivers exist for {supported})")
+    return arch
+
+
+def _parse_content_range(value: str) -> Tuple[Optional[int], Optional[int], Optional[int]]:
+    """Parse 'bytes START-END/TOTAL' (or 'bytes */TOTAL') into integers."""
+    match = re.match(r'\s*bytes\s+(?:(\d+)-(\d+)|\*)/(\d+|\*)', value)
+    if not match:
+        return None, None, None
+    start, end, total = match.groups()
+    return (
+        int(start) if start is not None else None,
+        int(end) if end is not None else None,
+        int(total) if total and total != '*' else None,
+    )
+
+
+# A driver version: dot-separated decimal components, e.g. "550.54.14"
+VERSION_PATTERN = re.compile(r'\d+(?:\.\d+)*')
+
+
+class InvalidVersionError(ValueError):
+    """A string that is not a dot-separated numeric driver version."""
+
+
+@functools.total_ordering
+class DriverVersion:
+    """
+    A driver version ordered numerically, component by component
+    ("550.100" > "550.54.14"). str() gives back the original text, so
+    zero-padded components such as "580.105.08" round-trip. Prefer
+    parse_version, which memoizes instances.
+    """
+    
+    __slots__ = ('text', 'key')
+    
+    def __init__(self, text: str):
+        if not isinstance(text, str) or not VERSION_PATTERN.fullmatch(text.strip()):
+            raise InvalidVersionError(f"invalid driver version: {text!r}")
+        self.text = text.strip()
+        self.key = tuple(int(part) for part in self.text.split('.'))
+    
+    @property
+    def major(self) -> int:
+        return self.key[0]
+    
+    def __eq__(self, other):
+        if not isinstance(other, DriverVersion):
+            return NotImplemented
+        return self.key == other.key
+    
+    def __lt__(self, other):
+        if not isinstance(other, DriverVersion):
+            return NotImplemented
+        return self.key < other.key
+    
+    def __hash__(self):
+        return hash(self.key)
+    
+    def __str__(self):
+        return self.text
+    
+    def __repr__(self):
+        return f"DriverVersion({self.text!r})"
+
+
+@functools.lru_cache(maxsize=8192)
+def _parse_version(text: str) -> DriverVersion:
+    return DriverVersion(text)
+
+
+def parse_version(text: str) -> DriverVersion:
+    """DriverVersion for text, memoized: catalogs and fleet reports repeat versions a lot."""
+    if not isinstance(text, str):
+        # Checked here: an unhashable argument would fail in the cache with TypeError
+        raise InvalidVersionError(f"invalid driver version: {text!r}")
+    return _parse_version(text)
+
+
+def version_key(version: str) -> Tuple[int, ...]:
+    """Numeric sort key for a driver version ("550.54.14" -> (550, 54, 14)). Raises InvalidVersionError."""
+    return parse_version(version).key
+
+
+def sort_versions(versions: Iterable[str]) -> List[str]:
+    """Version strings sorted oldest first. Raises InvalidVersionError on the first bad one."""
+    return sorted(versions, key=version_key)
+
+
+def max_version(versions: Iterable[str]) -> Optional[str]:
+    """Newest of the version strings, or None if there are none."""
+    return max(versions, key=version_key, default=None)
+
+
+class DownloadBuffer:
+    """
+    One preallocated buffer that response bodies are read into with
+    readinto, so the download loop allocates nothing per chunk. The read
+    size starts small and doubles while reads fill quickly (fast link),
+    halving again when a single read takes too long (slow link).
+    """
+    
+    MIN_CHUNK_SIZE = 64 * 1024
+    MAX_CHUNK_SIZE = 4 * 1024 * 1024
+    # Aim for reads that take about this long (seconds)
+    TARGET_READ_TIME = 0.05
+    
+    def __init__(self):
+        self._view = memoryview(bytearray(self.MAX_CHUNK_SIZE))
+        self.chunk_size = self.MIN_CHUNK_SIZE
+    
+    def read_from(self, response, limit: Optional[int] = None) -> memoryview:
+        """Read up to one chunk (and at most limit bytes); empty at EOF."""
+        size = self.chunk_size if limit is None else min(self.chunk_size, limit)
+        started = time.perf_counter()
+        count = response.readinto(self._view[:size])
+        elapsed = time.perf_counter() - started
+        
+        if count == size and elapsed < self.TARGET_READ_TIME / 2:
+            self.chunk_size = min(self.chunk_size * 2, self.MAX_CHUNK_SIZE)
+        elif elapsed > self.TARGET_READ_TIME * 2:
+            self.chunk_size = max(self.chunk_size // 2, self.MIN_CHUNK_SIZE)
+        return self._view[:count]
+
+
+class ProgressReporter:
+    """
+    Render download progress (percent, rate, ETA) from a background thread
+    at most max_updates times per second. The download loops only add to
+    their own slot in counters; nothing is formatted or printed per chunk.
+    Live updates are switched off when stdout is not a terminal (cron,
+    journald), leaving just the summary line at the end.
+    """
+    
+    def __init__(self, total: Optional[int], initial: int = 0, slots: int = 1,
+                 max_updates: float = 4.0, enabled: Optional[bool] = None):
+        self.total = total
+        self.initial = initial
+        self.counters = [0] * slots
+        self.interval = 1.0 / max_updates
+        self.enabled = sys.stdout.isatty() if enabled is None else enabled
+        self._stop = threading.Event()
+        self._thread = None
+        self._started = 0.0
+        self._rate = 0.0
+    
+    @property
+    def done(self) -> int:
+        return self.initial + sum(self.counters)
+    
+    @staticmethod
+    def _format_duration(seconds: float) -> str:
+        minutes, seconds = divmod(int(seconds), 60)
+        hours, minutes = divmod(minutes, 60)
+        if hours:
+            return f"{hours}:{minutes:02d}:{seconds:02d}"
+        return f"{minutes}:{seconds:02d}"
+    
+    def _render(self) -> str:
+        done = self.done
+        line = f"\rProgress: {done / (1024*1024):.1f} MB"
+        if self.total:
+            line = f"\rProgress: {(done / self.total) * 100:.1f}%  {done / (1024*1024):.1f}/{self.total / (1024*1024):.1f} MB"
+        line += f"  {self._rate / (1024*1024):.1f} MB/s"
+        if self.total and self._rate > 0:
+            line += f"  ETA {self._format_duration((self.total - done) / self._rate)}"
+        return line + '   '
+    
+    def _run(self) -> None:
+        last_done, last_time = self.done, time.monotonic()
+        while not self._stop.wait(self.interval):
+            now, done = time.monotonic(), self.done
+            rate = (done - last_done) / max(now - last_time, 1e-6)
+            # Smooth the rate so the ETA doesn't jump around
+            self._rate = rate if not self._rate else 0.7 * self._rate + 0.3 * rate
+            last_done, last_time = done, now
+            print(self._render(), end='', flush=True)
+    
+    def __enter__(self) -> 'ProgressReporter':
+        self._started = time.monotonic()
+        if self.enabled:
+            self._thread = threading.Thread(target=self._run, name='download-progress', daemon=True)
+            self._thread.start()
+        return self
+    
+    def __exit__(self, *exc_info) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            print()  # New line after progress
+        elapsed = max(time.monotonic() - self._started, 1e-6)
+        received = sum(self.counters)
+        print(f"Received {received / (1024*1024):.1f} MB in {elapsed:.1f}s "
+              f"({received / (1024*1024) / elapsed:.1f} MB/s)")
+
+
+class StreamingDigest:
+    """
+    SHA-256 of a file that is written front to back, possibly over several
+    resumed attempts. Data is hashed as it streams past, so verifying a
+    download costs no extra read of the file.
+    """
+    
+    def __init__(self):
+        self.reset()
+    
+    def reset(self) -> None:
+        self._hash = hashlib.sha256()
+        self.length = 0
+    
+    def update(self, data) -> None:
+        self._hash.update(data)
+        self.length += len(data)
+    
+    def catch_up(self, path: str, offset: int) -> None:
+        """
+        Make the digest cover exactly the first offset bytes of path. Only
+        reads the file when resuming a .part left by an earlier run.
+        """
+        if self.length == offset:
+            return
+        self.reset()
+        if not offset:
+            return
+        buffer = memoryview(bytearray(1024 * 1024))
+        with open(path, 'rb') as f:
+            while self.length < offset:
+                count = f.readinto(buffer[:min(len(buffer), offset - self.length)])
+                if not count:
+                    raise OSError(f"{path} is shorter than {offset} bytes")
+                self.update(buffer[:count])
+    
+    def hexdigest(self) -> str:
+        return self._hash.hexdigest()
+
+
+def copy_file(source: str, dest: str, link: bool = True) -> bool:
+    """
+    Copy source to dest without pulling the data through Python: a hard
+    link when both are on one filesystem (and link is true), otherwise
+    copy_file_range (an in-kernel copy, or a reflink where the filesystem
+    supports it) with sendfile as the fallback. Returns True if a hard
+    link was made.
+    """
+    if link:
+        try:
+            os.link(source, dest)
+            return True
+        except OSError:
+            pass
+    
+    with open(source, 'rb') as src, open(dest, 'wb') as dst:
+        remaining = os.fstat(src.fileno()).st_size
+        copy_range = getattr(os, 'copy_file_range', None)  # Python 3.8+
+        while remaining:
+            if copy_range:
+                try:
+                    count = copy_range(src.fileno(), dst.fileno(), remaining)
+                except OSError:
+                    # Older kernels refuse some cross-filesystem copies;
+                    # sendfile continues from the same file positions
+                    copy_range = None
+                    continue
+            else:
+                count = os.sendfile(dst.fileno(), src.fileno(), None, remaining)
+            if not count:
+                raise OSError(f"{source} shrank while being copied")
+            remaining -= count
+    return False
+
+
+def write_file_atomic(path: str, data: bytes) -> None:
+    """Replace path with data so readers never see a partial file."""
+    directory = os.path.dirname(path)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+@contextlib.contextmanager
+def file_lock(path: str, waiting_message: Optional[str] = None):
+    """
+    Hold an exclusive fcntl.flock on path for the duration of the block,
+    waiting for other processes that hold it. The kernel drops the lock if
+    its holder dies, so a crashed run can never wedge the next one.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'a') as f:
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            if waiting_message:
+                print(waiting_message)
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+@contextlib.asynccontextmanager
+async def async_file_lock(path: str, poll_interval: float = 0.05):
+    """file_lock for coroutines: polls instead of blocking the event loop."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'a') as f:
+        while True:
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                break
+            except BlockingIOError:
+                await asyncio.sleep(poll_interval)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+class CachedResponse(NamedTuple):
+    """A cached metadata body plus the validators needed to revalidate it."""
+    body: bytes
+    etag: Optional[str]
+    last_modified: Optional[str]
+    fetched_at: float
+
+
+class MetadataCache:
+    """
+    Small on-disk cache for metadata files such as latest.txt, one JSON
+    file per URL. Writes are atomic so concurrent runs never see a torn
+    entry; a cache that cannot be written is silently skipped.
+    """
+    
+    def __init__(self, directory: str):
+        self.directory = directory
+    
+    def _path(self, url: str, suffix: str = '.json') -> str:
+        key = hashlib.sha256(url.encode('utf-8')).hexdigest()[:32]
+        return os.path.join(self.directory, key + suffix)
+    
+    def lock_path(self, url: str) -> str:
+        """Lock file serializing refreshes of url across processes."""
+        return self._path(url, '.lock')
+    
+    def get(self, url: str) -> Optional[CachedResponse]:
+        try:
+            with open(self._path(url), encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('url') != url:
+                return None
+            return CachedResponse(
+                body=data['body'].encode('utf-8'),
+                etag=data.get('etag'),
+                last_modified=data.get('last_modified'),
+                fetched_at=float(data['fetched_at']),
+            )
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+    
+    def put(self, url: str, entry: CachedResponse) -> None:
+        data = {
+            'url': url,
+            'body': entry.body.decode('utf-8', 'replace'),
+            'etag': entry.etag,
+            'last_modified': entry.last_modified,
+            'fetched_at': entry.fetched_at,
+        }
+        path = self._path(url)
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+            os.replace(tmp_path, path)
+        except OSError:
+            pass
+
+
+class PackageCache:
+    """
+    Persistent, content-addressed store of downloaded installers, laid out
+    as <directory>/<version>/<sha256>/<filename>. Entries only appear by
+    atomic rename after a verified download. Total size is capped; the
+    least recently used entries (by access time, refreshed on every hit)
+    are evicted first.
+    """
+    
+    INCOMING_DIR = '.incoming'
+    
+    def __init__(self, directory: str, max_size: int):
+        self.directory = directory
+        self.max_size = max_size
+    
+    @property
+    def incoming_dir(self) -> str:
+        """Where in-flight downloads (and their .part files) live; same filesystem, so renames are atomic."""
+        return os.path.join(self.directory, self.INCOMING_DIR)
+    
+    def _entries(self) -> List[Tuple[str, str, str]]:
+        """All cached files as (version, sha256, path)."""
+        entries = []
+        try:
+            versions = os.listdir(self.directory)
+        except OSError:
+            return entries
+        for version in versions:
+            if version == self.INCOMING_DIR:
+                continue
+            version_dir = os.path.join(self.directory, version)
+            try:
+                digests = os.listdir(version_dir)
+            except OSError:
+                continue
+            for sha256 in digests:
+                entry_dir = os.path.join(version_dir, sha256)
+                try:
+                    names = os.listdir(entry_dir)
+                except OSError:
+                    continue
+                entries.extend((version, sha256, os.path.join(entry_dir, name)) for name in names)
+        return entries
+    
+    @staticmethod
+    def _touch(path: str) -> None:
+        """Record a use: bump the access time, which also works on relatime/noatime mounts."""
+        try:
+            os.utime(path, (time.time(), os.stat(path).st_mtime))
+        except OSError:
+            pass
+    
+    def lookup(self, version: str, filename: str, sha256: Optional[str] = None) -> Optional[str]:
+        """Path of a cached installer for version (and sha256, if given), or None."""
+        candidates = []
+        for entry_version, entry_sha256, path in self._entries():
+            if entry_version != version or os.path.basename(path) != filename:
+                continue
+            if sha256 and entry_sha256 != sha256.lower():
+                continue
+            try:
+                candidates.append((os.stat(path).st_atime, path))
+            except OSError:
+                # Evicted by another process since it was listed
+                continue
+        if not candidates:
+            return None
+        _, path = max(candidates)
+        self._touch(path)
+        return path
+    
+    def add(self, version: str, sha256: str, path: str) -> str:
+        """Move a verified download into the cache and return its new path."""
+        entry_dir = os.path.join(self.directory, version, sha256.lower())
+        os.makedirs(entry_dir, exist_ok=True)
+        cached_path = os.path.join(entry_dir, os.path.basename(path))
+        os.replace(path, cached_path)
+        self._touch(cached_path)
+        self.evict(keep=cached_path)
+        return cached_path
+    
+    def evict(self, keep: Optional[str] = None) -> None:
+        """Delete least recently used entries until the cache fits max_size."""
+        entries = []
+        for _, _, path in self._entries():
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((st.st_atime, st.st_size, path))
+        
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_size:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            print(f"🗑️  Evicted {os.path.basename(path)} from the driver cache")
+            # Prune the <sha256> and then the <version> directory if that
+            # emptied them; never anything above the cache directory
+            entry_dir = os.path.dirname(path)
+            for directory in (entry_dir, os.path.dirname(entry_dir)):
+                try:
+                    os.rmdir(directory)
+                except OSError:
+                    break
+
+
+class MirrorHealth:
+    """
+    What earlier runs learned about each mirror, kept in a small JSON file:
+    a smoothed probe time and the number of consecutive failures. A mirror
+    that failed recently sits out for a while (doubling per failure, capped
+    at an hour), so a dead mirror costs one timeout rather than one per run.
+    """
+    
+    # Weight of the newest sample in the smoothed probe time
+    SMOOTHING = 0.3
+    COOLDOWN_BASE = 60.0
+    COOLDOWN_MAX = 3600.0
+    
+    def __init__(self, path: str):
+        self.path = path
+        self._mirrors = self._load()
+    
+    def _load(self) -> Dict[str, dict]:
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(data, dict):
+            return {}
+        return {mirror: entry for mirror, entry in data.items() if isinstance(entry, dict)}
+    
+    def _save(self) -> None:
+        directory = os.path.dirname(self.path)
+        try:
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(self._mirrors, f, indent=2, sort_keys=True)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            pass
+    
+    def record_success(self, mirror: str, seconds: Optional[float] = None) -> None:
+        entry = self._mirrors.setdefault(mirror, {})
+        if seconds is not None:
+            previous = entry.get('probe_time')
+            if isinstance(previous, (int, float)):
+                seconds = previous + self.SMOOTHING * (seconds - previous)
+            entry['probe_time'] = seconds
+        entry['failures'] = 0
+        entry['checked_at'] = time.time()
+        self._save()
+    
+    def record_failure(self, mirror: str) -> None:
+        entry = self._mirrors.setdefault(mirror, {})
+        entry['failures'] = int(entry.get('failures') or 0) + 1
+        entry['checked_at'] = time.time()
+        self._save()
+    
+    def cooling_down(self, mirror: str) -> bool:
+        entry = self._mirrors.get(mirror, {})
+        failures = int(entry.get('failures') or 0)
+        if not failures:
+            return False
+        cooldown = min(self.COOLDOWN_MAX, self.COOLDOWN_BASE * 2 ** (failures - 1))
+        return time.time() - float(entry.get('checked_at') or 0) < cooldown
+    
+    def probe_time(self, mirror: str) -> Optional[float]:
+        value = self._mirrors.get(mirror, {}).get('probe_time')
+        return value if isinstance(value, (int, float)) else None
+
+
+class VersionCatalog:
+    """
+    Every driver version published on the download server, kept sorted in
+    a small text index (one version per line, oldest first). Queries are
+    bisect lookups on the loaded index and never touch the network;
+    merge() folds in the versions from a fresh directory listing.
+    """
+    
+    # Version directories in an HTML listing: href="550.54.14/", also
+    # with ./ or an absolute path in front
+    HREF_PATTERN = re.compile(r'''href\s*=\s*["']?(?:[^"'\s>]*/)?(\d+(?:\.\d+)+)/''', re.IGNORECASE)
+    
+    def __init__(self, path: str):
+        self.path = path
+        self.versions = self._load()
+        self._keys = [version_key(version) for version in self.versions]
+    
+    def _load(self) -> List[str]:
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                versions = {line.strip() for line in f if VERSION_PATTERN.fullmatch(line.strip())}
+        except OSError:
+            return []
+        # Sorting again is cheap and survives a hand-edited index
+        return sort_versions(versions)
+    
+    def _save(self) -> None:
+        directory = os.path.dirname(self.path)
+        try:
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(''.join(version + '\n' for version in self.versions))
+            os.replace(tmp_path, self.path)
+        except OSError:
+            pass
+    
+    @classmethod
+    def parse_listing(cls, html: str) -> List[str]:
+        """Version directories linked from a download-tree listing page, sorted."""
+        return sort_versions(set(cls.HREF_PATTERN.findall(html)))
+    
+    def merge(self, versions: List[str]) -> List[str]:
+        """Add versions to the index (saving it if anything changed); returns the new ones."""
+        known = set(self.versions)
+        added = sort_versions({version for version in versions if version not in known})
+        for version in added:
+            key = version_key(version)
+            index = bisect.bisect_right(self._keys, key)
+            self._keys.insert(index, key)
+            self.versions.insert(index, version)
+        if added:
+            self._save()
+        return added
+    
+    def __len__(self) -> int:
+        return len(self.versions)
+    
+    def __contains__(self, version: str) -> bool:
+        try:
+            key = version_key(version)
+        except InvalidVersionError:
+            return False
+        index = bisect.bisect_left(self._keys, key)
+        return index < len(self._keys) and self._keys[index] == key
+    
+    def latest(self) -> Optional[str]:
+        return self.versions[-1] if self.versions else None
+    
+    def latest_in_branch(self, branch: int) -> Optional[str]:
+        """Newest version whose major number is branch, e.g. 550 -> "550.163.01"."""
+        index = bisect.bisect_left(self._keys, (branch + 1,))
+        if index and self._keys[index - 1][0] == branch:
+            return self.versions[index - 1]
+        return None
+    
+    def newer_than(self, version: str) -> List[str]:
+        """All versions strictly newer than version, oldest first. Raises InvalidVersionError."""
+        return self.versions[bisect.bisect_right(self._keys, version_key(version)):]
+    
+    def branches(self) -> Dict[int, List[str]]:
+        """Versions grouped by major number."""
+        grouped = {}
+        for key, version in zip(self._keys, self.versions):
+            grouped.setdefault(key[0], []).append(version)
+        return grouped
+
+
+class UpdatePolicy:
+    """
+    Which driver version a host should run, given as a --policy spec:
+    
+      latest         whatever latest.txt names (NVIDIA's newest release)
+      branch         newest release in the installed driver's branch
+                     (or the newest overall if nothing is installed)
+      pin:MAJOR      newest release in branch MAJOR, e.g. pin:535
+      >=550,<560     newest release satisfying every comparison
+                     (>=, >, <=, <, ==, !=); a bound only compares as
+                     many components as it has, so <=565 includes every
+                     565.x and ==550 means the 550 branch
+    
+    Everything but "latest" is resolved against a VersionCatalog.
+    """
+    
+    CONSTRAINT_PATTERN = re.compile(r'(>=|<=|==|!=|>|<)\s*(\d+(?:\.\d+)*)')
+    OPERATORS = {
+        '>=': operator.ge, '>': operator.gt,
+        '<=': operator.le, '<': operator.lt,
+        '==': operator.eq, '!=': operator.ne,
+    }
+    
+    def __init__(self, spec: str = 'latest'):
+        self.spec = spec.strip()
+        self.branch = None
+        self.constraints = []
+        if self.spec in ('latest', 'branch'):
+            self.kind = self.spec
+        elif self.spec.startswith('pin:'):
+            if not self.spec[4:].isdigit():
+                raise ValueError(f"invalid update policy {spec!r}: expected pin:MAJOR, e.g. pin:535")
+            self.kind = 'pin'
+            self.branch = int(self.spec[4:])
+        else:
+            self.kind = 'range'
+            for part in self.spec.split(','):
+                match = self.CONSTRAINT_PATTERN.fullmatch(part.strip())
+                if not match:
+                    raise ValueError(
+                        f"invalid update policy {spec!r}: expected latest, branch, "
+                        f"pin:MAJOR or comparisons like >=550,<560"
+                    )
+                self.constraints.append((self.OPERATORS[match.group(1)], version_key(match.group(2))))
+    
+    def __str__(self) -> str:
+        return self.spec
+    
+    @property
+    def needs_installed(self) -> bool:
+        """Whether the target depends on the installed version."""
+        return self.kind == 'branch'
+    
+    def allows(self, version: str) -> bool:
+        key = version_key(version)
+        return all(compare(key[:len(bound)], bound) for compare, bound in self.constraints)
+    
+    def target(self, catalog: VersionCatalog, installed: Optional[str] = None) -> Optional[str]:
+        """The version to run, or None if the catalog has nothing that fits."""
+        if self.kind == 'pin':
+            return catalog.latest_in_branch(self.branch)
+        if self.kind == 'branch' and installed:
+            return catalog.latest_in_branch(parse_version(installed).major)
+        if self.kind == 'range':
+            for version in reversed(catalog.versions):
+                if self.allows(version):
+                    return version
+            return None
+        return catalog.latest()
+    
+    def plan(self, catalog: VersionCatalog, installed_versions: List[Optional[str]]) -> List[Optional[str]]:
+        """
+        target() for many hosts at once. Only "branch" depends on the
+        installed version, and then only through its major number, so each
+        distinct branch is looked up once however large the fleet.
+        """
+        if not self.needs_installed:
+            target = self.target(catalog)
+            return [target] * len(installed_versions)
+        
+        by_branch = {}
+        targets = []
+        for installed in installed_versions:
+            try:
+                branch = parse_version(installed).major
+            except InvalidVersionError:
+                # No branch to stay on
+                targets.append(None)
+                continue
+            if branch not in by_branch:
+                by_branch[branch] = self.target(catalog, installed)
+            targets.append(by_branch[branch])
+        return targets
+
+
+class PackageCacheRequestHandler(BaseHTTPRequestHandler):
+    """
+    Serve a PackageCache read-only in NVIDIA's download layout, so peers
+    can use it in place of NVIDIA's server:
+    /Linux-<arch>/<version>/<filename> and <filename>.sha256sum, for
+    every architecture in the cache. Single byte ranges are honoured, so
+    peers can resume and segment downloads.
+    """
+    
+    CHECKSUM_SUFFIX = '.sha256sum'
+    server_version = 'nvidia-driver-check'
+    
+    # Set on a subclass by NvidiaDriverCheck.serve
+    package_cache = None  # type: PackageCache
+    
+    def do_HEAD(self):
+        self._serve(send_body=False)
+    
+    def do_GET(self):
+        self._serve(send_body=True)
+    
+    def _serve(self, send_body: bool) -> None:
+        parts = urlsplit(self.path).path.split('/')
+        if len(parts) != 4 or parts[0] or not parts[1].startswith('Linux-'):
+            self.send_error(404)
+            return
+        version, filename = parts[2:]
+        
+        if filename.endswith(self.CHECKSUM_SUFFIX):
+            cached_path = self.package_cache.lookup(version, filename[:-len(self.CHECKSUM_SUFFIX)])
+            if cached_path is None:
+                self.send_error(404)
+                return
+            sha256 = os.path.basename(os.path.dirname(cached_path))
+            body = f"{sha256}  {os.path.basename(cached_path)}\n".encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            if send_body:
+                self.wfile.write(body)
+            return
+        
+        cached_path = self.package_cache.lookup(version, filename)
+        if cached_path is None:
+            self.send_error(404)
+            return
+        try:
+            f = open(cached_path, 'rb')
+        except OSError:
+            # Evicted between lookup and open
+            self.send_error(404)
+            return
+        with f:
+            size = os.fstat(f.fileno()).st_size
+            byte_range = self._parse_range(self.headers.get('Range'), size)
+            if byte_range == ():
+                self.send_response(416)
+                self.send_header('Content-Range', f"bytes */{size}")
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            if byte_range:
+                start, end = byte_range
+                self.send_response(206)
+                self.send_header('Content-Range', f"bytes {start}-{end}/{size}")
+            else:
+                start, end = 0, size - 1
+                self.send_response(200)
+            self.send_header('Content-Type', 'application/octet-stream')
+            self.send_header('Content-Length', str(end - start + 1))
+            self.send_header('Accept-Ranges', 'bytes')
+            self.end_headers()
+            if send_body and end >= start:
+                # Zero-copy from the page cache straight to the socket
+                self.connection.sendfile(f, start, end - start + 1)
+    
+    @staticmethod
+    def _parse_range(header: Optional[str], size: int):
+        """
+        (start, end) for a single satisfiable "bytes=" range, () if it is
+        unsatisfiable, None to send the whole file (no header, or one we
+        don't handle, such as multiple ranges).
+        """
+        match = re.fullmatch(r'bytes=(\d*)-(\d*)', (header or '').strip())
+        if not match or match.group(1) == match.group(2) == '':
+            return None
+        first, last = match.groups()
+        if first == '':
+            suffix = int(last)
+            if suffix == 0:
+                return ()
+            return max(0, size - suffix), size - 1
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+        if start >= size or start > end:
+            return ()
+        return start, end
+    
+    def log_message(self, format, *args):
+        print(f"{self.address_string()} - {format % args}")
+
+
+class NvidiaSmiBackend:
+    """Probe GPUs with a single batched nvidia-smi --query-gpu call."""
+    
+    name = 'nvidia-smi'
+    # Reports every GpuRecord field, including memory
+    complete = True
+    
+    # Every field run_check needs, fetched with a single nvidia-smi invocation.
+    # Each fork of nvidia-smi initializes the driver and can cost hundreds of
+    # milliseconds, so the result is cached as a snapshot for the whole run.
+    # 'name' is last so a GPU name containing a comma cannot shift the columns.
+    QUERY_FIELDS = (
+        'index', 'uuid', 'pci.bus_id', 'driver_version', 'cuda_version',
+        'memory.total', 'memory.used', 'memory.free', 'name',
+    )
+    # Fields that older nvidia-smi releases reject as unknown
+    OPTIONAL_FIELDS = ('cuda_version',)
+    
+    async def _query(self, fields) -> Optional[Tuple[int, str]]:
+        """Run one nvidia-smi --query-gpu call; returns (returncode, output)."""
+        try:
+            process = await asyncio.create_subprocess_exec(
+                'nvidia-smi', f"--query-gpu={','.join(fields)}", '--format=csv,noheader',
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.STDOUT,
+            )
+        except FileNotFoundError:
+            return None
+        try:
+            stdout, _ = await process.communicate()
+        except asyncio.CancelledError:
+            # Deadline hit: don't leave nvidia-smi running behind us
+            process.kill()
+            await process.wait()
+            raise
+        return process.returncode, stdout.decode('utf-8', 'replace')
+    
+    @staticmethod
+    def parse_csv(output: str, fields) -> Optional[GpuSnapshot]:
+        """Parse --query-gpu CSV output (one line per GPU) into a snapshot."""
+        field_count = len(fields)
+        gpus = []
+        driver_version = cuda_version = None
+        for line in output.splitlines():
+            if not line.strip():
+                continue
+            row = dict(zip(fields, (v.strip() for v in line.split(',', field_count - 1))))
+            if len(row) != field_count:
+                continue
+            driver_version = driver_version or row.get('driver_version')
+            cuda_version = cuda_version or row.get('cuda_version')
+            gpus.append(GpuRecord(
+                index=int(row['index']) if row['index'].isdigit() else len(gpus),
+                uuid=row['uuid'],
+                pci_bus_id=row['pci.bus_id'],
+                name=row['name'],
+                memory_total=row['memory.total'],
+                memory_used=row['memory.used'],
+                memory_free=row['memory.free'],
+            ))
+        
+        if not gpus:
+            return None
+        return GpuSnapshot(driver_version, cuda_version, tuple(gpus))
+    
+    async def probe_async(self) -> Optional[GpuSnapshot]:
+        """Query nvidia-smi; returns None if it is missing or fails."""
+        fields = self.QUERY_FIELDS
+        result = await self._query(fields)
+        if result is not None and result[0] != 0:
+            # Retry once without the fields this nvidia-smi does not know about
+            unknown = [f for f in self.OPTIONAL_FIELDS if f in result[1]]
+            if unknown:
+                fields = tuple(f for f in fields if f not in unknown)
+                result = await self._query(fields)
+        
+        if result is None or result[0] != 0:
+            return None
+        return self.parse_csv(result[1], fields)
+    
+    def probe(self) -> Optional[GpuSnapshot]:
+        return asyncio.run(self.probe_async())
+
+
+class NvmlError(Exception):
+    """An NVML call returned something other than NVML_SUCCESS."""
+
+
+class _NvmlPciInfo(ctypes.Structure):
+    _fields_ = [
+        ('busIdLegacy', ctypes.c_char * 16),
+        ('domain', ctypes.c_uint),
+        ('bus', ctypes.c_uint),
+        ('device', ctypes.c_uint),
+        ('pciDeviceId', ctypes.c_uint),
+        ('pciSubSystemId', ctypes.c_uint),
+        ('busId', ctypes.c_char * 32),
+    ]
+
+
+class _NvmlMemory(ctypes.Structure):
+    _fields_ = [
+        ('total', ctypes.c_ulonglong),
+        ('free', ctypes.c_ulonglong),
+        ('used', ctypes.c_ulonglong),
+    ]
+
+
+class NvmlBackend:
+    """
+    Probe GPUs through libnvidia-ml via ctypes, without forking nvidia-smi.
+    Once initialized, an NVML query takes microseconds; a fork+exec of
+    nvidia-smi takes hundreds of milliseconds. nvmlInit itself can take
+    seconds on a GPU without persistence mode.
+    """
+    
+    name = 'nvml'
+    complete = True
+    
+    LIBRARY_NAME = 'libnvidia-ml.so.1'
+    NVML_SUCCESS = 0
+    # Buffer sizes from nvml.h (NVML_*_BUFFER_SIZE)
+    STRING_BUFFER_SIZE = 96
+    
+    def __init__(self, library_path: Optional[str] = None):
+        self.library_path = library_path or self.LIBRARY_NAME
+    
+    def _load(self) -> Optional[ctypes.CDLL]:
+        """Load the NVML library, or None if it is not installed."""
+        try:
+            return ctypes.CDLL(self.library_path)
+        except OSError:
+            return None
+    
+    @staticmethod
+    def _call(lib, function: str, *args) -> None:
+        ret = getattr(lib, function)(*args)
+        if ret != NvmlBackend.NVML_SUCCESS:
+            raise NvmlError(f"{function} failed with NVML error {ret}")
+    
+    @staticmethod
+    def _function(lib, *names: str) -> str:
+        """Return the first of names that the library exports."""
+        for name in names:
+            if hasattr(lib, name):
+                return name
+        raise NvmlError(f"NVML does not export {names[0]}")
+    
+    def _read_string(self, lib, function: str, *args) -> str:
+        buf = ctypes.create_string_buffer(self.STRING_BUFFER_SIZE)
+        self._call(lib, function, *args, buf, ctypes.c_uint(self.STRING_BUFFER_SIZE))
+        return buf.value.decode('utf-8', 'replace')
+    
+    @staticmethod
+    def format_cuda_version(version: int) -> str:
+        """NVML encodes CUDA 12.4 as 12040."""
+        return f"{version // 1000}.{(version % 1000) // 10}"
+    
+    def probe(self) -> Optional[GpuSnapshot]:
+        """Read the driver and every device from NVML; None if unavailable."""
+        lib = self._load()
+        if lib is None:
+            return None
+        
+        try:
+            self._call(lib, self._function(lib, 'nvmlInit_v2', 'nvmlInit'))
+        except NvmlError:
+            return None
+        
+        try:
+            driver_version = self._read_string(lib, 'nvmlSystemGetDriverVersion')
+            
+            cuda_version = None
+            try:
+                value = ctypes.c_int()
+                self._call(lib, self._function(
+                    lib, 'nvmlSystemGetCudaDriverVersion_v2', 'nvmlSystemGetCudaDriverVersion'
+                ), ctypes.byref(value))
+                cuda_version = self.format_cuda_version(value.value)
+            except NvmlError:
+                pass
+            
+            count = ctypes.c_uint()
+            self._call(lib, self._function(lib, 'nvmlDeviceGetCount_v2', 'nvmlDeviceGetCount'),
+                       ctypes.byref(count))
+            get_handle = self._function(lib, 'nvmlDeviceGetHandleByIndex_v2', 'nvmlDeviceGetHandleByIndex')
+            
+            gpus = []
+            for index in range(count.value):
+                handle = ctypes.c_void_p()
+                self._call(lib, get_handle, ctypes.c_uint(index), ctypes.byref(handle))
+                
+                pci_bus_id = ''
+                if hasattr(lib, 'nvmlDeviceGetPciInfo_v3'):
+                    pci = _NvmlPciInfo()
+                    self._call(lib, 'nvmlDeviceGetPciInfo_v3', handle, ctypes.byref(pci))
+                    pci_bus_id = pci.busId.decode('ascii', 'replace')
+                
+                memory = _NvmlMemory()
+                self._call(lib, 'nvmlDeviceGetMemoryInfo', handle, ctypes.byref(memory))
+                mib = 1024 * 1024
+                
+                gpus.append(GpuRecord(
+                    index=index,
+                    uuid=self._read_string(lib, 'nvmlDeviceGetUUID', handle),
+                    pci_bus_id=pci_bus_id,
+                    name=self._read_string(lib, 'nvmlDeviceGetName', handle),
+                    memory_total=f"{memory.total // mib} MiB",
+                    memory_used=f"{memory.used // mib} MiB",
+                    memory_free=f"{memory.free // mib} MiB",
+                ))
+        except NvmlError:
+            return None
+        finally:
+            if hasattr(lib, 'nvmlShutdown'):
+                lib.nvmlShutdown()
+        
+        if not gpus:
+            return None
+        return GpuSnapshot(driver_version, cuda_version, tuple(gpus))
+    
+    async def probe_async(self) -> Optional[GpuSnapshot]:
+        # nvmlInit can block for a second or more on a GPU without
+        # persistence mode; keep it off the event loop so the latest.txt
+        # lookup proceeds meanwhile. A daemon thread, not the default
+        # executor, so a stuck init cannot hold the run past the deadline
+        return await run_in_daemon_thread(self.probe)
+
+
+class ProcfsBackend:
+    """
+    Probe the loaded kernel module through /proc/driver/nvidia and
+    /sys/module/nvidia. Spawns no process and does not wake a GPU that
+    is in a low-power state, but cannot report memory or CUDA version.
+    """
+    
+    name = 'procfs'
+    complete = False
+    
+    VERSION_PATTERN = re.compile(r'Kernel Module.*?\s(\d+\.\d+(?:\.\d+)*)\s')
+    
+    def __init__(self, root: str = '/'):
+        self.root = root
+    
+    def _path(self, *parts: str) -> str:
+        return os.path.join(self.root, *parts)
+    
+    @staticmethod
+    def _read(path: str) -> Optional[str]:
+        try:
+            with open(path, encoding='utf-8', errors='replace') as f:
+                return f.read()
+        except OSError:
+            return None
+    
+    def read_driver_version(self) -> Optional[str]:
+        """Version of the loaded nvidia kernel module, or None if not loaded."""
+        content = self._read(self._path('sys', 'module', 'nvidia', 'version'))
+        if content and content.strip():
+            return content.strip()
+        
+        content = self._read(self._path('proc', 'driver', 'nvidia', 'version'))
+        if content:
+            match = self.VERSION_PATTERN.search(content)
+            if match:
+                return match.group(1)
+        return None
+    
+    @staticmethod
+    def parse_information(content: str) -> Dict[str, str]:
+        """Parse a /proc/driver/nvidia/gpus/*/information file."""
+        fields = {}
+        for line in content.splitlines():
+            key, sep, value = line.partition(':')
+            if sep:
+                fields[key.strip()] = value.strip()
+        return fields
+    
+    @staticmethod
+    def normalize_bus_id(bus_id: str) -> str:
+        """Widen the PCI domain to 8 digits, as nvidia-smi and NVML print it."""
+        domain, sep, rest = bus_id.partition(':')
+        if not sep:
+            return bus_id
+        return f"{domain.zfill(8)}:{rest}".upper()
+    
+    def probe(self) -> Optional[GpuSnapshot]:
+        """Read the driver version and GPU list; None if the module is not loaded."""
+        driver_version = self.read_driver_version()
+        if driver_version is None:
+            return None
+        
+        gpus_dir = self._path('proc', 'driver', 'nvidia', 'gpus')
+        try:
+            entries = sorted(os.listdir(gpus_dir))
+        except OSError:
+            entries = []
+        
+        gpus = []
+        for entry in entries:
+            content = self._read(os.path.join(gpus_dir, entry, 'information'))
+            if content is None:
+                continue
+            info = self.parse_information(content)
+            gpus.append(GpuRecord(
+                index=len(gpus),
+                uuid=info.get('GPU UUID', ''),
+                pci_bus_id=self.normalize_bus_id(info.get('Bus Location', entry)),
+                name=info.get('Model', ''),
+            ))
+        
+        return GpuSnapshot(driver_version, None, tuple(gpus))
+    
+    async def probe_async(self) -> Optional[GpuSnapshot]:
+        # Blocking file reads; a procfs read can stall while the kernel
+        # module talks to the GPU, so do them off the event loop (and off
+        # the default executor, which asyncio.run joins at shutdown)
+        return await run_in_daemon_thread(self.probe)
+
+
+BACKENDS = {
+    ProcfsBackend.name: ProcfsBackend,
+    NvmlBackend.name: NvmlBackend,
+    NvidiaSmiBackend.name: NvidiaSmiBackend,
+}
+
+
+class PciDevice(NamedTuple):
+    """An NVIDIA display controller found on the PCI bus."""
+    address: str
+    device_id: str
+    class_code: str
+
+
+class PciScanner:
+    """
+    Find NVIDIA GPUs by walking /sys/bus/pci/devices, without spawning
+    lspci and without needing a driver to be loaded.
+    """
+    
+    NVIDIA_VENDOR_ID = 0x10de
+    # PCI base class 0x03: display controller (VGA 0x0300, 3D 0x0302, ...)
+    DISPLAY_CLASS = 0x03
+    
+    def __init__(self, root: str = '/'):
+        self.root = root
+    
+    @staticmethod
+    def _read_hex(path: str) -> Optional[int]:
+        try:
+            with open(path) as f:
+                return int(f.read().strip(), 16)
+        except (OSError, ValueError):
+            return None
+    
+    def scan(self) -> Optional[List[PciDevice]]:
+        """
+        Return the NVIDIA display controllers, or None if sysfs is not
+        available and the answer is unknown.
+        """
+        devices_dir = os.path.join(self.root, 'sys', 'bus', 'pci', 'devices')
+        try:
+            entries = sorted(os.listdir(devices_dir))
+        except OSError:
+            return None
+        
+        devices = []
+        for entry in entries:
+            device_dir = os.path.join(devices_dir, entry)
+            if self._read_hex(os.path.join(device_dir, 'vendor')) != self.NVIDIA_VENDOR_ID:
+                continue
+            class_code = self._read_hex(os.path.join(device_dir, 'class'))
+            if class_code is None or class_code >> 16 != self.DISPLAY_CLASS:
+                continue
+            device_id = self._read_hex(os.path.join(device_dir, 'device'))
+            devices.append(PciDevice(
+                address=entry,
+                device_id=f"{device_id:04x}" if device_id is not None else '',
+                class_code=f"{class_code:06x}",
+            ))
+        return devices
+
+
+class CheckStatus(NamedTuple):
+    """Result of one concurrent probe + latest-version lookup."""
+    snapshot: Optional[GpuSnapshot]
+    # The version the update policy targets (latest.txt under "latest")
+    latest_version: Optional[str]
+    latest_error: Optional[str]
+    # compare_versions(installed, latest), or None if either is unknown
+    comparison: Optional[int]
 
 
 class NvidiaDriverCheck:
     """Check NVIDIA driver installation and version."""
     
-    # NVIDIA Linux driver download endpoints
-    NVIDIA_LINUX_LATEST_URL = "https://download.nvidia.com/XFree86/Linux-x86_64/latest.txt"
-    NVIDIA_LINUX_DOWNLOAD_BASE = "https://download.nvidia.com/XFree86/Linux-x86_64"
+    # NVIDIA's Linux driver server, the default (and only) mirror unless
+    # --mirror is given. Mirrors share its layout: Linux-<arch>/latest.txt
+    # and Linux-<arch>/<version>/<filename> for each architecture.
+    NVIDIA_MIRROR = "https://download.nvidia.com/XFree86"
+    
+    # Probe backends in the order "auto" tries them. procfs answers driver
+    # presence and version without forking; the others fill in memory.
+    PROBE_BACKENDS = ('procfs', 'nvml', 'nvidia-smi')
+    
+    # One deadline (seconds) for all local probing and the latest-version
+    # lookup together, which run concurrently
+    DEFAULT_DEADLINE = 15.0
+    
+    # How long (seconds) cached metadata is trusted without asking the server
+    DEFAULT_CACHE_TTL = 3600.0
+    
+    # Size cap for the downloaded-installer cache (a .run is ~300-400 MB)
+    DEFAULT_PACKAGE_CACHE_SIZE = 2 * 1024 * 1024 * 1024
+    
+    # Download retries, with exponential backoff (seconds) and full jitter
+    DOWNLOAD_RETRIES = 5
+    RETRY_BACKOFF_BASE = 1.0
+    RETRY_BACKOFF_MAX = 60.0
+    
+    # Segmented downloads never split a file into pieces smaller than this
+    MIN_SEGMENT_SIZE = 1024 * 1024
+    
+    # With several mirrors, each is probed by timing a ranged GET of this
+    # many bytes of the installer; slower or failed probes are tried last
+    MIRROR_PROBE_SIZE = 256 * 1024
+    MIRROR_PROBE_TIMEOUT = 5.0
+    
+    # Where "serve" listens for peers by default
+    DEFAULT_SERVE_PORT = 8765
+    
+    # run_check exit codes, so automation can tell the outcomes apart
+    EXIT_OK = 0               # up to date (or nothing to do)
+    EXIT_FAILED = 1
+    EXIT_UPDATED = 2          # new driver installed and already loaded
+    EXIT_REBOOT_REQUIRED = 3  # new driver installed, old (or no) module still loaded
+    
+    # nvidia-installer flags for --yes: no prompts, no ncurses UI
+    SILENT_INSTALLER_FLAGS = ('--silent', '--no-questions', '--ui=none')
+    
+    # What --yes may install: driver updates, fresh installs, or both
+    INSTALL_SCOPES = ('all', 'updates', 'fresh')
+    
+    # Mode bits a finished installer gets (chmod a+x)
+    EXECUTABLE_BITS = stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH
+    
+    # Entry point of a tree unpacked with the .run's --extract-only
+    STAGED_INSTALLER = 'nvidia-installer'
+    
+    # Compiler for the kernel module build with --ccache
+    CCACHE_CC = 'ccache gcc'
+    
+    def __init__(self, backend: str = 'auto', root: str = '/',
+                 deadline: float = DEFAULT_DEADLINE,
+                 cache_ttl: float = DEFAULT_CACHE_TTL,
+                 metadata_cache: Optional[MetadataCache] = None,
+                 download_segments: int = 1,
+                 checksum_manifest: Optional[str] = None,
+                 cache_dir: Optional[str] = None,
+                 package_cache_size: int = DEFAULT_PACKAGE_CACHE_SIZE,
+                 peers: Optional[List[str]] = None,
+                 mirrors: Optional[List[str]] = None,
+                 policy: str = 'latest',
+                 arch: Optional[str] = None,
+                 assume_yes: bool = False,
+                 install_scope: str = 'all',
+                 concurrency_level: Optional[int] = None,
+                 ccache: bool = False,
+                 allow_unverified: bool = False):
+        if backend == 'auto':
+            names = self.PROBE_BACKENDS
+        else:
+            names = (backend,)
+        self.root = root
+        self.deadline = deadline
+        self.cache_ttl = cache_ttl
+        self.download_segments = download_segments
+        self.checksum_manifest = checksum_manifest
+        self.cache_dir = cache_dir or default_cache_dir()
+        self.metadata_cache = metadata_cache or MetadataCache(
+            os.path.join(self.cache_dir, 'metadata')
+        )
+        self.package_cache = PackageCache(os.path.join(self.cache_dir, 'packages'), package_cache_size)
+        # Base URLs of other hosts running "serve", tried before NVIDIA
+        self.peers = [peer.rstrip('/') for peer in peers or []]
+        # Mirror roots in configured order; like NVIDIA's XFree86 they hold
+        # a Linux-<arch> directory per architecture
+        self.mirror_roots = [mirror.rstrip('/') for mirror in mirrors or [self.NVIDIA_MIRROR]]
+        self.mirror_health = MirrorHealth(os.path.join(self.cache_dir, 'mirrors.json'))
+        self.policy = UpdatePolicy(policy)
+        # Unattended mode: prompts answer themselves within install_scope
+        self.assume_yes = assume_yes
+        self.install_scope = install_scope
+        # Without it, unattended runs refuse installers with no checksum
+        self.allow_unverified = allow_unverified
+        # Version of the last successful install this run
+        self.installed_version = None
+        # Seconds spent per install phase (download, extract, install) this run
+        self.phase_times = {}
+        # Parallel jobs for the kernel module build, and the persistent
+        # ccache that makes rebuilds for an already-seen kernel cache hits
+        # (None unless requested and ccache is on PATH)
+        self.concurrency_level = concurrency_level or os.cpu_count() or 1
+        self.ccache_missing = ccache and shutil.which('ccache') is None
+        self.ccache_dir = os.path.join(self.cache_dir, 'ccache') if ccache and not self.ccache_missing else None
+        self.build_log = os.path.join(self.cache_dir, 'build-times.jsonl')
+        self.backends = [self._make_backend(name) for name in names]
+        self._results = {}
+        # Backends that were still probing when the deadline hit
+        self.timed_out_backends = []
+        self._select_arch(arch)
+    
+    def _select_arch(self, arch: Optional[str]) -> None:
+        """Point the per-architecture state (URLs, catalog, lookups) at arch."""
+        self.arch = detect_arch(arch)
+        # Download bases for this architecture, in configured order
+        self.mirrors = [f"{root}/{self.linux_directory}" for root in self.mirror_roots]
+        self.catalog = VersionCatalog(os.path.join(self.cache_dir, 'catalog', f"{self.linux_directory}.txt"))
+        # True, or the exception, once the catalog was refreshed this run
+        self._catalog_refresh = None
+        # (version, error) once the latest-version lookup has finished
+        self._latest = None
+    
+    @property
+    def linux_directory(self) -> str:
+        """This architecture's directory on the download server, e.g. Linux-aarch64."""
+        return f"Linux-{self.arch}"
+    
+    def for_arch(self, arch: str) -> 'NvidiaDriverCheck':
+        """
+        A checker for another architecture that shares this one's settings
+        and caches (metadata, packages, mirror health); only URLs, the
+        catalog and version lookups are per architecture.
+        """
+        other = copy.copy(self)
+        other._select_arch(arch)
+        return other
+    
+    def _make_backend(self, name: str):
+        if name == ProcfsBackend.name:
+            return ProcfsBackend(self.root)
+        return BACKENDS[name]()
+    
+    def _run(self, coro, default=None):
+        """Run a coroutine to completion under the global deadline (sync API)."""
+        try:
+            return asyncio.run(asyncio.wait_for(coro, self.deadline))
+        except asyncio.TimeoutError:
+            return default
+    
+    async def _run_backends(self, complete: bool) -> Optional[GpuSnapshot]:
+        """
+        Try backends in order, probing each at most once per run.
+        With complete=True, keep going past backends that cannot report
+        every field, falling back to the best partial answer.
+        """
+        partial = None
+        for backend in self.backends:
+            if backend.name not in self._results:
+                try:
+                    self._results[backend.name] = await backend.probe_async()
+                except asyncio.CancelledError:
+                    # Deadline hit. A blocking probe may still be stuck on
+                    # its thread; count it as no answer for the rest of
+                    # the run instead of waiting for it again
+                    self._results[backend.name] = None
+                    self.timed_out_backends.append(backend.name)
+                    raise
+            snapshot = self._results[backend.name]
+            if snapshot is None:
+                continue
+            if not complete or backend.complete:
+                return snapshot
+            partial = partial or snapshot
+        return partial
+    
+    async def probe_async(self, refresh: bool = False) -> Optional[GpuSnapshot]:
+        """
+        Probe the GPUs once and cache the result for the rest of the run.
+        Returns the first complete GpuSnapshot (with memory), or None if no
+        backend can see the driver.
+        """
+        if refresh:
+            self._results = {}
+        return await self._run_backends(complete=True)
+    
+    def probe(self, refresh: bool = False) -> Optional[GpuSnapshot]:
+        return self._run(self.probe_async(refresh))
+    
+    async def probe_driver_async(self) -> Optional[GpuSnapshot]:
+        """Cheapest answer to "is the driver loaded, and which version"."""
+        return await self._run_backends(complete=False)
+    
+    def probe_driver(self) -> Optional[GpuSnapshot]:
+        return self._run(self.probe_driver_async())
     
     def check_nvidia_smi(self) -> bool:
-        """Check if nvidia-smi is available."""
+        """Check if the driver answers through any probe backend."""
+        return self.probe_driver() is not None
+    
+    def get_driver_version(self) -> Optional[str]:
+        """Get NVIDIA driver version."""
+        snapshot = self.probe_driver()
+        if snapshot and snapshot.driver_version:
+            return snapshot.driver_version
+        snapshot = self.probe()
+        if snapshot:
+            return snapshot.driver_version
+        return None
+    
+    def get_gpus(self) -> List[GpuRecord]:
+        """Get one record per installed GPU, ordered by index."""
+        snapshot = self.probe()
+        if not snapshot:
+            return []
+        return list(snapshot.gpus)
+    
+    def get_gpu_info(self) -> Dict[str, str]:
+        """Get detailed GPU information (first GPU only; see get_gpus)."""
+        info = {}
+        snapshot = self.probe()
+        if not snapshot or not snapshot.gpus:
+            return info
+        
+        gpu = snapshot.gpus[0]
+        info['gpu_name'] = gpu.name
+        if snapshot.cuda_version:
+            info['cuda_version'] = snapshot.cuda_version
+        if gpu.memory_total:
+            info['memory_total'] = gpu.memory_total
+            info['memory_used'] = gpu.memory_used
+            info['memory_free'] = gpu.memory_free
+        
+        return info
+    
+    @staticmethod
+    def format_gpu_table(gpus: List[GpuRecord]) -> List[str]:
+        """Render GPU records as aligned table rows (header first)."""
+        header = ('#', 'GPU Name', 'Memory Used / Total', 'Memory Free', 'Bus ID')
+        rows = [header]
+        for gpu in gpus:
+            memory = f"{gpu.memory_used} / {gpu.memory_total}" if gpu.memory_total else '-'
+            rows.append((str(gpu.index), gpu.name, memory, gpu.memory_free or '-', gpu.pci_bus_id or '-'))
+        
+        widths = [max(len(row[col]) for row in rows) for col in range(len(header))]
+        return [
+            '  ' + '  '.join(cell.ljust(width) for cell, width in zip(row, widths)).rstrip()
+            for row in rows
+        ]
+    
+    async def fetch_metadata(self, url: str) -> bytes:
+        """
+        GET a small metadata file through the on-disk cache. Fresh entries
+        (younger than cache_ttl) are returned without touching the network;
+        older ones are revalidated with If-None-Match/If-Modified-Since.
+        A stale entry is served if the server cannot be reached.
+        file:// URLs (a local mirror) are read directly, uncached.
+        """
+        if urlsplit(url).scheme == 'file':
+            return self._read_local(url)
+        
+        entry = self.metadata_cache.get(url)
+        if entry is not None and 0 <= time.time() - entry.fetched_at < self.cache_ttl:
+            return entry.body
+        
+        # Single flight: concurrent runs wait for whoever refreshes first,
+        # then find a fresh entry instead of asking the server again
+        async with async_file_lock(self.metadata_cache.lock_path(url)):
+            entry = self.metadata_cache.get(url)
+            if entry is not None and 0 <= time.time() - entry.fetched_at < self.cache_ttl:
+                return entry.body
+            return await self._refresh_metadata(url, entry)
+    
+    @staticmethod
+    def _read_local(url: str) -> bytes:
+        """
+        Body of a file:// URL. A directory reads as an HTML index of its
+        subdirectories, the way a web server would list it.
+        """
+        path = url2pathname(urlsplit(url).path)
+        if os.path.isdir(path):
+            names = sorted(name for name in os.listdir(path) if os.path.isdir(os.path.join(path, name)))
+            return ''.join(f'<a href="{name}/">{name}/</a>\n' for name in names).encode('utf-8')
+        with open(path, 'rb') as f:
+            return f.read()
+    
+    async def _refresh_metadata(self, url: str, entry: Optional[CachedResponse]) -> bytes:
+        """Fetch or revalidate url and update the cache. Call with its lock held."""
+        now = time.time()
+        headers = {
+            'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36'
+        }
+        if entry is not None:
+            if entry.etag:
+                headers['If-None-Match'] = entry.etag
+            if entry.last_modified:
+                headers['If-Modified-Since'] = entry.last_modified
+        
         try:
-            result = subprocess.run(
-                ['nvidia-smi', '--version'],
-                capture_output=True,
-                text=True,
-                timeout=5
-            )
-            return result.returncode == 0
-        except (FileNotFoundError, subprocess.TimeoutExpired):
-            return False
+            response = await async_http_request(url, headers=headers)
+        except (OSError, URLError, asyncio.IncompleteReadError):
+            if entry is not None:
+                return entry.body
+            raise
+        
+        if response.status == 304 and entry is not None:
+            self.metadata_cache.put(url, entry._replace(fetched_at=now))
+            return entry.body
+        if response.status == 200:
+            self.metadata_cache.put(url, CachedResponse(
+                body=response.body,
+                etag=response.headers.get('etag'),
+                last_modified=response.headers.get('last-modified'),
+                fetched_at=now,
+            ))
+            return response.body
+        if entry is not None and response.status >= 500:
+            return entry.body
+        raise HTTPError(url, response.status, response.reason, None, None)
+    
+    @staticmethod
+    def _is_mirror_failure(error: BaseException) -> bool:
+        """
+        Whether error says the mirror is unhealthy: transport errors and
+        5xx do, a 4xx does not (a partial mirror lacking one file is fine).
+        """
+        if isinstance(error, HTTPError):
+            return error.code >= 500
+        return isinstance(error, (OSError, URLError, asyncio.IncompleteReadError))
+    
+    async def race_metadata(self, filename: str, parse):
+        """
+        Fetch the same metadata file (a path under each mirror) from every
+        mirror concurrently and return parse(body) for the first response
+        that parses to something other than None; the remaining requests
+        are cancelled. Mirrors cooling down after recent failures are
+        skipped unless that leaves none. Raises the last error if no
+        mirror gives a usable answer.
+        """
+        mirrors = [m for m in self.mirrors if not self.mirror_health.cooling_down(m)] or self.mirrors
+        
+        async def fetch(mirror):
+            url = f"{mirror}/{filename}"
+            try:
+                value = parse(await self.fetch_metadata(url))
+            except asyncio.CancelledError:
+                # Lost the race (or hit the deadline): not the mirror's fault.
+                # Before Python 3.8 CancelledError is an Exception, so this
+                # has to come first
+                raise
+            except (URLError, Exception) as e:
+                if self._is_mirror_failure(e):
+                    self.mirror_health.record_failure(mirror)
+                raise
+            if value is None:
+                raise URLError(f"unusable response from {url}")
+            self.mirror_health.record_success(mirror)
+            return value
+        
+        pending = {asyncio.ensure_future(fetch(mirror)) for mirror in mirrors}
+        error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+    
+    @staticmethod
+    def parse_latest(body: bytes) -> Optional[str]:
+        """Version field of a latest.txt body, or None if it doesn't look like one."""
+        # Format: "580.105.08 580.105.08/NVIDIA-Linux-x86_64-580.105.08.run"
+        # First part is the version
+        parts = body.decode('utf-8', 'replace').split()
+        if parts and re.fullmatch(r'\d+(\.\d+)+', parts[0]):
+            return parts[0]
+        return None
+    
+    async def _fetch_latest_version(self) -> Optional[str]:
+        """Race latest.txt across the mirrors and return its version field. Raises on network errors."""
+        return await self.race_metadata('latest.txt', self.parse_latest)
+    
+    async def refresh_catalog_async(self) -> List[str]:
+        """
+        Fold the download tree's directory listing into the version catalog
+        and return the versions seen for the first time. The listing goes
+        through the metadata cache, so within cache_ttl this is offline and
+        after that it is a conditional request.
+        """
+        def parse(body):
+            return VersionCatalog.parse_listing(body.decode('utf-8', 'replace')) or None
+        
+        return self.catalog.merge(await self.race_metadata('', parse))
+    
+    def refresh_catalog(self) -> Optional[List[str]]:
+        """Sync refresh_catalog_async; None if it did not finish within the deadline."""
+        return self._run(self.refresh_catalog_async())
+    
+    async def _refresh_catalog_once(self) -> None:
+        """Refresh the catalog at most once per run, remembering a failure instead of raising."""
+        if self._catalog_refresh is None:
+            try:
+                await self.refresh_catalog_async()
+                self._catalog_refresh = True
+            except asyncio.CancelledError:
+                raise
+            except (URLError, Exception) as e:
+                self._catalog_refresh = e
+    
+    async def get_latest_driver_version_async(self, installed: Optional[str] = None) -> Optional[str]:
+        """
+        Look up the version the update policy targets once per run ("latest"
+        asks latest.txt, the others the catalog); errors are remembered, not
+        printed. installed is only consulted by the "branch" policy.
+        """
+        if self._latest is None:
+            try:
+                if self.policy.kind == 'latest':
+                    version = await self._fetch_latest_version()
+                else:
+                    await self._refresh_catalog_once()
+                    # A stale local index still answers; only an empty one is an error
+                    if isinstance(self._catalog_refresh, Exception) and not self.catalog.versions:
+                        raise self._catalog_refresh
+                    version = self.policy.target(self.catalog, installed)
+                    if version is None:
+                        raise LookupError(f"no version in the catalog matches policy {self.policy}")
+                self._latest = (version, None)
+            except asyncio.CancelledError:
+                raise
+            except (URLError, Exception) as e:
+                self._latest = (None, str(e) or type(e).__name__)
+        return self._latest[0]
+    
+    def get_latest_driver_version(self) -> Optional[str]:
+        """Fetch the version the update policy targets (by default the latest NVIDIA Linux driver)."""
+        if self._latest is None:
+            installed = self.get_driver_version() if self.policy.needs_installed else None
+            self._run(self.get_latest_driver_version_async(installed))
+        if self._latest is None:
+            self._latest = (None, f"timed out after {self.deadline:g}s")
+        
+        version, error = self._latest
+        if error:
+            print(f"⚠️  Could not fetch latest driver version: {error}")
+        return version
+    
+    async def check_status_async(self, fetch_latest: bool = True) -> CheckStatus:
+        """
+        Probe the local GPUs and look up the latest version concurrently,
+        all under one deadline. Whatever has not finished by then is
+        cancelled and reported as unknown.
+        """
+        tasks = [asyncio.ensure_future(self.probe_async())]
+        if fetch_latest:
+            if self.policy.needs_installed:
+                # The target depends on the installed branch: refresh the
+                # catalog alongside the probe and resolve once both are in
+                tasks.append(asyncio.ensure_future(self._refresh_catalog_once()))
+            else:
+                tasks.append(asyncio.ensure_future(self.get_latest_driver_version_async()))
+        
+        done, pending = await asyncio.wait(tasks, timeout=self.deadline)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        
+        probe_task = tasks[0]
+        snapshot = None
+        if probe_task in done and probe_task.exception() is None:
+            snapshot = probe_task.result()
+        if fetch_latest and self.policy.needs_installed and tasks[1] in done:
+            await self.get_latest_driver_version_async(snapshot.driver_version if snapshot else None)
+        if fetch_latest and self._latest is None:
+            self._latest = (None, f"timed out after {self.deadline:g}s")
+        
+        latest_version, latest_error = self._latest or (None, None)
+        comparison = None
+        if snapshot and snapshot.driver_version and latest_version:
+            try:
+                comparison = self.compare_versions(snapshot.driver_version, latest_version)
+            except InvalidVersionError:
+                pass
+        return CheckStatus(snapshot, latest_version, latest_error, comparison)
+    
+    def check_status(self, fetch_latest: bool = True) -> CheckStatus:
+        return asyncio.run(self.check_status_async(fetch_latest))
+    
+    def compare_versions(self, current: str, latest: str) -> int:
+        """
+        Compare two version strings.
+        Returns: 1 if latest > current, 0 if equal, -1 if current > latest
+        Raises InvalidVersionError if either is not a driver version.
+        """
+        current_key = version_key(current)
+        latest_key = version_key(latest)
+        return (latest_key > current_key) - (latest_key < current_key)
+    
+    def get_driver_filename(self, version: str) -> str:
+        """File name of the .run installer for a driver version."""
+        return f"NVIDIA-Linux-{self.arch}-{version}.run"
+    
+    def get_download_url(self, version: str, mirror: Optional[str] = None) -> str:
+        """Get the download URL for a specific driver version (on the first mirror by default)."""
+        return f"{mirror or self.mirrors[0]}/{version}/{self.get_driver_filename(version)}"
+    
+    def get_checksum_url(self, version: str, mirror: Optional[str] = None) -> str:
+        """URL of the .sha256sum file NVIDIA publishes next to each installer."""
+        return self.get_download_url(version, mirror) + '.sha256sum'
+    
+    @staticmethod
+    def parse_checksums(content: str, filename: str) -> Optional[str]:
+        """Find filename's SHA-256 in sha256sum-style content ('<hex>  <name>' lines)."""
+        for line in content.splitlines():
+            parts = line.split()
+            if not parts or not re.fullmatch(r'[0-9a-fA-F]{64}', parts[0]):
+                continue
+            if len(parts) == 1 or os.path.basename(parts[1].lstrip('*')) == filename:
+                return parts[0].lower()
+        return None
+    
+    def get_expected_sha256(self, version: str) -> Optional[str]:
+        """
+        Expected SHA-256 of the installer for version, from the configured
+        manifest (local path or URL) or else the published .sha256sum.
+        """
+        filename = self.get_driver_filename(version)
+        if not self.checksum_manifest:
+            def parse(body):
+                return self.parse_checksums(body.decode('utf-8', 'replace'), filename)
+            
+            try:
+                sha256 = self._run(self.race_metadata(f"{version}/{filename}.sha256sum", parse))
+            except (URLError, Exception) as e:
+                print(f"⚠️  Could not fetch checksum for {filename}: {e}")
+                return None
+            if sha256 is None:
+                print(f"⚠️  Could not fetch checksum for {filename}: timed out after {self.deadline:g}s")
+            return sha256
+        
+        source = self.checksum_manifest
+        try:
+            if '://' in source:
+                content = self._run(self.fetch_metadata(source), b'').decode('utf-8', 'replace')
+            else:
+                with open(source, encoding='utf-8') as f:
+                    content = f.read()
+        except (OSError, URLError, Exception) as e:
+            print(f"⚠️  Could not fetch checksum from {source}: {e}")
+            return None
+        
+        sha256 = self.parse_checksums(content, filename)
+        if sha256 is None:
+            print(f"⚠️  No checksum for {filename} in {source}")
+        return sha256
+    
+    def _download_attempt(self, url: str, part_path: str, digest: StreamingDigest) -> None:
+        """
+        Fetch url into part_path, resuming from its current size with a
+        Range request, and feed every byte to digest. Returns once the file
+        is complete; raises on any transfer error, leaving the partial file
+        in place for the next try.
+        """
+        offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+        headers = {
+            'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36'
+        }
+        if offset:
+            headers['Range'] = f"bytes={offset}-"
+        
+        req = Request(url, headers=headers)
+        try:
+            response = urlopen(req, timeout=300)
+        except HTTPError as e:
+            # 416: nothing left to send, the .part is already complete
+            total = _parse_content_range(e.headers.get('Content-Range', ''))[2]
+            if e.code == 416 and offset and total == offset:
+                digest.catch_up(part_path, offset)
+                return
+            if e.code == 416:
+                os.remove(part_path)
+            raise
+        
+        with response:
+            file_size = None
+            if response.status == 206:
+                start, _, file_size = _parse_content_range(response.headers.get('Content-Range', ''))
+                if start != offset:
+                    raise URLError(f"server resumed at byte {start}, expected {offset}")
+                mode = 'ab'
+            else:
+                # Server ignored the Range header: start over
+                offset = 0
+                mode = 'wb'
+                if response.headers.get('Content-Length'):
+                    file_size = int(response.headers['Content-Length'])
+            
+            if file_size:
+                print(f"File size: {file_size / (1024*1024):.1f} MB")
+            if offset:
+                print(f"Resuming at {offset / (1024*1024):.1f} MB")
+            
+            digest.catch_up(part_path, offset)
+            buffer = DownloadBuffer()
+            with ProgressReporter(file_size, initial=offset) as progress, open(part_path, mode) as f:
+                counters = progress.counters
+                while True:
+                    chunk = buffer.read_from(response)
+                    if not chunk:
+                        break
+                    f.write(chunk)
+                    digest.update(chunk)
+                    counters[0] += len(chunk)
+            
+            downloaded = progress.done
+            if file_size and downloaded != file_size:
+                raise URLError(f"connection closed after {downloaded} of {file_size} bytes")
     
-    def get_driver_version(self) -> Optional[str]:
-        """Get NVIDIA driver version."""
+    def _backoff_delay(self, attempt: int) -> float:
+        """Full-jitter exponential backoff before retry number attempt + 1."""
+        return random.uniform(0, min(self.RETRY_BACKOFF_MAX, self.RETRY_BACKOFF_BASE * 2 ** attempt))
+    
+    @staticmethod
+    def _is_retryable(error: Exception) -> bool:
+        """Client errors such as 404 won't fix themselves; everything else might."""
+        if isinstance(error, HTTPError):
+            return error.code >= 500 or error.code in (408, 416, 429)
+        return True
+    
+    def _probe_ranges(self, url: str) -> Optional[int]:
+        """HEAD the URL; return its Content-Length if byte ranges are supported."""
+        headers = {
+            'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36'
+        }
         try:
-            result = subprocess.run(
-                ['nvidia-smi', '--query-gpu=driver_version', '--format=csv,noheader'],
-                capture_output=True,
-                text=True,
-                timeout=5
-            )
-            if result.returncode == 0:
-                return result.stdout.strip()
-            return None
-        except (FileNotFoundError, subprocess.TimeoutExpired):
+            with urlopen(Request(url, headers=headers, method='HEAD'), timeout=30) as response:
+                if response.headers.get('Accept-Ranges', '').lower() != 'bytes':
+                    return None
+                length = response.headers.get('Content-Length')
+                return int(length) if length else None
+        except (URLError, Exception):
             return None
     
-    def get_gpu_info(self) -> Dict[str, str]:
-        """Get detailed GPU information."""
-        info = {}
+    def _fetch_segment(self, url: str, fd: int, start: int, end: int,
+                       counters: List[int], slot: int, retries: int) -> None:
+        """
+        Fetch bytes start..end (inclusive) into fd with os.pwrite. Retries
+        resume from the last byte written; counters[slot] tracks progress
+        and is only ever written by this worker.
+        """
+        headers = {
+            'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36'
+        }
+        position = start
+        buffer = DownloadBuffer()
+        for attempt in range(retries + 1):
+            try:
+                headers['Range'] = f"bytes={position}-{end}"
+                with urlopen(Request(url, headers=headers), timeout=300) as response:
+                    if response.status != 206 or \
+                            _parse_content_range(response.headers.get('Content-Range', ''))[0] != position:
+                        raise URLError("server did not honour the byte range")
+                    while position <= end:
+                        chunk = buffer.read_from(response, end - position + 1)
+                        if not chunk:
+                            break
+                        while chunk:
+                            written = os.pwrite(fd, chunk, position)
+                            chunk = chunk[written:]
+                            position += written
+                            counters[slot] += written
+                if position > end:
+                    return
+                error = URLError(f"connection closed at byte {position} of segment {start}-{end}")
+            except (URLError, Exception) as e:
+                if not self._is_retryable(e):
+                    raise
+                error = e
+            if attempt < retries:
+                time.sleep(self._backoff_delay(attempt))
+        raise error
+    
+    def _download_segmented(self, url: str, part_path: str, total: int,
+                            segments: int, retries: int) -> None:
+        """Fetch total bytes as concurrent byte ranges into a preallocated file."""
+        fd = os.open(part_path, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o644)
         try:
-            # Get GPU name
-            result = subprocess.run(
-                ['nvidia-smi', '--query-gpu=name', '--format=csv,noheader'],
-                capture_output=True,
-                text=True,
-                timeout=5
-            )
-            if result.returncode == 0:
-                info['gpu_name'] = result.stdout.strip()
+            try:
+                os.posix_fallocate(fd, 0, total)
+            except (AttributeError, OSError):
+                os.ftruncate(fd, total)
             
-            # Get CUDA version
-            result = subprocess.run(
-                ['nvidia-smi', '--query-gpu=cuda_version', '--format=csv,noheader'],
-                capture_output=True,
-                text=True,
-                timeout=5
-            )
-            if result.returncode == 0:
-                info['cuda_version'] = result.stdout.strip()
+            segment_size = -(-total // segments)
+            ranges = [(start, min(start + segment_size, total) - 1)
+                      for start in range(0, total, segment_size)]
             
-            # Get memory info
-            result = subprocess.run(
-                ['nvidia-smi', '--query-gpu=memory.total,memory.used,memory.free', '--format=csv,noheader'],
-                capture_output=True,
-                text=True,
-                timeout=5
-            )
-            if result.returncode == 0:
-                memory_parts = result.stdout.strip().split(', ')
-                if len(memory_parts) == 3:
-                    info['memory_total'] = memory_parts[0]
-                    info['memory_used'] = memory_parts[1]
-                    info['memory_free'] = memory_parts[2]
+            with ProgressReporter(total, slots=len(ranges)) as progress, \
+                    ThreadPoolExecutor(max_workers=len(ranges)) as pool:
+                futures = [
+                    pool.submit(self._fetch_segment, url, fd, start, end, progress.counters, slot, retries)
+                    for slot, (start, end) in enumerate(ranges)
+                ]
+                wait(futures)
+            for future in futures:
+                future.result()
             
-        except (FileNotFoundError, subprocess.TimeoutExpired):
-            pass
+            if progress.done != total:
+                raise URLError(f"received {progress.done} of {total} bytes")
+        finally:
+            os.close(fd)
+    
+    def _finish_download(self, part_path: str, dest_path: str) -> None:
+        os.replace(part_path, dest_path)
+        print(f"✅ Downloaded to: {dest_path}")
         
-        return info
+        # Make executable (unless it already is: a file hard-linked from a
+        # local mirror may belong to someone else)
+        mode = os.stat(dest_path).st_mode
+        if mode | self.EXECUTABLE_BITS != mode:
+            os.chmod(dest_path, mode | self.EXECUTABLE_BITS)
     
-    def get_latest_driver_version(self) -> Optional[str]:
-        """Fetch the latest NVIDIA Linux driver version from NVIDIA's server."""
-        try:
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36'
-            }
+    def _verify_and_finish(self, part_path: str, dest_path: str, digest: StreamingDigest,
+                           expected_sha256: Optional[str]) -> Optional[str]:
+        """Check the digest, then move the file into place. Returns the SHA-256."""
+        sha256 = digest.hexdigest()
+        if expected_sha256:
+            if sha256 != expected_sha256.lower():
+                os.remove(part_path)
+                print("❌ Checksum mismatch - the download is corrupted and was discarded")
+                print(f"   expected SHA-256: {expected_sha256.lower()}")
+                print(f"   actual SHA-256:   {sha256}")
+                return None
+            print("✅ SHA-256 checksum verified")
+        self._finish_download(part_path, dest_path)
+        return sha256
+    
+    def fetch_driver(self, url: str, dest_path: str, expected_sha256: Optional[str] = None,
+                     retries: int = DOWNLOAD_RETRIES, segments: Optional[int] = None) -> Optional[str]:
+        """
+        Download driver file from URL. Data goes to dest_path + '.part',
+        which survives failures and later runs; each retry resumes it
+        with an HTTP Range request after an exponential backoff with jitter.
+        
+        With segments > 1 and a server that accepts byte ranges, the file
+        is split into that many ranges fetched concurrently. Segments retry
+        independently, but a failed segmented download is not resumable
+        across runs (the preallocated .part has holes) and is discarded.
+        
+        The SHA-256 is computed while the data streams in (segmented
+        downloads arrive out of order and are hashed once assembled) and,
+        if expected_sha256 is given, must match it. Returns the SHA-256 of
+        the finished file, or None on failure.
+        """
+        if urlsplit(url).scheme == 'file':
+            return self._fetch_local(url2pathname(urlsplit(url).path), dest_path, expected_sha256)
+        
+        print(f"📥 Downloading driver...")
+        print(f"URL: {url}")
+        print("This may take several minutes...")
+        
+        part_path = dest_path + '.part'
+        digest = StreamingDigest()
+        segments = segments or self.download_segments
+        if segments > 1:
+            total = self._probe_ranges(url)
+            if total is None:
+                print("Server does not accept byte ranges; using a single stream")
+            elif total >= segments * self.MIN_SEGMENT_SIZE:
+                print(f"File size: {total / (1024*1024):.1f} MB")
+                print(f"Downloading in {segments} parallel segments")
+                try:
+                    self._download_segmented(url, part_path, total, segments, retries)
+                    digest.catch_up(part_path, total)
+                    return self._verify_and_finish(part_path, dest_path, digest, expected_sha256)
+                except (URLError, Exception) as e:
+                    if os.path.exists(part_path):
+                        os.remove(part_path)
+                    print(f"❌ Download failed: {e}")
+                    return None
+        
+        for attempt in range(retries + 1):
+            try:
+                self._download_attempt(url, part_path, digest)
+                return self._verify_and_finish(part_path, dest_path, digest, expected_sha256)
+            except (URLError, Exception) as e:
+                if not self._is_retryable(e):
+                    print(f"❌ Download failed: {e}")
+                    return None
+                error = e
             
-            req = Request(self.NVIDIA_LINUX_LATEST_URL, headers=headers)
-            with urlopen(req, timeout=10) as response:
-                content = response.read().decode('utf-8').strip()
-                # Format: "580.105.08 580.105.08/NVIDIA-Linux-x86_64-580.105.08.run"
-                # First part is the version
-                parts = content.split()
-                if parts:
-                    return parts[0]
-                
-        except (URLError, Exception) as e:
-            print(f"⚠️  Could not fetch latest driver version: {e}")
+            if attempt == retries:
+                break
+            delay = self._backoff_delay(attempt)
+            print(f"⚠️  Download interrupted ({error}); retrying in {delay:.1f}s "
+                  f"(attempt {attempt + 2}/{retries + 1})")
+            time.sleep(delay)
         
+        print(f"❌ Download failed: {error}")
+        if os.path.exists(part_path):
+            print(f"Partial download kept at {part_path}; the next run will resume it.")
         return None
     
-    def compare_versions(self, current: str, latest: str) -> int:
+    def _fetch_local(self, source: str, dest_path: str, expected_sha256: Optional[str]) -> Optional[str]:
         """
-        Compare two version strings.
-        Returns: 1 if latest > current, 0 if equal, -1 if current > latest
+        fetch_driver for a file:// mirror: hard link or in-kernel copy, then
+        verify. Only an installer that is already executable is linked;
+        making a linked file executable would chmod the mirror's own copy,
+        which may not even be ours to change.
         """
-        def version_tuple(v):
-            # Remove any non-numeric parts and split
-            parts = re.findall(r'\d+', v)
-            return tuple(map(int, parts))
-        
+        print(f"📂 Copying driver from local mirror: {source}")
+        part_path = dest_path + '.part'
+        digest = StreamingDigest()
         try:
-            current_tuple = version_tuple(current)
-            latest_tuple = version_tuple(latest)
-            
-            if latest_tuple > current_tuple:
-                return 1
-            elif latest_tuple == current_tuple:
-                return 0
-            else:
-                return -1
-        except (ValueError, AttributeError):
-            return 0
+            if os.path.exists(part_path):
+                os.remove(part_path)
+            executable = stat.S_IMODE(os.stat(source).st_mode) & self.EXECUTABLE_BITS == self.EXECUTABLE_BITS
+            linked = copy_file(source, part_path, link=executable)
+            digest.catch_up(part_path, os.path.getsize(part_path))
+        except OSError as e:
+            if os.path.exists(part_path):
+                os.remove(part_path)
+            print(f"❌ Copy failed: {e}")
+            return None
+        if linked:
+            print("Hard-linked (same filesystem, no data copied)")
+        try:
+            return self._verify_and_finish(part_path, dest_path, digest, expected_sha256)
+        except OSError as e:
+            print(f"❌ Could not move the installer into place: {e}")
+            return None
+    
+    def download_driver(self, url: str, dest_path: str, expected_sha256: Optional[str] = None) -> bool:
+        """Download driver file from URL. See fetch_driver."""
+        return self.fetch_driver(url, dest_path, expected_sha256) is not None
     
-    def get_download_url(self, version: str) -> str:
-        """Get the download URL for a specific driver version."""
-        return f"{self.NVIDIA_LINUX_DOWNLOAD_BASE}/{version}/NVIDIA-Linux-x86_64-{version}.run"
+    def confirm(self, question: str) -> bool:
+        """Ask a yes/no question; with assume_yes the answer is yes without reading stdin."""
+        if self.assume_yes:
+            print(f"{question} (yes/no): yes (--yes)")
+            return True
+        return input(f"{question} (yes/no): ").strip().lower() == 'yes'
     
-    def download_driver(self, url: str, dest_path: str) -> bool:
-        """Download driver file from URL."""
+    def installer_command(self, driver_path: str) -> List[str]:
+        """
+        The sudo command line that runs an installer: silently under
+        assume_yes, with the module build's concurrency level, and through
+        ccache if enabled and installed.
+        """
+        command = ['sudo']
+        if self.assume_yes:
+            # sudo -n fails instead of waiting for a password nobody will type
+            command.append('-n')
+        if self.ccache_dir is not None:
+            # sudo resets the environment, so pass CC and CCACHE_DIR through env
+            command += ['env', f"CC={self.CCACHE_CC}", f"CCACHE_DIR={self.ccache_dir}"]
+        command += [driver_path, f"--concurrency-level={self.concurrency_level}"]
+        if self.assume_yes:
+            command += self.SILENT_INSTALLER_FLAGS
+        return command
+    
+    def record_build_time(self, version: str, success: bool) -> None:
+        """
+        Append the last install phase, which the kernel module build
+        dominates, to build-times.jsonl with what it was built for and how,
+        so ccache and concurrency-level settings can be compared over time.
+        """
+        record = {
+            'time': int(time.time()),
+            'version': version,
+            'arch': self.arch,
+            'kernel': platform.release(),
+            'concurrency_level': self.concurrency_level,
+            'ccache': self.ccache_dir is not None,
+            'staged': self.staged_installer(version) is not None,
+            'seconds': round(self.phase_times['install'], 1),
+            'success': success,
+        }
         try:
-            print(f"📥 Downloading driver...")
-            print(f"URL: {url}")
-            print("This may take several minutes...")
-            
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36'
-            }
-            
-            req = Request(url, headers=headers)
-            with urlopen(req, timeout=300) as response:
-                file_size = response.headers.get('Content-Length')
-                if file_size:
-                    file_size = int(file_size)
-                    print(f"File size: {file_size / (1024*1024):.1f} MB")
-                
-                with open(dest_path, 'wb') as f:
-                    chunk_size = 8192
-                    downloaded = 0
-                    while True:
-                        chunk = response.read(chunk_size)
-                        if not chunk:
-                            break
-                        f.write(chunk)
-                        downloaded += len(chunk)
-                        if file_size:
-                            progress = (downloaded / file_size) * 100
-                            print(f"\rProgress: {progress:.1f}%", end='', flush=True)
-                
-                print()  # New line after progress
-                print(f"✅ Downloaded to: {dest_path}")
-                
-                # Make executable
-                os.chmod(dest_path, os.stat(dest_path).st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
-                return True
-                
-        except (URLError, Exception) as e:
-            print(f"❌ Download failed: {e}")
-            return False
+            os.makedirs(os.path.dirname(self.build_log), exist_ok=True)
+            with open(self.build_log, 'a') as f:
+                f.write(json.dumps(record, sort_keys=True) + '\n')
+        except OSError as e:
+            print(f"⚠️  Could not record the build time in {self.build_log}: {e}")
     
-    def install_driver(self, driver_path: str) -> bool:
-        """Execute the driver installer."""
+    def install_outcome(self, version: str) -> int:
+        """
+        Exit code after installing version: EXIT_UPDATED if the kernel is
+        already running its module, EXIT_REBOOT_REQUIRED if the old module
+        (or none) is still loaded, per /sys/module/nvidia/version.
+        """
+        loaded = ProcfsBackend(self.root).read_driver_version()
+        try:
+            if loaded and parse_version(loaded) == parse_version(version):
+                print(f"✅ Driver {version} is installed and loaded")
+                return self.EXIT_UPDATED
+        except InvalidVersionError:
+            pass
+        print(f"⚠️  Reboot required: the kernel is running {loaded or 'no NVIDIA module'}, installed {version}")
+        return self.EXIT_REBOOT_REQUIRED
+    
+    def install_driver(self, driver_path: str, cwd: Optional[str] = None) -> bool:
+        """Execute the driver installer (a .run, or a staged tree's nvidia-installer run in cwd)."""
+        command = self.installer_command(driver_path)
         print()
+        if self.ccache_missing:
+            print("⚠️  --ccache: ccache is not installed, building without it")
         print("⚠️  Driver installation requires root privileges")
-        print(f"The installer will run: sudo {driver_path}")
+        print(f"The installer will run: {' '.join(shlex.quote(arg) for arg in command)}")
         print()
-        response = input("Proceed with installation? (yes/no): ").strip().lower()
-        
-        if response != 'yes':
+        if not self.confirm("Proceed with installation?"):
             print("Installation cancelled.")
             return False
         
@@ -201,16 +2406,19 @@ class NvidiaDriverCheck:
             print("Note: This will likely require X server to be stopped.")
             print()
             
+            if self.ccache_dir is not None:
+                os.makedirs(self.ccache_dir, exist_ok=True)
             # Run the installer with sudo
-            result = subprocess.run(
-                ['sudo', driver_path],
-                timeout=600  # 10 minute timeout for installation
-            )
+            with self.timed_phase('install'):
+                result = subprocess.run(
+                    command,
+                    cwd=cwd,
+                    timeout=600  # 10 minute timeout for installation
+                )
             
             if result.returncode == 0:
                 print()
                 print("✅ Driver installation completed successfully!")
-                print("⚠️  You may need to reboot your system for changes to take effect.")
                 return True
             else:
                 print(f"❌ Installation failed with exit code: {result.returncode}")
@@ -223,20 +2431,492 @@ class NvidiaDriverCheck:
             print(f"❌ Installation error: {e}")
             return False
     
-    def _download_and_install_driver(self, version: str) -> bool:
-        """Download and install a specific driver version. Returns True on success."""
-        download_url = self.get_download_url(version)
+    def get_driver_package(self, version: str) -> Optional[str]:
+        """
+        Path of a verified installer for version: from the package cache if
+        present (no network at all), otherwise downloaded into it.
+        """
+        filename = self.get_driver_filename(version)
+        cached_path = self.package_cache.lookup(version, filename)
+        if cached_path:
+            print(f"📦 Using cached driver package: {cached_path}")
+            return cached_path
+        
+        expected_sha256 = self.get_expected_sha256(version)
+        if expected_sha256 is None:
+            if self.assume_yes and not self.allow_unverified:
+                # Nobody is watching for the warning below, and this runs as root
+                print("❌ No checksum to verify the download against; refusing to continue "
+                      "unattended (pass --allow-unverified to override)")
+                return None
+            print("⚠️  The download will not be integrity-checked")
+        
+        # An interrupted download leaves its .part file here so the next
+        # run can resume it
+        download_path = os.path.join(self.package_cache.incoming_dir, filename)
         
-        with tempfile.TemporaryDirectory() as temp_dir:
-            driver_filename = f"NVIDIA-Linux-x86_64-{version}.run"
-            driver_path = os.path.join(temp_dir, driver_filename)
+        # Single flight: concurrent runs (cron, systemd timer, an operator)
+        # wait here while the first one downloads, then reuse its file
+        waiting = f"⏳ Another run is downloading {filename}; waiting for it to finish..."
+        with file_lock(download_path + '.lock', waiting):
+            cached_path = self.package_cache.lookup(version, filename, expected_sha256)
+            if cached_path:
+                print(f"📦 Using driver package downloaded by another run: {cached_path}")
+                return cached_path
             
-            if self.download_driver(download_url, driver_path):
-                return self.install_driver(driver_path)
+            sha256 = self._fetch_from_peers(version, download_path, expected_sha256)
+            if sha256 is None:
+                sha256 = self._fetch_from_mirrors(version, download_path, expected_sha256)
+            if sha256 is None:
+                return None
+            return self.package_cache.add(version, sha256, download_path)
+    
+    def _fetch_from_peers(self, version: str, download_path: str,
+                          expected_sha256: Optional[str]) -> Optional[str]:
+        """
+        Try each peer cache in turn, without retries: a peer that lacks the
+        file or is down should cost a round trip, not a backoff. Peers are
+        only used when the checksum is known, since it is what makes their
+        bytes trustworthy.
+        """
+        if not self.peers:
+            return None
+        if expected_sha256 is None:
+            print("⚠️  Not using peer caches without a checksum to verify against")
+            return None
+        filename = self.get_driver_filename(version)
+        for peer in self.peers:
+            url = f"{peer}/{self.linux_directory}/{version}/{filename}"
+            sha256 = self.fetch_driver(url, download_path, expected_sha256, retries=0)
+            if sha256 is not None:
+                return sha256
+        print("Falling back to NVIDIA's download server")
+        return None
+    
+    def _probe_mirror(self, url: str) -> float:
+        """Seconds to fetch the first MIRROR_PROBE_SIZE bytes of url. Raises on failure."""
+        headers = {
+            'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36',
+            'Range': f"bytes=0-{self.MIRROR_PROBE_SIZE - 1}",
+        }
+        started = time.monotonic()
+        with urlopen(Request(url, headers=headers), timeout=self.MIRROR_PROBE_TIMEOUT) as response:
+            # Bounded read: a server that ignores Range still costs only the probe size
+            response.read(self.MIRROR_PROBE_SIZE)
+        return time.monotonic() - started
+    
+    def rank_mirrors(self, version: str) -> List[str]:
+        """
+        Mirrors in the order to download version from: every mirror not
+        cooling down is probed concurrently and sorted by probe time, then
+        come failed and cooling-down mirrors (configured order breaks ties).
+        Results are recorded in the mirror health file.
+        """
+        if len(self.mirrors) == 1:
+            return list(self.mirrors)
+        
+        candidates = [m for m in self.mirrors if not self.mirror_health.cooling_down(m)]
+        timings = {}
+        executor = ThreadPoolExecutor(max_workers=len(candidates) or 1)
+        try:
+            futures = {
+                executor.submit(self._probe_mirror, self.get_download_url(version, mirror)): mirror
+                for mirror in candidates
+            }
+            wait(futures, timeout=self.MIRROR_PROBE_TIMEOUT * 2)
+        finally:
+            # Don't wait for probes still trickling in past the timeout
+            executor.shutdown(wait=False)
+        for future, mirror in futures.items():
+            if not future.done():
+                self.mirror_health.record_failure(mirror)
+            elif future.exception() is None:
+                timings[mirror] = future.result()
+                self.mirror_health.record_success(mirror, timings[mirror])
+            elif self._is_mirror_failure(future.exception()):
+                self.mirror_health.record_failure(mirror)
+        
+        ranked = sorted(
+            self.mirrors,
+            key=lambda m: (m not in timings, timings.get(m, 0.0), self.mirrors.index(m))
+        )
+        if timings:
+            print(f"🏁 Fastest mirror: {ranked[0]} ({timings[ranked[0]] * 1000:.0f} ms probe)")
+        return ranked
+    
+    def _fetch_from_mirrors(self, version: str, download_path: str,
+                            expected_sha256: Optional[str]) -> Optional[str]:
+        """
+        Download from the best-ranked mirror, falling through to the next
+        on failure. Only the last mirror gets the full retry budget; the
+        others get one retry before we move on.
+        """
+        mirrors = self.rank_mirrors(version)
+        for index, mirror in enumerate(mirrors):
+            last = index == len(mirrors) - 1
+            sha256 = self.fetch_driver(
+                self.get_download_url(version, mirror), download_path, expected_sha256,
+                retries=self.DOWNLOAD_RETRIES if last else 1
+            )
+            if sha256 is not None:
+                self.mirror_health.record_success(mirror)
+                return sha256
+            if len(mirrors) > 1:
+                self.mirror_health.record_failure(mirror)
+            if not last:
+                print(f"Trying the next mirror: {mirrors[index + 1]}")
+        return None
+    
+    def show_catalog(self, refresh: bool = True, branch: Optional[int] = None,
+                     newer_than: Optional[str] = None, exists: Optional[str] = None) -> int:
+        """
+        The "catalog" subcommand: refresh the version catalog, then answer
+        one query from it (or summarize it by branch). Returns the exit code.
+        """
+        if refresh:
+            try:
+                added = self.refresh_catalog()
+            except (URLError, Exception) as e:
+                print(f"⚠️  Could not refresh the version catalog: {e}")
+            else:
+                if added is None:
+                    print(f"⚠️  Could not refresh the version catalog: timed out after {self.deadline:g}s")
+                elif added:
+                    print(f"📚 {len(added)} new version(s) in the catalog")
+        
+        if not self.catalog.versions:
+            print("❌ The version catalog is empty")
+            return 1
+        
+        if exists:
+            if exists in self.catalog:
+                print(f"✅ {exists} is available")
+                return 0
+            print(f"❌ {exists} is not in the catalog")
+            return 1
+        if branch is not None:
+            version = self.catalog.latest_in_branch(branch)
+            if version is None:
+                print(f"❌ No {branch} branch in the catalog")
+                return 1
+            print(version)
+            return 0
+        if newer_than:
+            try:
+                versions = self.catalog.newer_than(newer_than)
+            except InvalidVersionError as e:
+                print(f"❌ {e}")
+                return 1
+            for version in versions:
+                print(version)
+            return 0
+        
+        rows = [('Branch', 'Versions', 'Latest')]
+        for major, versions in sorted(self.catalog.branches().items(), reverse=True):
+            rows.append((str(major), str(len(versions)), versions[-1]))
+        widths = [max(len(row[i]) for row in rows) for i in range(3)]
+        for row in rows:
+            print('  ' + '  '.join(cell.ljust(width) for cell, width in zip(row, widths)).rstrip())
+        print(f"{len(self.catalog)} versions, latest {self.catalog.latest()}")
+        return 0
+    
+    def plan_updates(self, lines: List[str]) -> int:
+        """
+        The "plan" subcommand: evaluate the update policy for a whole fleet
+        in one batch. Each line is "VERSION" or "HOST VERSION" (blank lines
+        and # comments are skipped); prints one row per host. Returns the
+        exit code.
+        """
+        hosts = []
+        for number, line in enumerate(lines, 1):
+            fields = line.split('#', 1)[0].split()
+            if not fields:
+                continue
+            if len(fields) == 1:
+                hosts.append((f"line {number}", fields[0]))
+            else:
+                hosts.append((fields[0], fields[-1]))
+        
+        if self.policy.kind == 'latest':
+            target = self.get_latest_driver_version()
+            if target is None:
+                print("❌ Could not determine the latest driver version")
+                return 1
+            targets = [target] * len(hosts)
+        else:
+            self._run(self._refresh_catalog_once())
+            if isinstance(self._catalog_refresh, Exception):
+                print(f"⚠️  Could not refresh the version catalog: {self._catalog_refresh}")
+            if not self.catalog.versions:
+                print("❌ The version catalog is empty")
+                return 1
+            targets = self.policy.plan(self.catalog, [installed for _, installed in hosts])
+        
+        actions = {1: 'update', 0: 'current', -1: 'ahead'}
+        counts = {}
+        rows = [('Host', 'Installed', 'Target', 'Action')]
+        for (host, installed), target in zip(hosts, targets):
+            if not VERSION_PATTERN.fullmatch(installed):
+                action = 'invalid'
+            elif target:
+                action = actions[self.compare_versions(installed, target)]
             else:
+                action = 'no match'
+            counts[action] = counts.get(action, 0) + 1
+            rows.append((host, installed, target or '-', action))
+        
+        widths = [max(len(row[i]) for row in rows) for i in range(4)]
+        for row in rows:
+            print('  ' + '  '.join(cell.ljust(width) for cell, width in zip(row, widths)).rstrip())
+        summary = ', '.join(f"{count} {action}" for action, count in sorted(counts.items()))
+        print(f"{len(hosts)} hosts under policy {self.policy}: {summary or 'nothing to do'}")
+        return 0
+    
+    def _resolve_for_archs(self, archs: List[str], version: Optional[str] = None):
+        """
+        (checker, target version, error) per architecture. Without an
+        explicit version, the policy lookups for all architectures run
+        concurrently under one deadline.
+        """
+        checkers = [self.for_arch(arch) for arch in archs]
+        if version is not None:
+            return [(checker, version, None) for checker in checkers]
+        
+        async def resolve():
+            await asyncio.gather(*(checker.get_latest_driver_version_async() for checker in checkers))
+        
+        self._run(resolve())
+        return [
+            (checker,) + (checker._latest or (None, f"timed out after {self.deadline:g}s"))
+            for checker in checkers
+        ]
+    
+    def prefetch(self, archs: List[str], version: Optional[str] = None) -> int:
+        """
+        The "prefetch" subcommand: put the update policy's target (or the
+        given version) for each architecture into the package cache, e.g.
+        on the host that serves a mixed x86_64/aarch64 fleet. The version
+        lookups for all architectures run concurrently; the downloads then
+        go one after another. Returns the exit code.
+        """
+        failures = 0
+        for checker, target, error in self._resolve_for_archs(archs, version):
+            print()
+            if target is None:
+                print(f"⚠️  {checker.linux_directory}: could not determine the version to prefetch: {error}")
+                failures += 1
+                continue
+            print(f"📦 {checker.linux_directory}: {target}")
+            if checker.get_driver_package(target) is None:
+                failures += 1
+        return 1 if failures else 0
+    
+    def stage(self, archs: List[str], version: Optional[str] = None) -> int:
+        """
+        The "stage" subcommand, run while the node still serves jobs:
+        download the update policy's target (or the given version) for each
+        architecture and pre-extract it, so the install inside the
+        maintenance window skips both steps. Returns the exit code.
+        """
+        failures = 0
+        for checker, target, error in self._resolve_for_archs(archs, version):
+            print()
+            if target is None:
+                print(f"⚠️  {checker.linux_directory}: could not determine the version to stage: {error}")
+                failures += 1
+                continue
+            print(f"📦 {checker.linux_directory}: {target}")
+            if checker.stage_driver(target) is None:
+                failures += 1
+        return 1 if failures else 0
+    
+    def sync_mirror(self, directory: str, archs: List[str], versions: Optional[List[str]] = None) -> int:
+        """
+        The "mirror sync" subcommand, run on a connected host: bring a local
+        tree in NVIDIA's layout up to date so air-gapped hosts can use it as
+        --mirror file://DIRECTORY. For each architecture the policy target
+        (or the given versions) is added with its .sha256sum, versions
+        already in the tree are skipped, and latest.txt is rewritten to
+        name the newest version present. Installers pass through the
+        package cache, so each is downloaded once and then hard-linked or
+        copied in-kernel. Returns the exit code.
+        """
+        if urlsplit(directory).scheme == 'file':
+            directory = url2pathname(urlsplit(directory).path)
+        
+        failures = 0
+        for version in versions or [None]:
+            for checker, target, error in self._resolve_for_archs(archs, version):
+                arch_dir = os.path.join(directory, checker.linux_directory)
+                print()
+                if target is None:
+                    print(f"⚠️  {checker.linux_directory}: could not determine the version to sync: {error}")
+                    failures += 1
+                elif not checker._sync_version(arch_dir, target):
+                    failures += 1
+        
+        for arch in archs:
+            checker = self.for_arch(arch)
+            latest = checker._write_mirror_latest(os.path.join(directory, checker.linux_directory))
+            if latest:
+                print(f"📌 {checker.linux_directory}/latest.txt: {latest}")
+        return 1 if failures else 0
+    
+    def _sync_version(self, arch_dir: str, version: str) -> bool:
+        """Add one version's installer and .sha256sum to a mirror tree unless already there."""
+        filename = self.get_driver_filename(version)
+        version_dir = os.path.join(arch_dir, version)
+        dest_path = os.path.join(version_dir, filename)
+        checksum_path = dest_path + '.sha256sum'
+        
+        try:
+            with open(checksum_path, encoding='utf-8') as f:
+                present = self.parse_checksums(f.read(), filename) is not None and os.path.exists(dest_path)
+        except OSError:
+            present = False
+        if present:
+            print(f"✓ {self.linux_directory}/{version} is already in the mirror")
+            return True
+        
+        package_path = self.get_driver_package(version)
+        if package_path is None:
+            return False
+        # The package cache is content-addressed: the directory name is the SHA-256
+        sha256 = os.path.basename(os.path.dirname(package_path))
+        try:
+            os.makedirs(version_dir, exist_ok=True)
+            part_path = dest_path + '.part'
+            if os.path.exists(part_path):
+                os.remove(part_path)
+            copy_file(package_path, part_path)
+            os.replace(part_path, dest_path)
+            write_file_atomic(checksum_path, f"{sha256}  {filename}\n".encode('utf-8'))
+        except OSError as e:
+            print(f"❌ Could not add {filename} to the mirror: {e}")
+            return False
+        print(f"✅ Added {self.linux_directory}/{version}/{filename} to the mirror")
+        return True
+    
+    def _write_mirror_latest(self, arch_dir: str) -> Optional[str]:
+        """Point arch_dir/latest.txt at the newest version with an installer in the tree."""
+        try:
+            names = os.listdir(arch_dir)
+        except OSError:
+            return None
+        present = [
+            name for name in names
+            if VERSION_PATTERN.fullmatch(name)
+            and os.path.exists(os.path.join(arch_dir, name, self.get_driver_filename(name)))
+        ]
+        latest = max_version(present)
+        if latest:
+            line = f"{latest} {latest}/{self.get_driver_filename(latest)}\n"
+            write_file_atomic(os.path.join(arch_dir, 'latest.txt'), line.encode('utf-8'))
+        return latest
+    
+    def serve(self, bind: str = '', port: int = DEFAULT_SERVE_PORT) -> int:
+        """Serve the package cache to peers until interrupted."""
+        handler = type('Handler', (PackageCacheRequestHandler,), {'package_cache': self.package_cache})
+        with ThreadingHTTPServer((bind, port), handler) as server:
+            host, port = server.server_address[:2]
+            print(f"📡 Serving {self.package_cache.directory} on http://{host or '0.0.0.0'}:{port}/")
+            try:
+                server.serve_forever()
+            except KeyboardInterrupt:
+                print()
+        return 0
+    
+    @contextlib.contextmanager
+    def timed_phase(self, phase: str):
+        """Time the block as one install phase: print it and keep it in phase_times."""
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.phase_times[phase] = time.monotonic() - started
+            print(f"⏱️  {phase}: {self.phase_times[phase]:.1f}s")
+    
+    def staging_path(self, version: str) -> str:
+        """Where version's installer is pre-extracted: <cache>/staging/Linux-<arch>/<version>."""
+        return os.path.join(self.cache_dir, 'staging', self.linux_directory, version)
+    
+    def staged_installer(self, version: str) -> Optional[str]:
+        """The nvidia-installer of version's staged tree, or None if it is not staged."""
+        installer = os.path.join(self.staging_path(version), self.STAGED_INSTALLER)
+        return installer if os.access(installer, os.X_OK) else None
+    
+    def stage_driver(self, version: str) -> Optional[str]:
+        """
+        Download version and unpack it with --extract-only into its staging
+        directory, so that installing it later only builds and installs the
+        kernel module. A tree appears by atomic rename once extraction has
+        succeeded. Returns the staged nvidia-installer, or None.
+        """
+        staging_path = self.staging_path(version)
+        with file_lock(staging_path + '.lock', f"⏳ Waiting for another run staging {version}..."):
+            installer = self.staged_installer(version)
+            if installer:
+                print(f"📂 Already staged: {staging_path}")
+                return installer
+            
+            with self.timed_phase('download'):
+                driver_path = self.get_driver_package(version)
+            if driver_path is None:
+                return None
+            
+            # Unpack next to the final directory, so the rename stays on one filesystem
+            extract_dir = tempfile.mkdtemp(prefix=f".{version}.", dir=os.path.dirname(staging_path))
+            try:
+                tree = os.path.join(extract_dir, version)
+                with self.timed_phase('extract'):
+                    result = subprocess.run(
+                        [driver_path, '--extract-only', '--target', tree],
+                        timeout=600
+                    )
+                if result.returncode != 0:
+                    print(f"❌ Extraction failed with exit code: {result.returncode}")
+                    return None
+                shutil.rmtree(staging_path, ignore_errors=True)
+                os.replace(tree, staging_path)
+            except (OSError, subprocess.TimeoutExpired) as e:
+                print(f"❌ Extraction error: {e}")
+                return None
+            finally:
+                shutil.rmtree(extract_dir, ignore_errors=True)
+        
+        print(f"📂 Staged {version} in {staging_path}")
+        return self.staged_installer(version)
+    
+    def _download_and_install_driver(self, version: str) -> bool:
+        """
+        Install a specific driver version: from its staged tree if "stage"
+        prepared one, otherwise from the (downloaded) .run. Returns True on
+        success.
+        """
+        installer = self.staged_installer(version)
+        if installer:
+            print(f"📂 Using staged installer tree: {os.path.dirname(installer)}")
+            driver_path, cwd = installer, os.path.dirname(installer)
+        else:
+            # Most likely "stage" ran with another --cache-dir (sudo resets HOME)
+            print(f"ℹ️  No staged tree for {version} in {self.staging_path(version)}; "
+                  f"downloading and extracting now")
+            with self.timed_phase('download'):
+                driver_path = self.get_driver_package(version)
+            if driver_path is None:
                 print("❌ Download failed. Please try manually:")
                 print("Visit: https://www.nvidia.com/Download/index.aspx")
                 return False
+            cwd = None
+        
+        self.phase_times.pop('install', None)
+        success = self.install_driver(driver_path, cwd=cwd)
+        if 'install' in self.phase_times:
+            self.record_build_time(version, success)
+        if not success:
+            return False
+        self.installed_version = version
+        return True
     
     def install_fresh_driver(self) -> bool:
         """Install NVIDIA driver when none is currently installed."""
@@ -249,23 +2929,24 @@ class NvidiaDriverCheck:
             print("Please check manually at: https://www.nvidia.com/Download/index.aspx")
             return False
         
-        print(f"Latest available version: {latest_version}")
+        if self.policy.kind == 'latest':
+            print(f"Latest available version: {latest_version}")
+        else:
+            print(f"Version selected by policy {self.policy}: {latest_version}")
         print()
-        response = input("Would you like to download and install it? (yes/no): ").strip().lower()
-        
-        if response != 'yes':
+        if not self.confirm("Would you like to download and install it?"):
             print("Installation cancelled. To install manually, visit:")
             print("https://www.nvidia.com/Download/index.aspx")
             return False
         
         return self._download_and_install_driver(latest_version)
     
-    def check_for_updates(self) -> None:
-        """Check for driver updates and offer to download/install."""
+    def check_for_updates(self) -> int:
+        """Check for driver updates and offer to download/install. Returns an EXIT_* code."""
         current_version = self.get_driver_version()
         if not current_version:
             print("⚠️  Cannot check for updates - current driver version unknown")
-            return
+            return self.EXIT_FAILED
         
         print()
         print("🔍 Checking for driver updates...")
@@ -274,28 +2955,41 @@ class NvidiaDriverCheck:
         if not latest_version:
             print("⚠️  Could not determine latest driver version")
             print("Please check manually at: https://www.nvidia.com/Download/index.aspx")
-            return
+            return self.EXIT_FAILED
         
         print(f"Current version: {current_version}")
-        print(f"Latest version:  {latest_version}")
+        if self.policy.kind == 'latest':
+            print(f"Latest version:  {latest_version}")
+        else:
+            print(f"Target version:  {latest_version} (policy {self.policy})")
         print()
         
-        comparison = self.compare_versions(current_version, latest_version)
+        try:
+            comparison = self.compare_versions(current_version, latest_version)
+        except InvalidVersionError as e:
+            print(f"⚠️  Cannot compare versions: {e}")
+            return self.EXIT_FAILED
         
         if comparison < 0:
-            print("✅ Your driver is up to date (or newer than latest release)")
-        elif comparison == 0:
+            print("✅ Your driver is up to date (or newer than the targeted release)")
+            return self.EXIT_OK
+        if comparison == 0:
             print("✅ Your driver is up to date")
-        else:
-            print("🆕 A newer driver version is available!")
-            print()
-            response = input("Would you like to download and install it? (yes/no): ").strip().lower()
-            
-            if response == 'yes':
-                self._download_and_install_driver(latest_version)
-            else:
-                print("Update cancelled. To update manually, visit:")
-                print("https://www.nvidia.com/Download/index.aspx")
+            return self.EXIT_OK
+        
+        print("🆕 A newer driver version is available!")
+        print()
+        if self.assume_yes and self.install_scope == 'fresh':
+            print("ℹ️  Not updating: --install fresh only installs on hosts without a driver")
+            return self.EXIT_OK
+        if not self.confirm("Would you like to download and install it?"):
+            print("Update cancelled. To update manually, visit:")
+            print("https://www.nvidia.com/Download/index.aspx")
+            return self.EXIT_OK
+        
+        if not self._download_and_install_driver(latest_version):
+            return self.EXIT_FAILED
+        return self.install_outcome(latest_version)
     
     def run_check(self, skip_update_check: bool = False) -> int:
         """Run the complete driver check."""
@@ -304,19 +2998,39 @@ class NvidiaDriverCheck:
         print("=" * 60)
         print()
         
+        # Probe and look up the latest version concurrently. Machines with
+        # no NVIDIA GPU on the PCI bus never touch the network.
+        pci_devices = PciScanner(self.root).scan()
+        status = self.check_status(fetch_latest=pci_devices != [] and not skip_update_check)
+        for name in self.timed_out_backends:
+            print(f"⚠️  The {name} probe timed out after {self.deadline:g}s")
+        
         # Check if nvidia-smi exists
         if not self.check_nvidia_smi():
             print("❌ NVIDIA driver not found or nvidia-smi not available")
+            
+            # Don't offer a driver to machines that have no NVIDIA GPU
+            if pci_devices is not None:
+                if not pci_devices:
+                    print("ℹ️  No NVIDIA GPU found on the PCI bus - nothing to install")
+                    return self.EXIT_OK
+                print(f"Found {len(pci_devices)} NVIDIA GPU(s) on the PCI bus:")
+                for device in pci_devices:
+                    print(f"  {device.address}  device 10de:{device.device_id}")
+            
+            if self.assume_yes and self.install_scope == 'updates':
+                print("ℹ️  Not installing: --install updates only replaces an existing driver")
+                return self.EXIT_OK
+            
             print("\nWould you like to install the latest NVIDIA driver?")
             
             if self.install_fresh_driver():
                 print("\n✅ Installation process completed!")
-                print("⚠️  Please reboot your system and run this tool again to verify.")
-                return 0
+                return self.install_outcome(self.installed_version)
             else:
                 print("\nFor manual installation, visit:")
                 print("https://www.nvidia.com/Download/index.aspx")
-                return 1
+                return self.EXIT_FAILED
         
         print("✅ NVIDIA driver is installed")
         print()
@@ -327,27 +3041,24 @@ class NvidiaDriverCheck:
             print(f"Driver Version: {driver_version}")
         
         # Get GPU info
-        gpu_info = self.get_gpu_info()
-        if gpu_info:
+        snapshot = status.snapshot
+        if snapshot and snapshot.gpus:
             print()
             print("GPU Information:")
             print("-" * 60)
-            if 'gpu_name' in gpu_info:
-                print(f"  GPU Name:       {gpu_info['gpu_name']}")
-            if 'cuda_version' in gpu_info:
-                print(f"  CUDA Version:   {gpu_info['cuda_version']}")
-            if 'memory_total' in gpu_info:
-                print(f"  Memory Total:   {gpu_info['memory_total']}")
-                print(f"  Memory Used:    {gpu_info['memory_used']}")
-                print(f"  Memory Free:    {gpu_info['memory_free']}")
+            if snapshot.cuda_version:
+                print(f"  CUDA Version:   {snapshot.cuda_version}")
+            for row in self.format_gpu_table(list(snapshot.gpus)):
+                print(row)
         
         # Check for updates by default (unless explicitly skipped)
+        exit_code = self.EXIT_OK
         if not skip_update_check:
-            self.check_for_updates()
+            exit_code = self.check_for_updates()
         
         print()
         print("=" * 60)
-        return 0
+        return exit_code
 
 
 def main():
@@ -360,10 +3071,278 @@ def main():
         action='store_true',
         help='Skip checking for driver updates (only show current info)'
     )
+    parser.add_argument(
+        '-y', '--yes', '--non-interactive',
+        dest='assume_yes',
+        action='store_true',
+        help='Never prompt: install what --policy selects (within --install) and run '
+             'the installer silently; for automation'
+    )
+    parser.add_argument(
+        '--install',
+        choices=NvidiaDriverCheck.INSTALL_SCOPES,
+        default='all',
+        help='With --yes, what may be installed: updates of an existing driver, fresh '
+             'installs, or all (default: all)'
+    )
+    parser.add_argument(
+        '--allow-unverified',
+        action='store_true',
+        help='With --yes, download and install a driver even when no checksum is '
+             'available to verify it against'
+    )
+    parser.add_argument(
+        '--concurrency-level',
+        type=int,
+        metavar='N',
+        help='Parallel jobs for the kernel module build (default: number of CPUs)'
+    )
+    parser.add_argument(
+        '--ccache',
+        action='store_true',
+        help='Build the kernel module with CC="ccache gcc" and a persistent cache in '
+             'the cache directory, so rebuilds for a kernel seen before are cache hits'
+    )
+    parser.add_argument(
+        '--backend',
+        choices=['auto'] + sorted(BACKENDS),
+        default='auto',
+        help='How to query the GPUs (default: auto, procfs first, then NVML with nvidia-smi fallback)'
+    )
+    parser.add_argument(
+        '--deadline',
+        type=float,
+        default=NvidiaDriverCheck.DEFAULT_DEADLINE,
+        metavar='SECONDS',
+        help='Overall time limit for GPU probing and the latest-version lookup '
+             f'(default: {NvidiaDriverCheck.DEFAULT_DEADLINE:g})'
+    )
+    parser.add_argument(
+        '--cache-ttl',
+        type=float,
+        default=NvidiaDriverCheck.DEFAULT_CACHE_TTL,
+        metavar='SECONDS',
+        help='Trust the cached latest-version answer for this long before revalidating '
+             f'(default: {NvidiaDriverCheck.DEFAULT_CACHE_TTL:g})'
+    )
+    parser.add_argument(
+        '--segments',
+        type=int,
+        default=1,
+        metavar='N',
+        help='Download the driver as N concurrent byte ranges (default: 1, a single stream)'
+    )
+    parser.add_argument(
+        '--checksum-manifest',
+        metavar='PATH_OR_URL',
+        help='sha256sum-style manifest to verify downloads against '
+             '(default: the .sha256sum file published next to each installer)'
+    )
+    
+    parser.add_argument(
+        '--cache-dir',
+        metavar='DIR',
+        help='Directory for cached metadata and downloaded driver packages '
+             '(default: $XDG_CACHE_HOME/nvidia-driver-check)'
+    )
+    parser.add_argument(
+        '--cache-max-size',
+        type=int,
+        default=NvidiaDriverCheck.DEFAULT_PACKAGE_CACHE_SIZE // (1024 * 1024),
+        metavar='MB',
+        help='Size cap for cached driver packages; least recently used ones are evicted '
+             f'(default: {NvidiaDriverCheck.DEFAULT_PACKAGE_CACHE_SIZE // (1024 * 1024)})'
+    )
+    parser.add_argument(
+        '--policy',
+        default='latest',
+        metavar='SPEC',
+        help='Which version to update to: latest (default), branch (stay on the installed '
+             'branch), pin:MAJOR, or a range such as ">=550,<560"'
+    )
+    parser.add_argument(
+        '--mirror',
+        action='append',
+        default=[],
+        metavar='URL',
+        help='Mirror of https://download.nvidia.com/XFree86 (the directory holding '
+             'Linux-<arch>); replaces NVIDIA\'s server, may be repeated (default: NVIDIA only)'
+    )
+    parser.add_argument(
+        '--arch',
+        choices=sorted(set(ARCHITECTURES.values())),
+        help='Driver architecture to look up and download (default: this machine\'s)'
+    )
+    parser.add_argument(
+        '--peer',
+        action='append',
+        default=[],
+        metavar='URL',
+        help='Base URL of another host running "serve"; peers are tried in order before '
+             'NVIDIA (may be repeated)'
+    )
+    
+    subparsers = parser.add_subparsers(dest='command')
+    serve_parser = subparsers.add_parser(
+        'serve',
+        help='Serve the driver package cache to peers over HTTP'
+    )
+    serve_parser.add_argument(
+        '--bind',
+        default='',
+        metavar='ADDRESS',
+        help='Address to listen on (default: all interfaces)'
+    )
+    serve_parser.add_argument(
+        '--port',
+        type=int,
+        default=NvidiaDriverCheck.DEFAULT_SERVE_PORT,
+        help=f'Port to listen on (default: {NvidiaDriverCheck.DEFAULT_SERVE_PORT})'
+    )
+    
+    catalog_parser = subparsers.add_parser(
+        'catalog',
+        help='List or query every driver version on the download server'
+    )
+    catalog_parser.add_argument(
+        '--offline',
+        action='store_true',
+        help='Answer from the local catalog without refreshing it'
+    )
+    catalog_query = catalog_parser.add_mutually_exclusive_group()
+    catalog_query.add_argument(
+        '--branch',
+        type=int,
+        metavar='MAJOR',
+        help='Print the latest version in a branch, e.g. 550'
+    )
+    catalog_query.add_argument(
+        '--newer-than',
+        metavar='VERSION',
+        help='Print every version newer than VERSION'
+    )
+    catalog_query.add_argument(
+        '--exists',
+        metavar='VERSION',
+        help='Exit 0 if VERSION is published, 1 otherwise'
+    )
+    
+    prefetch_parser = subparsers.add_parser(
+        'prefetch',
+        help='Download the --policy target (or VERSION) into the package cache for each architecture'
+    )
+    prefetch_parser.add_argument(
+        'version',
+        nargs='?',
+        help='Driver version to prefetch (default: what --policy selects)'
+    )
+    prefetch_parser.add_argument(
+        '--arch',
+        dest='archs',
+        action='append',
+        choices=sorted(set(ARCHITECTURES.values())),
+        help='Architecture to prefetch for; may be repeated (default: --arch, or this machine\'s)'
+    )
+    
+    stage_parser = subparsers.add_parser(
+        'stage',
+        help='Download and pre-extract the --policy target (or VERSION) ahead of the install'
+    )
+    stage_parser.add_argument(
+        'version',
+        nargs='?',
+        help='Driver version to stage (default: what --policy selects)'
+    )
+    stage_parser.add_argument(
+        '--arch',
+        dest='archs',
+        action='append',
+        choices=sorted(set(ARCHITECTURES.values())),
+        help='Architecture to stage for; may be repeated (default: --arch, or this machine\'s)'
+    )
+    
+    mirror_parser = subparsers.add_parser(
+        'mirror',
+        help='Maintain a local mirror directory for air-gapped hosts (--mirror file://DIR)'
+    )
+    mirror_commands = mirror_parser.add_subparsers(dest='mirror_command', required=True)
+    sync_parser = mirror_commands.add_parser(
+        'sync',
+        help='Add the --policy target (or VERSIONs) to DIRECTORY, skipping what is already there'
+    )
+    sync_parser.add_argument(
+        'directory',
+        metavar='DIRECTORY',
+        help='Mirror root, laid out like https://download.nvidia.com/XFree86'
+    )
+    sync_parser.add_argument(
+        'versions',
+        nargs='*',
+        metavar='VERSION',
+        help='Driver versions to add (default: what --policy selects)'
+    )
+    sync_parser.add_argument(
+        '--arch',
+        dest='archs',
+        action='append',
+        choices=sorted(set(ARCHITECTURES.values())),
+        help='Architecture to sync; may be repeated (default: --arch, or this machine\'s)'
+    )
+    
+    subparsers.add_parser(
+        'plan',
+        help='Read "[HOST] VERSION" lines from stdin and print the update --policy targets for each'
+    )
     
     args = parser.parse_args()
+    try:
+        UpdatePolicy(args.policy)
+    except ValueError as e:
+        parser.error(str(e))
+    
+    try:
+        detect_arch(args.arch)
+    except ValueError as e:
+        parser.error(f"{e}; pass --arch")
     
-    checker = NvidiaDriverCheck()
+    if args.concurrency_level is not None and args.concurrency_level < 1:
+        parser.error("--concurrency-level must be at least 1")
+    
+    checker = NvidiaDriverCheck(
+        backend=args.backend,
+        deadline=args.deadline,
+        cache_ttl=args.cache_ttl,
+        download_segments=max(1, args.segments),
+        checksum_manifest=args.checksum_manifest,
+        cache_dir=args.cache_dir,
+        package_cache_size=args.cache_max_size * 1024 * 1024,
+        peers=args.peer,
+        mirrors=args.mirror,
+        policy=args.policy,
+        arch=args.arch,
+        assume_yes=args.assume_yes,
+        install_scope=args.install,
+        concurrency_level=args.concurrency_level,
+        ccache=args.ccache,
+        allow_unverified=args.allow_unverified,
+    )
+    if args.command == 'serve':
+        sys.exit(checker.serve(args.bind, args.port))
+    if args.command == 'prefetch':
+        sys.exit(checker.prefetch(args.archs or [checker.arch], args.version))
+    if args.command == 'stage':
+        sys.exit(checker.stage(args.archs or [checker.arch], args.version))
+    if args.command == 'mirror':
+        sys.exit(checker.sync_mirror(args.directory, args.archs or [checker.arch], args.versions))
+    if args.command == 'plan':
+        sys.exit(checker.plan_updates(sys.stdin.read().splitlines()))
+    if args.command == 'catalog':
+        sys.exit(checker.show_catalog(
+            refresh=not args.offline,
+            branch=args.branch,
+            newer_than=args.newer_than,
+            exists=args.exists,
+        ))
     sys.exit(checker.run_check(skip_update_check=args.skip_update_check))
 
 
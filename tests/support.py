@@ -0,0 +1,311 @@
+"""Helpers shared by the test modules: temporary directories, fake system trees and HTTP stand-ins."""
+
+import contextlib
+import hashlib
+import io
+import json
+import os
+import re
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class TempDirTestCase(unittest.TestCase):
+    """A test case with a fresh temporary directory in self.tmp."""
+    
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp(prefix='nvidia-check-test-')
+        self.addCleanup(shutil.rmtree, self.tmp, ignore_errors=True)
+    
+    def write(self, relative_path: str, content='') -> str:
+        """Create a file (and its parents) under self.tmp; returns its path."""
+        path = os.path.join(self.tmp, relative_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        mode = 'wb' if isinstance(content, bytes) else 'w'
+        with open(path, mode) as f:
+            f.write(content)
+        return path
+
+
+def information_file(model: str, uuid: str, bus_location: str, minor: int = 0) -> str:
+    """A /proc/driver/nvidia/gpus/*/information file as the kernel module writes it."""
+    return (
+        f"Model: \t\t {model}\n"
+        f"IRQ:   \t\t 140\n"
+        f"GPU UUID: \t {uuid}\n"
+        f"Video BIOS: \t 92.00.36.00.02\n"
+        f"Bus Type: \t PCIe\n"
+        f"DMA Size: \t 47 bits\n"
+        f"Bus Location: \t {bus_location}\n"
+        f"Device Minor: \t {minor}\n"
+    )
+
+
+def make_procfs(root: str, version: str, bus_locations=(), sysfs: bool = True) -> None:
+    """
+    A loaded driver under root: /proc/driver/nvidia/version, one gpus/
+    entry per bus location and (if sysfs) /sys/module/nvidia/version.
+    """
+    driver_dir = os.path.join(root, 'proc', 'driver', 'nvidia')
+    os.makedirs(driver_dir, exist_ok=True)
+    with open(os.path.join(driver_dir, 'version'), 'w') as f:
+        f.write(
+            f"NVRM version: NVIDIA UNIX Open Kernel Module for x86_64  {version}  Release Build  "
+            f"(dvs-builder@U16-I3-B03-4-3)  Thu Feb 22 01:25:25 UTC 2024\n"
+            f"GCC version:  gcc version 12.2.0\n"
+        )
+    for minor, bus_location in enumerate(bus_locations):
+        gpu_dir = os.path.join(driver_dir, 'gpus', bus_location)
+        os.makedirs(gpu_dir, exist_ok=True)
+        with open(os.path.join(gpu_dir, 'information'), 'w') as f:
+            f.write(information_file('NVIDIA A100-SXM4-80GB', f"GPU-{minor:04d}", bus_location, minor))
+    if sysfs:
+        module_dir = os.path.join(root, 'sys', 'module', 'nvidia')
+        os.makedirs(module_dir, exist_ok=True)
+        with open(os.path.join(module_dir, 'version'), 'w') as f:
+            f.write(version + '\n')
+
+
+def make_pci_device(root: str, address: str, vendor: int, device: int, class_code: int) -> None:
+    """One /sys/bus/pci/devices/<address> entry with its vendor, device and class files."""
+    device_dir = os.path.join(root, 'sys', 'bus', 'pci', 'devices', address)
+    os.makedirs(device_dir, exist_ok=True)
+    for name, value in (('vendor', f"0x{vendor:04x}"), ('device', f"0x{device:04x}"),
+                        ('class', f"0x{class_code:06x}")):
+        with open(os.path.join(device_dir, name), 'w') as f:
+            f.write(value + '\n')
+
+
+def quiet():
+    """Swallow what the code under test prints."""
+    return contextlib.redirect_stdout(io.StringIO())
+
+
+def make_driver_tree(root: str, version: str, payload: bytes, arch: str = 'x86_64',
+                     latest: bool = True) -> str:
+    """
+    Publish payload as version's installer in a download tree laid out
+    like NVIDIA's (Linux-<arch>/<version>/<file> plus .sha256sum), and
+    point latest.txt at it. Returns the payload's SHA-256.
+    """
+    filename = f"NVIDIA-Linux-{arch}-{version}.run"
+    version_dir = os.path.join(root, f"Linux-{arch}", version)
+    os.makedirs(version_dir, exist_ok=True)
+    sha256 = hashlib.sha256(payload).hexdigest()
+    with open(os.path.join(version_dir, filename), 'wb') as f:
+        f.write(payload)
+    with open(os.path.join(version_dir, filename + '.sha256sum'), 'w') as f:
+        f.write(f"{sha256}  {filename}\n")
+    if latest:
+        with open(os.path.join(root, f"Linux-{arch}", 'latest.txt'), 'w') as f:
+            f.write(f"{version} {version}/{filename}\n")
+    return sha256
+
+
+FAKE_SUDO = """#!{python}
+import json, os, sys
+with open({config!r}) as f:
+    config = json.load(f)
+with open({log!r}, 'a') as log:
+    log.write(json.dumps({{'argv': sys.argv[1:], 'cwd': os.getcwd()}}) + '\\n')
+if config['loads']:
+    # The installer replaced the module and the kernel picked it up
+    path, version = config['loads']
+    with open(path, 'w') as f:
+        f.write(version + '\\n')
+sys.exit(config['returncode'])
+"""
+
+
+class FakeSudo:
+    """
+    A sudo first on PATH that runs nothing: it logs each command line
+    with its working directory, and exits with the configured return
+    code. loads=(path, version) makes it write version to path, like a
+    module reload updating /sys/module/nvidia/version.
+    """
+    
+    def __init__(self, test: unittest.TestCase, directory: str):
+        bindir = os.path.join(directory, 'bin')
+        os.makedirs(bindir, exist_ok=True)
+        self.log = os.path.join(directory, 'sudo.log')
+        self.config = os.path.join(directory, 'sudo.json')
+        self.configure()
+        path = os.path.join(bindir, 'sudo')
+        with open(path, 'w') as f:
+            f.write(FAKE_SUDO.format(python=sys.executable, config=self.config, log=self.log))
+        os.chmod(path, 0o755)
+        patcher = mock.patch.dict(os.environ, {'PATH': bindir + os.pathsep + os.environ.get('PATH', '')})
+        patcher.start()
+        test.addCleanup(patcher.stop)
+    
+    def configure(self, returncode: int = 0, loads=None) -> None:
+        with open(self.config, 'w') as f:
+            json.dump({'returncode': returncode, 'loads': loads}, f)
+    
+    @property
+    def calls(self):
+        """(argv, cwd) of each command run so far."""
+        try:
+            with open(self.log) as f:
+                return [(call['argv'], call['cwd']) for call in map(json.loads, f)]
+        except FileNotFoundError:
+            return []
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    
+    def handle_error(self, request, client_address):
+        # Clients hang up on purpose (a lost race, a cancelled probe)
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+class HandlerServer:
+    """Run a BaseHTTPRequestHandler subclass on localhost, as a context manager; self.url is its base URL."""
+    
+    def __init__(self, handler_class):
+        self.server = _Server(('127.0.0.1', 0), handler_class)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self._thread = threading.Thread(target=self.server.serve_forever, args=(0.05,), daemon=True)
+    
+    def __enter__(self) -> 'HandlerServer':
+        self._thread.start()
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class FileServer:
+    """
+    Serve a directory on localhost the way download.nvidia.com does:
+    directory listings, ETag validators (If-None-Match gets a 304) and
+    single byte ranges, for files and listings alike. Every request is logged in self.requests as
+    (method, path, headers). Knobs for the tests:
+    
+    - delay: seconds to wait before answering each request
+    - ranges: False ignores Range headers and always sends the whole file
+    - status: {path: code} answers those paths with an error status
+    - truncate: {path: n} sends only n body bytes of the next response
+      for path (Content-Length still announces all of them), then drops
+      the connection; used once per path
+    """
+    
+    def __init__(self, root: str, delay: float = 0.0, ranges: bool = True):
+        self.root = root
+        self.delay = delay
+        self.ranges = ranges
+        self.status = {}
+        self.truncate = {}
+        self.requests = []
+        self._lock = threading.Lock()
+        self.server = _Server(('127.0.0.1', 0), self._handler_class())
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self._thread = threading.Thread(target=self.server.serve_forever, args=(0.05,), daemon=True)
+    
+    def __enter__(self) -> 'FileServer':
+        self._thread.start()
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()
+    
+    def count(self, path_suffix: str, method: str = 'GET') -> int:
+        """Number of requests so far for paths ending in path_suffix."""
+        with self._lock:
+            return sum(1 for m, path, _ in self.requests if m == method and path.endswith(path_suffix))
+    
+    def _handler_class(self):
+        files = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            
+            def do_GET(self):
+                self._answer(send_body=True)
+            
+            def do_HEAD(self):
+                self._answer(send_body=False)
+            
+            def log_message(self, format, *args):
+                pass
+            
+            def _send(self, code: int, body: bytes = b'', headers=(), send_body: bool = True):
+                self.send_response(code)
+                for name, value in headers:
+                    self.send_header(name, value)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                if send_body:
+                    self.wfile.write(body)
+            
+            def _answer(self, send_body: bool):
+                with files._lock:
+                    files.requests.append((self.command, self.path, dict(self.headers)))
+                if files.delay:
+                    time.sleep(files.delay)
+                if self.path in files.status:
+                    self._send(files.status[self.path], send_body=send_body)
+                    return
+                
+                path = os.path.join(files.root, self.path.split('?', 1)[0].lstrip('/'))
+                if os.path.isdir(path):
+                    data = ''.join(
+                        f'<a href="{name}/">{name}/</a>\n' if os.path.isdir(os.path.join(path, name))
+                        else f'<a href="{name}">{name}</a>\n'
+                        for name in sorted(os.listdir(path))
+                    ).encode('utf-8')
+                elif os.path.isfile(path):
+                    with open(path, 'rb') as f:
+                        data = f.read()
+                else:
+                    self._send(404, send_body=send_body)
+                    return
+                
+                etag = '"%s"' % hashlib.sha1(data).hexdigest()
+                if self.headers.get('If-None-Match') == etag:
+                    self._send(304, headers=[('ETag', etag)], send_body=False)
+                    return
+                
+                start, end = 0, len(data) - 1
+                match = re.fullmatch(r'bytes=(\d+)-(\d*)', self.headers.get('Range', ''))
+                if files.ranges and match:
+                    start = int(match.group(1))
+                    end = min(int(match.group(2)), end) if match.group(2) else end
+                    if start > end:
+                        self._send(416, headers=[('Content-Range', f"bytes */{len(data)}")], send_body=send_body)
+                        return
+                    self.send_response(206)
+                    self.send_header('Content-Range', f"bytes {start}-{end}/{len(data)}")
+                else:
+                    self.send_response(200)
+                if files.ranges:
+                    self.send_header('Accept-Ranges', 'bytes')
+                self.send_header('ETag', etag)
+                self.send_header('Content-Length', str(end - start + 1))
+                self.end_headers()
+                if not send_body:
+                    return
+                
+                body = data[start:end + 1]
+                with files._lock:
+                    cut = files.truncate.pop(self.path, None)
+                if cut is not None:
+                    self.wfile.write(body[:cut])
+                    self.wfile.flush()
+                    self.close_connection = True
+                    self.connection.shutdown(2)
+                    return
+                self.wfile.write(body)
+        
+        return Handler
@@ -0,0 +1,202 @@
+"""The asyncio engine: the stdlib HTTP client, the proxy route and the global deadline."""
+
+import asyncio
+import os
+import shutil
+import threading
+import time
+import unittest
+import urllib.request
+from http.server import BaseHTTPRequestHandler
+from unittest import mock
+from urllib.error import URLError
+
+from nvidia_check import NvidiaDriverCheck, NvmlBackend, async_http_request, run_in_daemon_thread
+
+from tests.support import HandlerServer, TempDirTestCase
+
+
+class ScriptedHandler(BaseHTTPRequestHandler):
+    """Answers that FileServer does not produce: chunked bodies, redirects, no Content-Length."""
+    
+    protocol_version = 'HTTP/1.1'
+    
+    def log_message(self, format, *args):
+        pass
+    
+    def do_HEAD(self):
+        self.do_GET()
+    
+    def do_GET(self):
+        if self.path == '/chunked':
+            self.send_response(200)
+            self.send_header('Transfer-Encoding', 'chunked')
+            self.end_headers()
+            if self.command != 'HEAD':
+                self.wfile.write(b'6;name=value\r\n550.54\r\n4\r\n.14 \r\n0\r\nX-Trailer: yes\r\n\r\n')
+        elif self.path == '/until-close':
+            self.send_response(200)
+            self.send_header('Connection', 'close')
+            self.end_headers()
+            self.wfile.write(b'no length')
+            self.close_connection = True
+        elif self.path in ('/moved', '/loop'):
+            self.send_response(302)
+            self.send_header('Location', 'chunked' if self.path == '/moved' else '/loop')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+        else:
+            self.send_response(404)
+            self.send_header('Content-Length', '9')
+            self.end_headers()
+            if self.command != 'HEAD':
+                self.wfile.write(b'not found')
+
+
+class ProxyHandler(BaseHTTPRequestHandler):
+    """A forwarding proxy stand-in: answers every request itself, echoing the absolute URL it was asked for."""
+    
+    protocol_version = 'HTTP/1.1'
+    seen = []
+    
+    def log_message(self, format, *args):
+        pass
+    
+    def do_GET(self):
+        ProxyHandler.seen.append(self.path)
+        body = f"proxied {self.path}".encode()
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def request(url: str, method: str = 'GET', **kwargs):
+    return asyncio.run(async_http_request(url, method, **kwargs))
+
+
+class AsyncHttpRequestTest(unittest.TestCase):
+    
+    def setUp(self):
+        self.server = HandlerServer(ScriptedHandler).__enter__()
+        self.addCleanup(self.server.__exit__, None, None, None)
+        # Talk to the stand-ins directly, whatever the environment says
+        patcher = mock.patch.dict(os.environ, {'no_proxy': '127.0.0.1', 'NO_PROXY': '127.0.0.1'})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+    
+    def test_chunked_body_with_extensions_and_trailers(self):
+        response = request(f"{self.server.url}/chunked")
+        self.assertEqual(response.status, 200)
+        self.assertEqual(response.body, b'550.54.14 ')
+    
+    def test_body_delimited_by_connection_close(self):
+        self.assertEqual(request(f"{self.server.url}/until-close").body, b'no length')
+    
+    def test_relative_redirect_is_followed(self):
+        response = request(f"{self.server.url}/moved")
+        self.assertEqual((response.status, response.body), (200, b'550.54.14 '))
+    
+    def test_redirect_loop_is_an_error(self):
+        with self.assertRaises(URLError):
+            request(f"{self.server.url}/loop", max_redirects=3)
+    
+    def test_error_status_is_returned_not_raised(self):
+        response = request(f"{self.server.url}/missing")
+        self.assertEqual((response.status, response.body), (404, b'not found'))
+    
+    def test_head_has_no_body(self):
+        response = request(f"{self.server.url}/missing", 'HEAD')
+        self.assertEqual((response.status, response.body), (404, b''))
+    
+    def test_unsupported_scheme(self):
+        with self.assertRaises(URLError):
+            request('ftp://127.0.0.1/latest.txt')
+
+
+class ProxyRouteTest(unittest.TestCase):
+    
+    def setUp(self):
+        ProxyHandler.seen = []
+        self.proxy = HandlerServer(ProxyHandler).__enter__()
+        self.addCleanup(self.proxy.__exit__, None, None, None)
+        self.server = HandlerServer(ScriptedHandler).__enter__()
+        self.addCleanup(self.server.__exit__, None, None, None)
+    
+    def environment(self, no_proxy: str):
+        patcher = mock.patch.dict(os.environ, {'http_proxy': self.proxy.url, 'no_proxy': no_proxy})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        # urlopen builds its opener, proxies included, on first use; make
+        # it pick up this environment, and the next test its own
+        urllib.request.install_opener(None)
+        self.addCleanup(urllib.request.install_opener, None)
+    
+    def test_proxied_request_goes_through_the_proxy(self):
+        self.environment(no_proxy='')
+        response = request('http://mirror.invalid/Linux-x86_64/latest.txt')
+        self.assertEqual(response.status, 200)
+        self.assertEqual(response.body, b'proxied http://mirror.invalid/Linux-x86_64/latest.txt')
+        self.assertEqual(ProxyHandler.seen, ['http://mirror.invalid/Linux-x86_64/latest.txt'])
+    
+    def test_no_proxy_hosts_are_fetched_directly(self):
+        self.environment(no_proxy='127.0.0.1')
+        response = request(f"{self.server.url}/chunked")
+        self.assertEqual(response.body, b'550.54.14 ')
+        self.assertEqual(ProxyHandler.seen, [])
+
+
+class DeadlineTest(TempDirTestCase):
+    
+    def checker(self, backend: str, deadline: float) -> NvidiaDriverCheck:
+        return NvidiaDriverCheck(backend=backend, deadline=deadline, root=self.tmp,
+                                 cache_dir=os.path.join(self.tmp, 'cache'),
+                                 mirrors=['http://127.0.0.1:9'], arch='x86_64')
+    
+    def test_daemon_thread_result_and_errors(self):
+        self.assertEqual(asyncio.run(run_in_daemon_thread(sum, [1, 2])), 3)
+        with self.assertRaises(ZeroDivisionError):
+            asyncio.run(run_in_daemon_thread(lambda: 1 / 0))
+    
+    def test_stuck_in_process_probe_does_not_outlive_the_deadline(self):
+        release = threading.Event()
+        self.addCleanup(release.set)
+        
+        def stuck_probe(backend):
+            release.wait(10)
+            return None
+        
+        with mock.patch.object(NvmlBackend, 'probe', stuck_probe):
+            checker = self.checker('nvml', deadline=0.3)
+            started = time.monotonic()
+            status = checker.check_status(fetch_latest=False)
+            self.assertLess(time.monotonic() - started, 2.0)
+            self.assertIsNone(status.snapshot)
+            self.assertEqual(checker.timed_out_backends, ['nvml'])
+            
+            # The timed-out backend is not waited for a second time
+            started = time.monotonic()
+            self.assertIsNone(checker.probe())
+            self.assertLess(time.monotonic() - started, 0.2)
+    
+    @unittest.skipIf(shutil.which('sleep') is None, 'needs sleep(1)')
+    def test_nvidia_smi_is_killed_at_the_deadline(self):
+        bindir = os.path.join(self.tmp, 'bin')
+        pid_file = os.path.join(self.tmp, 'nvidia-smi.pid')
+        script = self.write('bin/nvidia-smi', f"#!/bin/sh\necho $$ > {pid_file}\nexec sleep 30\n")
+        os.chmod(script, 0o755)
+        patcher = mock.patch.dict(os.environ, {'PATH': bindir + os.pathsep + os.environ['PATH']})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        
+        started = time.monotonic()
+        self.assertIsNone(self.checker('nvidia-smi', deadline=0.5).probe())
+        self.assertLess(time.monotonic() - started, 5.0)
+        with open(pid_file) as f:
+            pid = int(f.read())
+        with self.assertRaises(ProcessLookupError):
+            os.kill(pid, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
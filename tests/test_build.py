@@ -0,0 +1,118 @@
+"""Kernel module build settings: --concurrency-level, --ccache and the build-time log."""
+
+import contextlib
+import io
+import json
+import os
+import platform
+import unittest
+from unittest import mock
+
+from nvidia_check import NvidiaDriverCheck
+
+from tests.support import FakeSudo, FileServer, TempDirTestCase, make_driver_tree, quiet
+
+VERSION = '550.67'
+
+
+class BuildSettingsTest(TempDirTestCase):
+    
+    def checker(self, ccache_on_path: bool = True, **kwargs) -> NvidiaDriverCheck:
+        which = '/usr/bin/ccache' if ccache_on_path else None
+        with mock.patch('shutil.which', return_value=which) as self.which:
+            return NvidiaDriverCheck(cache_dir=os.path.join(self.tmp, 'cache'), arch='x86_64', **kwargs)
+    
+    def test_concurrency_level_defaults_to_the_cpu_count(self):
+        with mock.patch('os.cpu_count', return_value=12):
+            self.assertEqual(self.checker().concurrency_level, 12)
+        self.assertEqual(self.checker(concurrency_level=3).concurrency_level, 3)
+    
+    def test_ccache_goes_through_sudo_env(self):
+        checker = self.checker(ccache=True, concurrency_level=6, assume_yes=True)
+        self.assertEqual(checker.installer_command('/cache/driver.run'), [
+            'sudo', '-n', 'env', 'CC=ccache gcc', f"CCACHE_DIR={os.path.join(self.tmp, 'cache', 'ccache')}",
+            '/cache/driver.run', '--concurrency-level=6', '--silent', '--no-questions', '--ui=none',
+        ])
+    
+    def test_missing_ccache_is_resolved_once(self):
+        checker = self.checker(ccache_on_path=False, ccache=True, concurrency_level=6)
+        self.assertEqual(self.which.call_count, 1)
+        self.assertIsNone(checker.ccache_dir)
+        self.assertTrue(checker.ccache_missing)
+        with mock.patch('shutil.which', side_effect=AssertionError('looked up again')):
+            self.assertEqual(checker.installer_command('/cache/driver.run'),
+                             ['sudo', '/cache/driver.run', '--concurrency-level=6'])
+            self.assertIsNone(checker.ccache_dir)
+    
+    def test_ccache_not_requested(self):
+        checker = self.checker(concurrency_level=2)
+        self.assertEqual(self.which.call_count, 0)
+        self.assertFalse(checker.ccache_missing)
+        self.assertEqual(checker.installer_command('/d.run'), ['sudo', '/d.run', '--concurrency-level=2'])
+
+
+class BuildTimeLogTest(TempDirTestCase):
+    
+    def setUp(self):
+        super().setUp()
+        self.tree = os.path.join(self.tmp, 'tree')
+        make_driver_tree(self.tree, VERSION, b'installer')
+        self.server = FileServer(self.tree).__enter__()
+        self.addCleanup(self.server.__exit__, None, None, None)
+        self.sudo = FakeSudo(self, self.tmp)
+    
+    def install(self, **kwargs):
+        checker = NvidiaDriverCheck(cache_dir=os.path.join(self.tmp, 'cache'), mirrors=[self.server.url],
+                                    arch='x86_64', assume_yes=True, concurrency_level=4, **kwargs)
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            success = checker._download_and_install_driver(VERSION)
+        return checker, success, output.getvalue()
+    
+    def records(self, checker: NvidiaDriverCheck):
+        with open(checker.build_log) as f:
+            return [json.loads(line) for line in f]
+    
+    def test_each_install_is_recorded(self):
+        checker, success, _ = self.install()
+        self.assertTrue(success)
+        self.sudo.configure(returncode=1)
+        checker, success, _ = self.install()
+        self.assertFalse(success)
+        
+        first, second = self.records(checker)
+        self.assertEqual(first['version'], VERSION)
+        self.assertEqual(first['arch'], 'x86_64')
+        self.assertEqual(first['kernel'], platform.release())
+        self.assertEqual(first['concurrency_level'], 4)
+        self.assertFalse(first['ccache'])
+        self.assertFalse(first['staged'])
+        self.assertGreaterEqual(first['seconds'], 0)
+        self.assertEqual((first['success'], second['success']), (True, False))
+    
+    def test_ccache_run_creates_its_directory_and_is_recorded(self):
+        with mock.patch('shutil.which', return_value='/usr/bin/ccache'):
+            checker, success, _ = self.install(ccache=True)
+        self.assertTrue(success)
+        self.assertTrue(os.path.isdir(checker.ccache_dir))
+        [(argv, _)] = self.sudo.calls
+        self.assertIn(f"CCACHE_DIR={checker.ccache_dir}", argv)
+        self.assertTrue(self.records(checker)[0]['ccache'])
+    
+    def test_missing_ccache_is_reported_at_install(self):
+        with mock.patch('shutil.which', return_value=None):
+            checker, success, output = self.install(ccache=True)
+        self.assertTrue(success)
+        self.assertIn('ccache is not installed', output)
+        self.assertFalse(os.path.exists(os.path.join(self.tmp, 'cache', 'ccache')))
+    
+    def test_cancelled_install_is_not_recorded(self):
+        with mock.patch('builtins.input', return_value='no'), quiet():
+            checker = NvidiaDriverCheck(cache_dir=os.path.join(self.tmp, 'cache'), mirrors=[self.server.url],
+                                        arch='x86_64')
+            self.assertFalse(checker._download_and_install_driver(VERSION))
+        self.assertFalse(os.path.exists(checker.build_log))
+
+
+if __name__ == '__main__':
+    unittest.main()
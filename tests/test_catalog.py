@@ -0,0 +1,130 @@
+"""The version catalog: listing parsing, the sorted on-disk index and its queries."""
+
+import contextlib
+import io
+import os
+import unittest
+
+from nvidia_check import NvidiaDriverCheck, VersionCatalog
+
+from tests.support import FileServer, TempDirTestCase, make_driver_tree, quiet
+
+LISTING = '''<html><body>
+<a href="../">../</a>
+<a href="550.54.14/">550.54.14/</a>
+<a href='./535.216.01/'>535.216.01/</a>
+<a HREF="/XFree86/Linux-x86_64/550.100/">550.100/</a>
+<a href=565.57.01/>565.57.01/</a>
+<a href="latest.txt">latest.txt</a>
+<a href="550.54.14/NVIDIA-Linux-x86_64-550.54.14.run">installer</a>
+</body></html>
+'''
+
+
+class VersionCatalogTest(TempDirTestCase):
+    
+    def catalog(self, *versions: str) -> VersionCatalog:
+        catalog = VersionCatalog(os.path.join(self.tmp, 'catalog', 'Linux-x86_64.txt'))
+        catalog.merge(list(versions))
+        return catalog
+    
+    def test_parse_listing(self):
+        self.assertEqual(VersionCatalog.parse_listing(LISTING),
+                         ['535.216.01', '550.54.14', '550.100', '565.57.01'])
+    
+    def test_merge_returns_new_versions_and_persists(self):
+        catalog = self.catalog('550.54.14', '535.216.01')
+        self.assertEqual(catalog.merge(['550.54.14', '550.100', '470.256.02']), ['470.256.02', '550.100'])
+        self.assertEqual(catalog.merge(['550.100']), [])
+        
+        reloaded = VersionCatalog(catalog.path)
+        self.assertEqual(reloaded.versions, ['470.256.02', '535.216.01', '550.54.14', '550.100'])
+    
+    def test_hand_edited_index_is_cleaned_up(self):
+        path = self.write('catalog.txt', '550.100\nnot a version\n535.216.01\n\n550.100\n')
+        self.assertEqual(VersionCatalog(path).versions, ['535.216.01', '550.100'])
+    
+    def test_queries(self):
+        catalog = self.catalog('535.216.01', '550.54.14', '550.100', '550.163.01', '565.57.01')
+        self.assertEqual(len(catalog), 5)
+        self.assertIn('550.100', catalog)
+        self.assertNotIn('550.99', catalog)
+        self.assertNotIn('abc', catalog)
+        self.assertEqual(catalog.latest(), '565.57.01')
+        self.assertEqual(catalog.latest_in_branch(550), '550.163.01')
+        self.assertIsNone(catalog.latest_in_branch(560))
+        self.assertEqual(catalog.newer_than('550.100'), ['550.163.01', '565.57.01'])
+        self.assertEqual(catalog.newer_than('550'), ['550.54.14', '550.100', '550.163.01', '565.57.01'])
+        self.assertEqual(catalog.branches(), {
+            535: ['535.216.01'],
+            550: ['550.54.14', '550.100', '550.163.01'],
+            565: ['565.57.01'],
+        })
+    
+    def test_empty_catalog(self):
+        catalog = self.catalog()
+        self.assertIsNone(catalog.latest())
+        self.assertIsNone(catalog.latest_in_branch(550))
+        self.assertEqual(catalog.newer_than('1'), [])
+
+
+class CatalogRefreshTest(TempDirTestCase):
+    
+    def setUp(self):
+        super().setUp()
+        self.tree = os.path.join(self.tmp, 'tree')
+        for version in ('535.216.01', '550.54.14'):
+            make_driver_tree(self.tree, version, version.encode())
+        self.server = FileServer(self.tree).__enter__()
+        self.addCleanup(self.server.__exit__, None, None, None)
+    
+    def checker(self, cache_ttl: float = 3600) -> NvidiaDriverCheck:
+        return NvidiaDriverCheck(cache_dir=os.path.join(self.tmp, 'cache'), cache_ttl=cache_ttl,
+                                 mirrors=[self.server.url], arch='x86_64')
+    
+    def show(self, **query):
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            code = self.checker().show_catalog(refresh=False, **query)
+        return code, output.getvalue()
+    
+    def test_refresh_builds_the_index_from_the_listing(self):
+        self.assertEqual(self.checker().refresh_catalog(), ['535.216.01', '550.54.14'])
+        self.assertEqual(self.checker().catalog.versions, ['535.216.01', '550.54.14'])
+        self.assertEqual(self.server.count('/Linux-x86_64/'), 1)
+    
+    def test_refresh_is_conditional_and_merges_new_versions(self):
+        self.checker().refresh_catalog()
+        self.assertEqual(self.checker(cache_ttl=0).refresh_catalog(), [])
+        self.assertTrue(self.server.requests[-1][2].get('If-None-Match'))
+        
+        make_driver_tree(self.tree, '550.67', b'new', latest=False)
+        self.assertEqual(self.checker(cache_ttl=0).refresh_catalog(), ['550.67'])
+        self.assertEqual(self.checker().catalog.versions, ['535.216.01', '550.54.14', '550.67'])
+    
+    def test_show_catalog_queries(self):
+        with quiet():
+            self.checker().refresh_catalog()
+        self.assertEqual(self.show(exists='550.54.14')[0], 0)
+        self.assertEqual(self.show(exists='550.99')[0], 1)
+        self.assertEqual(self.show(branch=535), (0, '535.216.01\n'))
+        self.assertEqual(self.show(branch=560)[0], 1)
+        self.assertEqual(self.show(newer_than='540'), (0, '550.54.14\n'))
+        
+        code, output = self.show()
+        self.assertEqual(code, 0)
+        self.assertIn('2 versions, latest 550.54.14', output)
+    
+    def test_invalid_newer_than_is_an_error_not_a_crash(self):
+        with quiet():
+            self.checker().refresh_catalog()
+        code, output = self.show(newer_than='abc')
+        self.assertEqual(code, 1)
+        self.assertIn("'abc'", output)
+    
+    def test_empty_catalog_offline(self):
+        self.assertEqual(self.show()[0], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+"""Streaming SHA-256 verification of downloads, and what happens without a checksum."""
+
+import hashlib
+import os
+import unittest
+from unittest import mock
+
+from nvidia_check import NvidiaDriverCheck, StreamingDigest
+
+from tests.support import FileServer, TempDirTestCase, make_driver_tree, quiet
+
+VERSION = '550.54.14'
+FILENAME = f"NVIDIA-Linux-x86_64-{VERSION}.run"
+PATH = f"/Linux-x86_64/{VERSION}/{FILENAME}"
+
+
+class StreamingDigestTest(TempDirTestCase):
+    
+    def test_catch_up_then_stream(self):
+        data = os.urandom(3 * 1024 * 1024 + 5)
+        path = self.write('file.part', data[:2_000_000])
+        digest = StreamingDigest()
+        digest.catch_up(path, 2_000_000)
+        digest.update(data[2_000_000:])
+        self.assertEqual(digest.hexdigest(), hashlib.sha256(data).hexdigest())
+        self.assertEqual(digest.length, len(data))
+    
+    def test_catch_up_resets_a_digest_that_ran_ahead(self):
+        path = self.write('file.part', b'abcdef')
+        digest = StreamingDigest()
+        digest.update(b'abcdefgh')
+        digest.catch_up(path, 4)
+        self.assertEqual(digest.hexdigest(), hashlib.sha256(b'abcd').hexdigest())
+    
+    def test_catch_up_on_a_short_file(self):
+        path = self.write('file.part', b'abc')
+        with self.assertRaises(OSError):
+            StreamingDigest().catch_up(path, 10)
+
+
+class ParseChecksumsTest(unittest.TestCase):
+    
+    def test_sha256sum_formats(self):
+        digest = 'A' * 64
+        self.assertEqual(NvidiaDriverCheck.parse_checksums(f"{digest}  {FILENAME}\n", FILENAME), 'a' * 64)
+        self.assertEqual(NvidiaDriverCheck.parse_checksums(f"{digest} *./{FILENAME}\n", FILENAME), 'a' * 64)
+        self.assertEqual(NvidiaDriverCheck.parse_checksums(f"{digest}\n", FILENAME), 'a' * 64)
+    
+    def test_manifest_with_several_files(self):
+        manifest = f"{'1' * 64}  NVIDIA-Linux-x86_64-550.67.run\n{'2' * 64}  {FILENAME}\n"
+        self.assertEqual(NvidiaDriverCheck.parse_checksums(manifest, FILENAME), '2' * 64)
+        self.assertIsNone(NvidiaDriverCheck.parse_checksums(manifest, 'other.run'))
+        self.assertIsNone(NvidiaDriverCheck.parse_checksums('not a checksum\n', FILENAME))
+
+
+class VerifiedDownloadTest(TempDirTestCase):
+    
+    def setUp(self):
+        super().setUp()
+        self.tree = os.path.join(self.tmp, 'tree')
+        self.payload = os.urandom(2 * 1024 * 1024)
+        self.sha256 = make_driver_tree(self.tree, VERSION, self.payload)
+        self.server = FileServer(self.tree).__enter__()
+        self.addCleanup(self.server.__exit__, None, None, None)
+        patcher = mock.patch.object(NvidiaDriverCheck, '_backoff_delay', return_value=0.0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+    
+    def checker(self, **kwargs) -> NvidiaDriverCheck:
+        return NvidiaDriverCheck(cache_dir=os.path.join(self.tmp, 'cache'), mirrors=[self.server.url],
+                                 arch='x86_64', **kwargs)
+    
+    def package(self, checker: NvidiaDriverCheck):
+        with quiet():
+            return checker.get_driver_package(VERSION)
+    
+    def test_published_checksum_is_verified(self):
+        checker = self.checker()
+        with quiet():
+            self.assertEqual(checker.get_expected_sha256(VERSION), self.sha256)
+        path = self.package(checker)
+        self.assertIn(self.sha256, path)
+        with open(path, 'rb') as f:
+            self.assertEqual(f.read(), self.payload)
+    
+    def test_corrupted_download_is_discarded(self):
+        self.write(f"tree/Linux-x86_64/{VERSION}/{FILENAME}.sha256sum", f"{'0' * 64}  {FILENAME}\n")
+        self.assertIsNone(self.package(self.checker()))
+        incoming = self.checker().package_cache.incoming_dir
+        self.assertEqual([name for name in os.listdir(incoming) if not name.endswith('.lock')], [])
+        self.assertIsNone(self.checker().package_cache.lookup(VERSION, FILENAME))
+    
+    def test_checksum_manifest_replaces_the_published_file(self):
+        manifest = self.write('manifest.txt', f"{self.sha256}  {FILENAME}\n")
+        self.server.status[PATH + '.sha256sum'] = 404
+        checker = self.checker(checksum_manifest=manifest)
+        with quiet():
+            self.assertEqual(checker.get_expected_sha256(VERSION), self.sha256)
+        self.assertIsNotNone(self.package(checker))
+        self.assertEqual(self.server.count('.sha256sum'), 0)
+    
+    def test_unattended_run_refuses_an_unverifiable_installer(self):
+        self.server.status[PATH + '.sha256sum'] = 404
+        self.assertIsNone(self.package(self.checker(assume_yes=True)))
+        self.assertEqual(self.server.count(PATH), 0)
+    
+    def test_unverified_installs_can_be_allowed(self):
+        self.server.status[PATH + '.sha256sum'] = 404
+        self.assertIsNotNone(self.package(self.checker(assume_yes=True, allow_unverified=True)))
+        self.assertEqual(self.server.count(PATH), 1)
+    
+    def test_interactive_run_warns_and_downloads(self):
+        self.server.status[PATH + '.sha256sum'] = 404
+        self.assertIsNotNone(self.package(self.checker()))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,145 @@
+"""Air-gapped mirrors: file:// trees, in-kernel copies and "mirror sync"."""
+
+import os
+import stat
+import unittest
+from unittest import mock
+
+from nvidia_check import NvidiaDriverCheck, copy_file
+
+from tests.support import FileServer, TempDirTestCase, make_driver_tree, quiet
+
+VERSION = '550.54.14'
+FILENAME = f"NVIDIA-Linux-x86_64-{VERSION}.run"
+
+
+class CopyFileTest(TempDirTestCase):
+    
+    def test_hard_link_on_the_same_filesystem(self):
+        source = self.write('source.run', b'installer')
+        dest = os.path.join(self.tmp, 'dest.run')
+        self.assertTrue(copy_file(source, dest))
+        self.assertTrue(os.path.samefile(source, dest))
+    
+    def test_copy_when_linking_is_not_wanted(self):
+        data = os.urandom(3 * 1024 * 1024 + 1)
+        source = self.write('source.run', data)
+        dest = os.path.join(self.tmp, 'dest.run')
+        self.assertFalse(copy_file(source, dest, link=False))
+        self.assertFalse(os.path.samefile(source, dest))
+        with open(dest, 'rb') as f:
+            self.assertEqual(f.read(), data)
+    
+    def test_copy_of_an_empty_file(self):
+        source = self.write('empty.run', b'')
+        dest = os.path.join(self.tmp, 'dest.run')
+        self.assertFalse(copy_file(source, dest, link=False))
+        self.assertEqual(os.path.getsize(dest), 0)
+    
+    def test_sendfile_fallback(self):
+        source = self.write('source.run', b'x' * 100000)
+        dest = os.path.join(self.tmp, 'dest.run')
+        with mock.patch('os.copy_file_range', side_effect=OSError(18, 'EXDEV'), create=True):
+            copy_file(source, dest, link=False)
+        with open(dest, 'rb') as f:
+            self.assertEqual(f.read(), b'x' * 100000)
+
+
+class FileMirrorTest(TempDirTestCase):
+    
+    def setUp(self):
+        super().setUp()
+        self.tree = os.path.join(self.tmp, 'mirror')
+        self.sha256 = make_driver_tree(self.tree, VERSION, os.urandom(1024 * 1024))
+        self.source = os.path.join(self.tree, 'Linux-x86_64', VERSION, FILENAME)
+        os.chmod(self.source, 0o644)
+        self.checker = NvidiaDriverCheck(cache_dir=os.path.join(self.tmp, 'cache'),
+                                         mirrors=[f"file://{self.tree}"], arch='x86_64')
+    
+    def package(self):
+        with quiet():
+            return self.checker.get_driver_package(VERSION)
+    
+    def test_directory_reads_as_an_index_of_subdirectories(self):
+        self.write('mirror/Linux-x86_64/550.67/.keep')
+        body = NvidiaDriverCheck._read_local(f"file://{self.tree}/Linux-x86_64/")
+        self.assertEqual(body, f'<a href="{VERSION}/">{VERSION}/</a>\n<a href="550.67/">550.67/</a>\n'.encode())
+    
+    def test_file_reads_as_its_content(self):
+        body = NvidiaDriverCheck._read_local(f"file://{self.tree}/Linux-x86_64/latest.txt")
+        self.assertEqual(body, f"{VERSION} {VERSION}/{FILENAME}\n".encode())
+    
+    def test_latest_version_from_the_mirror(self):
+        with quiet():
+            self.assertEqual(self.checker.get_latest_driver_version(), VERSION)
+    
+    def test_non_executable_installer_is_copied_not_linked(self):
+        path = self.package()
+        self.assertIsNotNone(path)
+        self.assertFalse(os.path.samefile(path, self.source))
+        self.assertTrue(os.stat(path).st_mode & stat.S_IXUSR)
+        # The mirror's own file is left as it was
+        self.assertEqual(stat.S_IMODE(os.stat(self.source).st_mode), 0o644)
+    
+    def test_executable_installer_is_hard_linked(self):
+        os.chmod(self.source, 0o755)
+        path = self.package()
+        self.assertTrue(os.path.samefile(path, self.source))
+        self.assertEqual(stat.S_IMODE(os.stat(self.source).st_mode), 0o755)
+    
+    def test_failure_to_finish_is_reported_not_raised(self):
+        with mock.patch.object(NvidiaDriverCheck, '_finish_download', side_effect=PermissionError(1, 'EPERM')):
+            self.assertIsNone(self.package())
+
+
+class SyncMirrorTest(TempDirTestCase):
+    
+    def setUp(self):
+        super().setUp()
+        self.upstream = os.path.join(self.tmp, 'upstream')
+        self.mirror = os.path.join(self.tmp, 'mirror')
+        make_driver_tree(self.upstream, VERSION, b'550.54.14 installer')
+        self.server = FileServer(self.upstream).__enter__()
+        self.addCleanup(self.server.__exit__, None, None, None)
+    
+    def sync(self, versions=None) -> int:
+        # cache_ttl=0: every run asks upstream for latest.txt again
+        checker = NvidiaDriverCheck(cache_dir=os.path.join(self.tmp, 'cache'), cache_ttl=0,
+                                    mirrors=[self.server.url], arch='x86_64')
+        with quiet():
+            return checker.sync_mirror(self.mirror, ['x86_64'], versions)
+    
+    def read(self, *parts: str) -> str:
+        with open(os.path.join(self.mirror, 'Linux-x86_64', *parts)) as f:
+            return f.read()
+    
+    def test_sync_builds_the_tree(self):
+        self.assertEqual(self.sync(), 0)
+        self.assertEqual(self.read(VERSION, FILENAME), '550.54.14 installer')
+        self.assertIn(FILENAME, self.read(VERSION, FILENAME + '.sha256sum'))
+        self.assertEqual(self.read('latest.txt'), f"{VERSION} {VERSION}/{FILENAME}\n")
+    
+    def test_rerun_downloads_nothing(self):
+        self.assertEqual(self.sync(), 0)
+        self.assertEqual(self.sync(), 0)
+        self.assertEqual(self.server.count(FILENAME), 1)
+    
+    def test_latest_txt_follows_the_newest_version_present(self):
+        self.assertEqual(self.sync(), 0)
+        make_driver_tree(self.upstream, '550.67', b'550.67 installer')
+        self.assertEqual(self.sync(), 0)
+        self.assertEqual(self.read('latest.txt'), '550.67 550.67/NVIDIA-Linux-x86_64-550.67.run\n')
+        
+        # Adding an older branch does not move latest.txt back
+        make_driver_tree(self.upstream, '535.216.01', b'535 installer', latest=False)
+        self.assertEqual(self.sync(['535.216.01']), 0)
+        self.assertEqual(self.read('latest.txt'), '550.67 550.67/NVIDIA-Linux-x86_64-550.67.run\n')
+        self.assertEqual(self.read('535.216.01', 'NVIDIA-Linux-x86_64-535.216.01.run'), '535 installer')
+    
+    def test_unknown_version_fails(self):
+        self.assertEqual(self.sync(['999.1']), 1)
+        self.assertFalse(os.path.exists(os.path.join(self.mirror, 'Linux-x86_64', '999.1', 'NVIDIA-Linux-x86_64-999.1.run')))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+"""The on-disk latest.txt cache: TTL, conditional revalidation and stale fallback."""
+
+import json
+import os
+import time
+import unittest
+
+from nvidia_check import CachedResponse, MetadataCache, NvidiaDriverCheck
+
+from tests.support import FileServer, TempDirTestCase
+
+
+class MetadataCacheTest(TempDirTestCase):
+    
+    def setUp(self):
+        super().setUp()
+        self.tree = os.path.join(self.tmp, 'tree')
+        self.cache_dir = os.path.join(self.tmp, 'cache')
+        self.set_latest('550.54.14')
+        self.server = FileServer(self.tree).__enter__()
+        self.addCleanup(self.server.__exit__, None, None, None)
+    
+    def set_latest(self, version: str) -> None:
+        self.write('tree/Linux-x86_64/latest.txt', f"{version} {version}/NVIDIA-Linux-x86_64-{version}.run\n")
+    
+    def latest(self, cache_ttl: float = 3600) -> str:
+        # A new checker per call: nothing is remembered in memory between runs
+        checker = NvidiaDriverCheck(cache_dir=self.cache_dir, cache_ttl=cache_ttl,
+                                    mirrors=[self.server.url], arch='x86_64')
+        return checker.get_latest_driver_version()
+    
+    def test_fresh_entry_needs_no_request(self):
+        self.assertEqual(self.latest(), '550.54.14')
+        self.assertEqual(self.latest(), '550.54.14')
+        self.assertEqual(self.server.count('/latest.txt'), 1)
+    
+    def test_stale_entry_is_revalidated(self):
+        self.assertEqual(self.latest(), '550.54.14')
+        self.assertEqual(self.latest(cache_ttl=0), '550.54.14')
+        
+        method, path, headers = self.server.requests[-1]
+        self.assertTrue(headers.get('If-None-Match'))
+        self.assertEqual(self.server.count('/latest.txt'), 2)
+        # The 304 restarts the TTL, so the next run asks nothing
+        self.assertEqual(self.latest(), '550.54.14')
+        self.assertEqual(self.server.count('/latest.txt'), 2)
+    
+    def test_revalidation_picks_up_a_new_release(self):
+        self.assertEqual(self.latest(), '550.54.14')
+        self.set_latest('550.67')
+        self.assertEqual(self.latest(), '550.54.14')
+        self.assertEqual(self.latest(cache_ttl=0), '550.67')
+    
+    def test_stale_entry_served_when_the_server_fails(self):
+        self.assertEqual(self.latest(), '550.54.14')
+        self.server.status['/Linux-x86_64/latest.txt'] = 503
+        self.assertEqual(self.latest(cache_ttl=0), '550.54.14')
+    
+    def test_no_entry_and_no_server(self):
+        self.server.status['/Linux-x86_64/latest.txt'] = 503
+        self.assertIsNone(self.latest())
+
+
+class MetadataCacheStorageTest(TempDirTestCase):
+    
+    def test_round_trip(self):
+        cache = MetadataCache(self.tmp)
+        entry = CachedResponse(b'550.54.14\n', '"abc"', 'Thu, 22 Feb 2024 01:25:25 GMT', time.time())
+        cache.put('https://example.com/latest.txt', entry)
+        self.assertEqual(cache.get('https://example.com/latest.txt'), entry)
+        self.assertIsNone(cache.get('https://example.com/other.txt'))
+    
+    def test_corrupt_entry_is_a_miss(self):
+        cache = MetadataCache(self.tmp)
+        url = 'https://example.com/latest.txt'
+        with open(cache._path(url), 'w') as f:
+            f.write('{"url": ')
+        self.assertIsNone(cache.get(url))
+    
+    def test_entry_for_another_url_is_a_miss(self):
+        cache = MetadataCache(self.tmp)
+        url = 'https://example.com/latest.txt'
+        with open(cache._path(url), 'w') as f:
+            json.dump({'url': 'https://example.com/elsewhere', 'body': 'x', 'fetched_at': 0}, f)
+        self.assertIsNone(cache.get(url))
+    
+    def test_unwritable_cache_is_skipped(self):
+        blocker = self.write('not-a-directory', 'x')
+        cache = MetadataCache(os.path.join(blocker, 'metadata'))
+        cache.put('https://example.com/latest.txt', CachedResponse(b'x', None, None, 0.0))
+        self.assertIsNone(cache.get('https://example.com/latest.txt'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,169 @@
+"""Several mirrors: racing metadata requests, ranked downloads with failover, and cooldowns."""
+
+import json
+import os
+import time
+import unittest
+from unittest import mock
+
+from nvidia_check import MirrorHealth, NvidiaDriverCheck
+
+from tests.support import FileServer, TempDirTestCase, make_driver_tree, quiet
+
+VERSION = '550.54.14'
+FILENAME = f"NVIDIA-Linux-x86_64-{VERSION}.run"
+PATH = f"/Linux-x86_64/{VERSION}/{FILENAME}"
+
+
+class MirrorTestCase(TempDirTestCase):
+    
+    def setUp(self):
+        super().setUp()
+        self.payload = os.urandom(512 * 1024)
+        self.cache_dir = os.path.join(self.tmp, 'cache')
+        patcher = mock.patch.object(NvidiaDriverCheck, '_backoff_delay', return_value=0.0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+    
+    def mirror(self, name: str, delay: float = 0.0, payload: bytes = None) -> FileServer:
+        """A mirror with its own copy of the tree; payload replaces the installer but not its checksum."""
+        tree = os.path.join(self.tmp, name)
+        make_driver_tree(tree, VERSION, self.payload)
+        if payload is not None:
+            with open(os.path.join(tree, PATH.lstrip('/')), 'wb') as f:
+                f.write(payload)
+        server = FileServer(tree, delay=delay).__enter__()
+        self.addCleanup(server.__exit__, None, None, None)
+        return server
+    
+    def checker(self, *mirrors: FileServer) -> NvidiaDriverCheck:
+        return NvidiaDriverCheck(cache_dir=self.cache_dir, arch='x86_64',
+                                 mirrors=[mirror.url for mirror in mirrors])
+    
+    def health(self, mirror: FileServer) -> dict:
+        with open(os.path.join(self.cache_dir, 'mirrors.json')) as f:
+            return json.load(f).get(f"{mirror.url}/Linux-x86_64", {})
+
+
+class RaceMetadataTest(MirrorTestCase):
+    
+    def test_fastest_answer_wins(self):
+        slow, fast = self.mirror('slow', delay=1.0), self.mirror('fast')
+        started = time.monotonic()
+        self.assertEqual(self.checker(slow, fast).get_latest_driver_version(), VERSION)
+        self.assertLess(time.monotonic() - started, 0.8)
+        self.assertEqual(self.health(fast)['failures'], 0)
+    
+    def test_losing_the_race_is_not_a_failure(self):
+        slow, fast = self.mirror('slow', delay=1.0), self.mirror('fast')
+        self.checker(slow, fast).get_latest_driver_version()
+        self.assertFalse(self.health(slow).get('failures'))
+        self.assertFalse(MirrorHealth(os.path.join(self.cache_dir, 'mirrors.json')).cooling_down(
+            f"{slow.url}/Linux-x86_64"))
+    
+    def test_broken_mirror_is_outlasted_and_recorded(self):
+        broken, good = self.mirror('broken'), self.mirror('good', delay=0.2)
+        broken.status['/Linux-x86_64/latest.txt'] = 503
+        self.assertEqual(self.checker(broken, good).get_latest_driver_version(), VERSION)
+        self.assertEqual(self.health(broken)['failures'], 1)
+    
+    def test_missing_file_on_a_partial_mirror_is_not_a_failure(self):
+        partial, full = self.mirror('partial'), self.mirror('full', delay=0.2)
+        partial.status[PATH + '.sha256sum'] = 404
+        checker = self.checker(partial, full)
+        with quiet():
+            self.assertIsNotNone(checker.get_expected_sha256(VERSION))
+        self.assertFalse(self.health(partial).get('failures'))
+        # ...so it still answers latest.txt lookups
+        self.assertEqual(self.checker(partial, full).get_latest_driver_version(), VERSION)
+        self.assertEqual(partial.count('/latest.txt'), 1)
+    
+    def test_every_mirror_failing(self):
+        first, second = self.mirror('first'), self.mirror('second')
+        first.status['/Linux-x86_64/latest.txt'] = second.status['/Linux-x86_64/latest.txt'] = 404
+        checker = self.checker(first, second)
+        self.assertIsNone(checker.get_latest_driver_version())
+        self.assertIn('404', checker._latest[1])
+    
+    def test_cooling_down_mirror_is_skipped(self):
+        resting, good = self.mirror('resting'), self.mirror('good')
+        MirrorHealth(os.path.join(self.cache_dir, 'mirrors.json')).record_failure(f"{resting.url}/Linux-x86_64")
+        self.assertEqual(self.checker(resting, good).get_latest_driver_version(), VERSION)
+        self.assertEqual(resting.count('/latest.txt'), 0)
+    
+    def test_cooling_down_mirrors_are_used_if_nothing_else_is_left(self):
+        resting = self.mirror('resting')
+        health = MirrorHealth(os.path.join(self.cache_dir, 'mirrors.json'))
+        health.record_failure(f"{resting.url}/Linux-x86_64")
+        self.assertEqual(self.checker(resting).get_latest_driver_version(), VERSION)
+
+
+class MirrorDownloadTest(MirrorTestCase):
+    
+    def test_fastest_mirror_is_ranked_first(self):
+        slow, fast = self.mirror('slow', delay=0.3), self.mirror('fast')
+        with quiet():
+            self.assertEqual(self.checker(slow, fast).rank_mirrors(VERSION),
+                             [f"{fast.url}/Linux-x86_64", f"{slow.url}/Linux-x86_64"])
+        self.assertIsNotNone(self.health(fast)['probe_time'])
+    
+    def test_ranking_does_not_wait_for_a_stalled_probe(self):
+        stalled, fast = self.mirror('stalled'), self.mirror('fast')
+        
+        def probe(checker, url):
+            if url.startswith(stalled.url):
+                time.sleep(2.0)  # A probe that ignores its socket timeout
+            return 0.01
+        
+        with mock.patch.object(NvidiaDriverCheck, 'MIRROR_PROBE_TIMEOUT', 0.1), \
+                mock.patch.object(NvidiaDriverCheck, '_probe_mirror', probe), quiet():
+            started = time.monotonic()
+            ranked = self.checker(stalled, fast).rank_mirrors(VERSION)
+            self.assertLess(time.monotonic() - started, 1.0)
+        self.assertEqual(ranked, [f"{fast.url}/Linux-x86_64", f"{stalled.url}/Linux-x86_64"])
+        self.assertEqual(self.health(stalled)['failures'], 1)
+    
+    def test_mirror_without_the_version_is_ranked_last_but_not_penalized(self):
+        partial, full = self.mirror('partial'), self.mirror('full', delay=0.1)
+        partial.status[PATH] = 404
+        with quiet():
+            ranked = self.checker(partial, full).rank_mirrors(VERSION)
+        self.assertEqual(ranked, [f"{full.url}/Linux-x86_64", f"{partial.url}/Linux-x86_64"])
+        self.assertFalse(self.health(partial).get('failures'))
+    
+    def test_corrupt_mirror_falls_through_to_the_next(self):
+        corrupt = self.mirror('corrupt', payload=b'not the driver' * 1000)
+        good = self.mirror('good', delay=0.2)
+        with quiet():
+            path = self.checker(corrupt, good).get_driver_package(VERSION)
+        with open(path, 'rb') as f:
+            self.assertEqual(f.read(), self.payload)
+        self.assertEqual(corrupt.count(PATH), 2)  # probe, then the download
+        self.assertEqual(self.health(corrupt)['failures'], 1)
+        self.assertEqual(self.health(good)['failures'], 0)
+
+
+class MirrorHealthTest(TempDirTestCase):
+    
+    def test_cooldown_doubles_per_failure_up_to_a_cap(self):
+        health = MirrorHealth(os.path.join(self.tmp, 'mirrors.json'))
+        now = time.time()
+        for failures, age, expected in ((1, 59, True), (1, 61, False), (3, 239, True), (3, 241, False),
+                                        (20, 3599, True), (20, 3601, False)):
+            health._mirrors['m'] = {'failures': failures, 'checked_at': now - age}
+            self.assertEqual(health.cooling_down('m'), expected, (failures, age))
+    
+    def test_probe_time_is_smoothed_and_persisted(self):
+        path = os.path.join(self.tmp, 'mirrors.json')
+        health = MirrorHealth(path)
+        health.record_success('m', 1.0)
+        health.record_success('m', 2.0)
+        self.assertAlmostEqual(MirrorHealth(path).probe_time('m'), 1.0 + MirrorHealth.SMOOTHING)
+    
+    def test_corrupt_file_is_ignored(self):
+        path = self.write('mirrors.json', '[1, 2')
+        self.assertIsNone(MirrorHealth(path).probe_time('m'))
+
+
+if __name__ == '__main__':
+    unittest.main()
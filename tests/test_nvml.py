@@ -0,0 +1,165 @@
+"""NvmlBackend against a stub libnvidia-ml.so.1 compiled for the test run."""
+
+import asyncio
+import ctypes
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+import unittest
+
+from nvidia_check import NvmlBackend
+
+# Just enough of the NVML C API for NvmlBackend.probe: two GPUs, a driver
+# and CUDA version, and knobs (environment variables) to make nvmlInit
+# fail or stall like a GPU without persistence mode.
+STUB_SOURCE = r'''
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include <unistd.h>
+
+typedef struct {
+    char busIdLegacy[16];
+    unsigned int domain, bus, device, pciDeviceId, pciSubSystemId;
+    char busId[32];
+} pci_info_t;
+
+typedef struct { unsigned long long total, free, used; } memory_t;
+
+int stub_inits = 0;
+int stub_shutdowns = 0;
+
+static const char *names[] = {"NVIDIA A100-SXM4-80GB", "NVIDIA H100 80GB HBM3"};
+static const char *bus_ids[] = {"00000000:01:00.0", "00000000:41:00.0"};
+
+int nvmlInit_v2(void) {
+    const char *delay = getenv("STUB_NVML_INIT_DELAY_MS");
+    const char *error = getenv("STUB_NVML_INIT_ERROR");
+    if (delay) usleep(atoi(delay) * 1000);
+    if (error) return atoi(error);
+    stub_inits++;
+    return 0;
+}
+int nvmlShutdown(void) { stub_shutdowns++; return 0; }
+
+int nvmlSystemGetDriverVersion(char *buf, unsigned int size) {
+    snprintf(buf, size, "550.54.14");
+    return 0;
+}
+int nvmlSystemGetCudaDriverVersion_v2(int *version) { *version = 12040; return 0; }
+int nvmlDeviceGetCount_v2(unsigned int *count) { *count = 2; return 0; }
+int nvmlDeviceGetHandleByIndex_v2(unsigned int index, void **handle) {
+    if (index > 1) return 2;  /* NVML_ERROR_INVALID_ARGUMENT */
+    *handle = (void *)(unsigned long)(index + 1);
+    return 0;
+}
+static int index_of(void *handle) { return (int)(unsigned long)handle - 1; }
+
+int nvmlDeviceGetPciInfo_v3(void *handle, pci_info_t *pci) {
+    memset(pci, 0, sizeof *pci);
+    snprintf(pci->busId, sizeof pci->busId, "%s", bus_ids[index_of(handle)]);
+    return 0;
+}
+int nvmlDeviceGetMemoryInfo(void *handle, memory_t *memory) {
+    memory->total = 80ULL << 30;
+    memory->used = (unsigned long long)(index_of(handle) + 1) << 20;
+    memory->free = memory->total - memory->used;
+    return 0;
+}
+int nvmlDeviceGetUUID(void *handle, char *buf, unsigned int size) {
+    snprintf(buf, size, "GPU-stub-%d", index_of(handle));
+    return 0;
+}
+int nvmlDeviceGetName(void *handle, char *buf, unsigned int size) {
+    snprintf(buf, size, "%s", names[index_of(handle)]);
+    return 0;
+}
+'''
+
+
+@unittest.skipIf(shutil.which('gcc') is None, 'gcc is needed to build the NVML stub')
+class NvmlBackendTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.build_dir = tempfile.mkdtemp(prefix='nvml-stub-')
+        source = os.path.join(cls.build_dir, 'nvml_stub.c')
+        with open(source, 'w') as f:
+            f.write(STUB_SOURCE)
+        cls.library = os.path.join(cls.build_dir, NvmlBackend.LIBRARY_NAME)
+        subprocess.run(['gcc', '-shared', '-fPIC', '-o', cls.library, source], check=True)
+        cls.stub = ctypes.CDLL(cls.library)
+    
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.build_dir, ignore_errors=True)
+    
+    def setUp(self):
+        for name in ('STUB_NVML_INIT_DELAY_MS', 'STUB_NVML_INIT_ERROR'):
+            self.addCleanup(os.environ.pop, name, None)
+    
+    def counter(self, name: str) -> int:
+        return ctypes.c_int.in_dll(self.stub, name).value
+    
+    def test_probe_reads_every_gpu(self):
+        snapshot = NvmlBackend(self.library).probe()
+        
+        self.assertEqual(snapshot.driver_version, '550.54.14')
+        self.assertEqual(snapshot.cuda_version, '12.4')
+        self.assertEqual([gpu.index for gpu in snapshot.gpus], [0, 1])
+        self.assertEqual(
+            [gpu.name for gpu in snapshot.gpus],
+            ['NVIDIA A100-SXM4-80GB', 'NVIDIA H100 80GB HBM3'],
+        )
+        self.assertEqual([gpu.uuid for gpu in snapshot.gpus], ['GPU-stub-0', 'GPU-stub-1'])
+        self.assertEqual(
+            [gpu.pci_bus_id for gpu in snapshot.gpus],
+            ['00000000:01:00.0', '00000000:41:00.0'],
+        )
+        self.assertEqual(snapshot.gpus[0].memory_total, '81920 MiB')
+        self.assertEqual(snapshot.gpus[1].memory_used, '2 MiB')
+        self.assertEqual(snapshot.gpus[1].memory_free, '81918 MiB')
+    
+    def test_every_probe_shuts_nvml_down(self):
+        inits, shutdowns = self.counter('stub_inits'), self.counter('stub_shutdowns')
+        NvmlBackend(self.library).probe()
+        NvmlBackend(self.library).probe()
+        self.assertEqual(self.counter('stub_inits') - inits, 2)
+        self.assertEqual(self.counter('stub_shutdowns') - shutdowns, 2)
+    
+    def test_init_failure_means_no_answer(self):
+        os.environ['STUB_NVML_INIT_ERROR'] = '9'  # NVML_ERROR_DRIVER_NOT_LOADED
+        self.assertIsNone(NvmlBackend(self.library).probe())
+    
+    def test_missing_library_means_no_answer(self):
+        missing = os.path.join(self.build_dir, 'missing', NvmlBackend.LIBRARY_NAME)
+        self.assertIsNone(NvmlBackend(missing).probe())
+    
+    def test_cuda_version_decoding(self):
+        self.assertEqual(NvmlBackend.format_cuda_version(12040), '12.4')
+        self.assertEqual(NvmlBackend.format_cuda_version(11080), '11.8')
+    
+    def test_slow_init_does_not_block_the_event_loop(self):
+        os.environ['STUB_NVML_INIT_DELAY_MS'] = '300'
+        
+        async def main():
+            started = time.monotonic()
+            
+            async def other_work():
+                await asyncio.sleep(0.01)
+                return time.monotonic() - started
+            
+            snapshot, other_elapsed = await asyncio.gather(
+                NvmlBackend(self.library).probe_async(), other_work()
+            )
+            return snapshot, other_elapsed
+        
+        snapshot, other_elapsed = asyncio.run(main())
+        self.assertEqual(len(snapshot.gpus), 2)
+        self.assertLess(other_elapsed, 0.2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,123 @@
+"""The content-addressed driver package cache and its LRU eviction."""
+
+import contextlib
+import io
+import os
+import unittest
+from unittest import mock
+
+from nvidia_check import PackageCache
+
+from tests.support import TempDirTestCase, quiet
+
+
+class PackageCacheTest(TempDirTestCase):
+    
+    def setUp(self):
+        super().setUp()
+        self.cache = PackageCache(os.path.join(self.tmp, 'packages'), max_size=3000)
+    
+    def add(self, version: str, sha256: str, size: int = 1000, filename: str = None) -> str:
+        filename = filename or f"NVIDIA-Linux-x86_64-{version}.run"
+        download = self.write(f"downloads/{filename}", b'x' * size)
+        with quiet():
+            return self.cache.add(version, sha256, download)
+    
+    def age(self, path: str, atime: float) -> None:
+        os.utime(path, (atime, os.stat(path).st_mtime))
+    
+    def test_add_and_lookup(self):
+        path = self.add('550.54.14', 'AB' * 32)
+        self.assertEqual(path, os.path.join(self.cache.directory, '550.54.14', 'ab' * 32,
+                                            'NVIDIA-Linux-x86_64-550.54.14.run'))
+        self.assertEqual(self.cache.lookup('550.54.14', 'NVIDIA-Linux-x86_64-550.54.14.run'), path)
+        self.assertEqual(self.cache.lookup('550.54.14', 'NVIDIA-Linux-x86_64-550.54.14.run', 'AB' * 32), path)
+        self.assertIsNone(self.cache.lookup('550.54.14', 'NVIDIA-Linux-x86_64-550.54.14.run', 'cd' * 32))
+        self.assertIsNone(self.cache.lookup('550.67', 'NVIDIA-Linux-x86_64-550.67.run'))
+    
+    def test_lookup_prefers_the_most_recently_used_copy(self):
+        old = self.add('550.54.14', 'aa' * 32)
+        new = self.add('550.54.14', 'bb' * 32)
+        self.age(old, 2000)
+        self.age(new, 1000)
+        self.assertEqual(self.cache.lookup('550.54.14', os.path.basename(old)), old)
+    
+    def test_least_recently_used_entries_are_evicted(self):
+        first = self.add('535.216.01', 'aa' * 32)
+        second = self.add('550.54.14', 'bb' * 32)
+        third = self.add('550.67', 'cc' * 32)
+        self.age(first, 3000)
+        self.age(second, 1000)
+        self.age(third, 2000)
+        
+        fourth = self.add('565.57.01', 'dd' * 32)
+        self.assertFalse(os.path.exists(second))
+        self.assertFalse(os.path.exists(os.path.dirname(os.path.dirname(second))))
+        for path in (first, third, fourth):
+            self.assertTrue(os.path.exists(path), path)
+    
+    def test_new_entry_is_kept_even_if_it_alone_exceeds_the_cap(self):
+        self.add('550.54.14', 'aa' * 32)
+        big = self.add('550.67', 'bb' * 32, size=5000)
+        self.assertTrue(os.path.exists(big))
+        self.assertIsNone(self.cache.lookup('550.54.14', 'NVIDIA-Linux-x86_64-550.54.14.run'))
+    
+    def test_eviction_stops_at_the_cache_directory(self):
+        cache = PackageCache(os.path.join(self.tmp, 'cache', 'packages'), max_size=100)
+        download = self.write('downloads/NVIDIA-Linux-x86_64-550.54.14.run', b'x' * 1000)
+        with quiet():
+            path = cache.add('550.54.14', 'aa' * 32, download)
+            cache.evict()
+        self.assertFalse(os.path.exists(path))
+        self.assertFalse(os.path.exists(os.path.join(cache.directory, '550.54.14')))
+        # packages/ is empty now, but it and everything above it stay
+        self.assertEqual(os.listdir(cache.directory), [])
+    
+    def test_version_directory_with_other_entries_is_kept(self):
+        older = self.add('550.54.14', 'aa' * 32)
+        self.add('550.54.14', 'bb' * 32)
+        self.age(older, 1000)
+        self.add('550.67', 'cc' * 32)
+        self.add('565.57.01', 'dd' * 32)
+        self.assertFalse(os.path.exists(os.path.dirname(older)))
+        self.assertTrue(os.path.isdir(os.path.join(self.cache.directory, '550.54.14', 'bb' * 32)))
+    
+    def test_failed_removal_is_not_counted_as_evicted(self):
+        first = self.add('535.216.01', 'aa' * 32)
+        second = self.add('550.54.14', 'bb' * 32)
+        third = self.add('550.67', 'cc' * 32)
+        self.age(first, 1000)
+        self.age(second, 2000)
+        self.age(third, 3000)
+        download = self.write('downloads/NVIDIA-Linux-x86_64-565.57.01.run', b'x' * 1000)
+        real_remove = os.remove
+        
+        def remove(path):
+            if path == first:
+                raise PermissionError(1, 'EPERM', path)
+            real_remove(path)
+        
+        output = io.StringIO()
+        with mock.patch('os.remove', remove), contextlib.redirect_stdout(output):
+            self.cache.add('565.57.01', 'dd' * 32, download)
+        # The oldest could not go, so the next oldest had to make room
+        self.assertTrue(os.path.exists(first))
+        self.assertFalse(os.path.exists(second))
+        self.assertNotIn('535.216.01', output.getvalue())
+        self.assertIn('Evicted NVIDIA-Linux-x86_64-550.54.14.run', output.getvalue())
+    
+    def test_incoming_downloads_are_not_entries(self):
+        self.write('packages/.incoming/NVIDIA-Linux-x86_64-550.54.14.run.part', b'partial')
+        self.assertEqual(self.cache._entries(), [])
+    
+    def test_entry_evicted_during_lookup_is_skipped(self):
+        path = self.add('550.54.14', 'aa' * 32)
+        entries = self.cache._entries()
+        os.remove(path)
+        # Another process evicts the entry between the listing and the stat
+        with mock.patch.object(self.cache, '_entries', return_value=entries):
+            self.assertIsNone(self.cache.lookup('550.54.14', os.path.basename(path)))
+
+
+if __name__ == '__main__':
+    unittest.main()
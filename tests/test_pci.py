@@ -0,0 +1,64 @@
+"""PciScanner and the driverless fresh-install path on a synthetic /sys/bus/pci."""
+
+import contextlib
+import io
+import os
+import unittest
+from unittest import mock
+
+import nvidia_check
+from nvidia_check import NvidiaDriverCheck, PciDevice, PciScanner
+
+from tests.support import TempDirTestCase, make_pci_device
+
+
+class PciScannerTest(TempDirTestCase):
+    
+    def test_finds_nvidia_display_controllers_only(self):
+        make_pci_device(self.tmp, '0000:41:00.0', 0x10de, 0x2330, 0x030200)  # H100, 3D controller
+        make_pci_device(self.tmp, '0000:01:00.0', 0x10de, 0x1eb8, 0x030000)  # T4, VGA
+        make_pci_device(self.tmp, '0000:01:00.1', 0x10de, 0x10fa, 0x040300)  # its HDMI audio
+        make_pci_device(self.tmp, '0000:02:00.0', 0x1a03, 0x2000, 0x030000)  # BMC VGA
+        
+        self.assertEqual(PciScanner(self.tmp).scan(), [
+            PciDevice(address='0000:01:00.0', device_id='1eb8', class_code='030000'),
+            PciDevice(address='0000:41:00.0', device_id='2330', class_code='030200'),
+        ])
+    
+    def test_no_gpu(self):
+        make_pci_device(self.tmp, '0000:02:00.0', 0x1a03, 0x2000, 0x030000)
+        self.assertEqual(PciScanner(self.tmp).scan(), [])
+    
+    def test_unreadable_files_are_skipped(self):
+        make_pci_device(self.tmp, '0000:01:00.0', 0x10de, 0x1eb8, 0x030000)
+        self.write('sys/bus/pci/devices/0000:01:00.0/class', 'garbage\n')
+        self.assertEqual(PciScanner(self.tmp).scan(), [])
+    
+    def test_without_sysfs_the_answer_is_unknown(self):
+        self.assertIsNone(PciScanner(self.tmp).scan())
+
+
+class DriverlessCheckTest(TempDirTestCase):
+    
+    def run_check(self) -> int:
+        # Port 9 (discard) on localhost: a lookup, if any, is refused at once
+        checker = NvidiaDriverCheck(backend='procfs', root=self.tmp, cache_dir=os.path.join(self.tmp, 'cache'),
+                                    mirrors=['http://127.0.0.1:9'])
+        with contextlib.redirect_stdout(io.StringIO()):
+            return checker.run_check()
+    
+    def test_machine_without_gpu_needs_nothing_and_stays_offline(self):
+        make_pci_device(self.tmp, '0000:02:00.0', 0x1a03, 0x2000, 0x030000)
+        with mock.patch.object(nvidia_check, 'async_http_request', side_effect=AssertionError('network used')), \
+                mock.patch('builtins.input', side_effect=AssertionError('prompted')):
+            self.assertEqual(self.run_check(), NvidiaDriverCheck.EXIT_OK)
+    
+    def test_machine_with_gpu_is_offered_a_driver(self):
+        make_pci_device(self.tmp, '0000:01:00.0', 0x10de, 0x1eb8, 0x030000)
+        with mock.patch.object(NvidiaDriverCheck, 'install_fresh_driver', return_value=False) as install:
+            self.assertEqual(self.run_check(), NvidiaDriverCheck.EXIT_FAILED)
+        install.assert_called_once_with()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,181 @@
+"""serve: the package cache over HTTP, and hosts that download from it as a peer."""
+
+import hashlib
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+import unittest
+from http.server import ThreadingHTTPServer
+from unittest import mock
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+from nvidia_check import NvidiaDriverCheck, PackageCache, PackageCacheRequestHandler
+
+from tests.support import FileServer, TempDirTestCase, make_driver_tree, quiet
+
+VERSION = '550.54.14'
+FILENAME = f"NVIDIA-Linux-x86_64-{VERSION}.run"
+PATH = f"/Linux-x86_64/{VERSION}/{FILENAME}"
+SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'nvidia_check.py')
+
+
+class PeerTestCase(TempDirTestCase):
+    """A serving host's package cache holding one installer, served on localhost."""
+    
+    def setUp(self):
+        super().setUp()
+        self.payload = os.urandom(1024 * 1024 + 11)
+        self.sha256 = hashlib.sha256(self.payload).hexdigest()
+        self.cache = PackageCache(os.path.join(self.tmp, 'peer-cache'), 1 << 30)
+        os.makedirs(self.cache.incoming_dir)
+        self.cache.add(VERSION, self.sha256, self.write(f"incoming/{FILENAME}", self.payload))
+        
+        # What NvidiaDriverCheck.serve builds, on a free port
+        handler = type('Handler', (PackageCacheRequestHandler,), {'package_cache': self.cache})
+        server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+        thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+        thread.start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        self.peer_url = f"http://127.0.0.1:{server.server_address[1]}"
+    
+    def get(self, path: str, **headers):
+        with urlopen(Request(self.peer_url + path, headers=headers)) as response:
+            return response.status, dict(response.headers), response.read()
+
+
+class PackageCacheRequestHandlerTest(PeerTestCase):
+    
+    def test_whole_file(self):
+        status, headers, body = self.get(PATH)
+        self.assertEqual(status, 200)
+        self.assertEqual(headers['Accept-Ranges'], 'bytes')
+        self.assertEqual(body, self.payload)
+    
+    def test_byte_ranges(self):
+        status, headers, body = self.get(PATH, Range='bytes=10-19')
+        self.assertEqual(status, 206)
+        self.assertEqual(headers['Content-Range'], f"bytes 10-19/{len(self.payload)}")
+        self.assertEqual(body, self.payload[10:20])
+        
+        self.assertEqual(self.get(PATH, Range='bytes=-5')[2], self.payload[-5:])
+        self.assertEqual(self.get(PATH, Range='bytes=1048570-')[2], self.payload[1048570:])
+    
+    def test_unsatisfiable_range(self):
+        with self.assertRaises(HTTPError) as raised:
+            self.get(PATH, Range=f"bytes={len(self.payload)}-")
+        self.assertEqual(raised.exception.code, 416)
+        self.assertEqual(raised.exception.headers['Content-Range'], f"bytes */{len(self.payload)}")
+    
+    def test_generated_checksum_file(self):
+        _, _, body = self.get(PATH + '.sha256sum')
+        self.assertEqual(body.decode(), f"{self.sha256}  {FILENAME}\n")
+    
+    def test_unknown_paths(self):
+        for path in ('/Linux-x86_64/550.67/NVIDIA-Linux-x86_64-550.67.run', '/latest.txt',
+                     f"/Linux-x86_64/{VERSION}/../../etc/passwd"):
+            with self.assertRaises(HTTPError) as raised:
+                self.get(path)
+            self.assertEqual(raised.exception.code, 404, path)
+
+
+class PeerDownloadTest(PeerTestCase):
+    
+    def setUp(self):
+        super().setUp()
+        self.upstream = FileServer(os.path.join(self.tmp, 'tree')).__enter__()
+        self.addCleanup(self.upstream.__exit__, None, None, None)
+        make_driver_tree(os.path.join(self.tmp, 'tree'), VERSION, self.payload)
+        patcher = mock.patch.object(NvidiaDriverCheck, '_backoff_delay', return_value=0.0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+    
+    def package(self, peers):
+        checker = NvidiaDriverCheck(cache_dir=os.path.join(self.tmp, 'host-cache'), arch='x86_64',
+                                    mirrors=[self.upstream.url], peers=peers)
+        with quiet():
+            return checker.get_driver_package(VERSION)
+    
+    def read(self, path: str) -> bytes:
+        with open(path, 'rb') as f:
+            return f.read()
+    
+    def test_installer_comes_from_the_peer(self):
+        path = self.package([self.peer_url])
+        self.assertEqual(self.read(path), self.payload)
+        self.assertEqual(self.upstream.count(PATH), 0)
+        self.assertEqual(self.upstream.count(PATH + '.sha256sum'), 1)
+    
+    def test_bad_peer_bytes_fall_back_to_upstream(self):
+        cached = self.cache.lookup(VERSION, FILENAME)
+        with open(cached, 'r+b') as f:
+            f.write(b'corrupt')
+        path = self.package([self.peer_url])
+        self.assertEqual(self.read(path), self.payload)
+        self.assertEqual(self.upstream.count(PATH), 1)
+    
+    def test_unreachable_peer_falls_back_to_upstream(self):
+        path = self.package(['http://127.0.0.1:9', self.peer_url])
+        self.assertEqual(self.read(path), self.payload)
+        self.assertEqual(self.upstream.count(PATH), 0)
+    
+    def test_no_peers_without_a_checksum(self):
+        self.upstream.status[PATH + '.sha256sum'] = 404
+        self.package([self.peer_url])
+        self.assertEqual(self.upstream.count(PATH), 1)
+
+
+class ServeCommandTest(TempDirTestCase):
+    """The serve and prefetch --peer subcommands, run as the tool itself."""
+    
+    def free_port(self) -> int:
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            return sock.getsockname()[1]
+    
+    def start_serve(self, cache_dir: str) -> str:
+        port = self.free_port()
+        process = subprocess.Popen([sys.executable, SCRIPT, '--cache-dir', cache_dir,
+                                    'serve', '--bind', '127.0.0.1', '--port', str(port)],
+                                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        self.addCleanup(process.wait, 10)
+        self.addCleanup(process.terminate)
+        deadline = time.monotonic() + 10
+        while True:
+            self.assertIsNone(process.poll(), 'serve exited early')
+            try:
+                socket.create_connection(('127.0.0.1', port), timeout=1).close()
+                return f"http://127.0.0.1:{port}"
+            except OSError:
+                if time.monotonic() > deadline:
+                    raise
+                time.sleep(0.05)
+    
+    def test_prefetch_from_a_serving_peer(self):
+        payload = os.urandom(256 * 1024)
+        peer_dir = os.path.join(self.tmp, 'peer')
+        peer_cache = PackageCache(os.path.join(peer_dir, 'packages'), 1 << 30)
+        os.makedirs(peer_cache.incoming_dir)
+        peer_cache.add(VERSION, hashlib.sha256(payload).hexdigest(),
+                       self.write(f"incoming/{FILENAME}", payload))
+        make_driver_tree(os.path.join(self.tmp, 'tree'), VERSION, payload)
+        peer_url = self.start_serve(peer_dir)
+        
+        host_dir = os.path.join(self.tmp, 'host')
+        with FileServer(os.path.join(self.tmp, 'tree')) as upstream:
+            run = subprocess.run([sys.executable, SCRIPT, '--cache-dir', host_dir, '--arch', 'x86_64',
+                                  '--mirror', upstream.url, '--peer', peer_url, 'prefetch', VERSION],
+                                 stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, timeout=60)
+        self.assertEqual(run.returncode, 0, run.stdout)
+        self.assertEqual(upstream.count(PATH), 0)
+        path = PackageCache(os.path.join(host_dir, 'packages'), 1 << 30).lookup(VERSION, FILENAME)
+        with open(path, 'rb') as f:
+            self.assertEqual(f.read(), payload)
+
+
+if __name__ == '__main__':
+    unittest.main()
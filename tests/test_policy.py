@@ -0,0 +1,123 @@
+"""Update policies: spec parsing, bound semantics, targets and fleet planning."""
+
+import contextlib
+import io
+import os
+import unittest
+from unittest import mock
+
+from nvidia_check import NvidiaDriverCheck, UpdatePolicy, VersionCatalog
+
+from tests.support import FileServer, TempDirTestCase, make_driver_tree
+
+CATALOG = ['470.256.02', '535.216.01', '550.54.14', '550.100', '550.163.01', '560.35.03', '565.57.01', '570.86.10']
+
+
+class UpdatePolicySpecTest(unittest.TestCase):
+    
+    def test_named_policies(self):
+        self.assertEqual(UpdatePolicy().kind, 'latest')
+        self.assertEqual(UpdatePolicy(' branch ').kind, 'branch')
+        self.assertTrue(UpdatePolicy('branch').needs_installed)
+        self.assertFalse(UpdatePolicy('latest').needs_installed)
+    
+    def test_pin(self):
+        policy = UpdatePolicy('pin:535')
+        self.assertEqual((policy.kind, policy.branch), ('pin', 535))
+    
+    def test_range(self):
+        policy = UpdatePolicy('>=550, <560')
+        self.assertEqual(policy.kind, 'range')
+        self.assertEqual(len(policy.constraints), 2)
+        self.assertEqual(str(policy), '>=550, <560')
+    
+    def test_invalid_specs_are_rejected(self):
+        for spec in ('newest', 'pin:', 'pin:abc', 'pin:535.1', '>=abc', '>=550,', '=550', '~550', ''):
+            with self.subTest(spec=spec):
+                with self.assertRaises(ValueError):
+                    UpdatePolicy(spec)
+    
+    def test_bounds_compare_only_their_own_components(self):
+        self.assertTrue(UpdatePolicy('<=565').allows('565.57.01'))
+        self.assertFalse(UpdatePolicy('<565').allows('565.57.01'))
+        self.assertFalse(UpdatePolicy('<=565').allows('570.86.10'))
+        self.assertTrue(UpdatePolicy('==550').allows('550.163.01'))
+        self.assertFalse(UpdatePolicy('==550').allows('555.42.02'))
+        self.assertFalse(UpdatePolicy('!=550').allows('550.54.14'))
+        self.assertTrue(UpdatePolicy('>550.54').allows('550.100'))
+        self.assertTrue(UpdatePolicy('>=550.54.14,<550.100').allows('550.54.15'))
+
+
+class UpdatePolicyTargetTest(TempDirTestCase):
+    
+    def setUp(self):
+        super().setUp()
+        self.catalog = VersionCatalog(os.path.join(self.tmp, 'Linux-x86_64.txt'))
+        self.catalog.merge(CATALOG)
+    
+    def target(self, spec: str, installed=None):
+        return UpdatePolicy(spec).target(self.catalog, installed)
+    
+    def test_targets(self):
+        self.assertEqual(self.target('latest'), '570.86.10')
+        self.assertEqual(self.target('pin:535'), '535.216.01')
+        self.assertEqual(self.target('pin:999'), None)
+        self.assertEqual(self.target('branch', '550.54.14'), '550.163.01')
+        self.assertEqual(self.target('branch'), '570.86.10')
+        self.assertEqual(self.target('>=550,<560'), '550.163.01')
+        self.assertEqual(self.target('<=565'), '565.57.01')
+        self.assertEqual(self.target('==550'), '550.163.01')
+        self.assertEqual(self.target('>600'), None)
+    
+    def test_plan_looks_up_each_branch_once(self):
+        policy = UpdatePolicy('branch')
+        fleet = ['550.54.14', '535.216.01', '550.100', 'unknown', None] * 200
+        with mock.patch.object(UpdatePolicy, 'target', wraps=policy.target) as target:
+            targets = policy.plan(self.catalog, fleet)
+        self.assertEqual(target.call_count, 2)
+        self.assertEqual(targets[:5], ['550.163.01', '535.216.01', '550.163.01', None, None])
+        self.assertEqual(len(targets), len(fleet))
+    
+    def test_plan_without_installed_dependence_is_one_lookup(self):
+        policy = UpdatePolicy('pin:560')
+        with mock.patch.object(UpdatePolicy, 'target', wraps=policy.target) as target:
+            self.assertEqual(policy.plan(self.catalog, ['535.216.01'] * 50), ['560.35.03'] * 50)
+        self.assertEqual(target.call_count, 1)
+
+
+class PlanUpdatesTest(TempDirTestCase):
+    
+    def setUp(self):
+        super().setUp()
+        self.tree = os.path.join(self.tmp, 'tree')
+        make_driver_tree(self.tree, '550.54.14', b'installer')
+        self.server = FileServer(self.tree).__enter__()
+        self.addCleanup(self.server.__exit__, None, None, None)
+    
+    def plan(self, lines, **kwargs):
+        checker = NvidiaDriverCheck(cache_dir=os.path.join(self.tmp, 'cache'), arch='x86_64', **kwargs)
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            code = checker.plan_updates(lines)
+        return code, output.getvalue()
+    
+    def test_fleet_against_latest(self):
+        lines = ['# fleet', 'gpu01 535.216.01', 'gpu02 550.54.14', '', 'gpu03 560.35.03', 'junk']
+        code, output = self.plan(lines, mirrors=[self.server.url])
+        self.assertEqual(code, 0)
+        rows = [line.split() for line in output.splitlines()]
+        self.assertIn(['gpu01', '535.216.01', '550.54.14', 'update'], rows)
+        self.assertIn(['gpu02', '550.54.14', '550.54.14', 'current'], rows)
+        self.assertIn(['gpu03', '560.35.03', '550.54.14', 'ahead'], rows)
+        self.assertIn(['line', '6', 'junk', '550.54.14', 'invalid'], rows)
+        self.assertIn('4 hosts under policy latest', output)
+    
+    def test_unknown_latest_is_a_failure(self):
+        self.server.status['/Linux-x86_64/latest.txt'] = 503
+        code, output = self.plan(['gpu01 535.216.01'], mirrors=[self.server.url])
+        self.assertEqual(code, 1)
+        self.assertNotIn('no match', output)
+
+
+if __name__ == '__main__':
+    unittest.main()
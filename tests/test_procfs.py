@@ -0,0 +1,66 @@
+"""ProcfsBackend and the zero-fork driver check on a synthetic /proc and /sys."""
+
+import unittest
+from unittest import mock
+
+from nvidia_check import NvidiaDriverCheck, NvidiaSmiBackend, NvmlBackend, ProcfsBackend
+
+from tests.support import TempDirTestCase, make_procfs
+
+
+class ProcfsBackendTest(TempDirTestCase):
+    
+    def test_version_from_sys_module(self):
+        make_procfs(self.tmp, '550.54.14')
+        self.write('sys/module/nvidia/version', '550.67\n')
+        self.assertEqual(ProcfsBackend(self.tmp).read_driver_version(), '550.67')
+    
+    def test_version_from_proc_without_sysfs(self):
+        make_procfs(self.tmp, '535.216.01', sysfs=False)
+        self.assertEqual(ProcfsBackend(self.tmp).read_driver_version(), '535.216.01')
+    
+    def test_proprietary_module_banner(self):
+        self.write(
+            'proc/driver/nvidia/version',
+            "NVRM version: NVIDIA UNIX x86_64 Kernel Module  470.256.02  Thu May  2 14:37:44 UTC 2024\n",
+        )
+        self.assertEqual(ProcfsBackend(self.tmp).read_driver_version(), '470.256.02')
+    
+    def test_not_loaded(self):
+        self.assertIsNone(ProcfsBackend(self.tmp).read_driver_version())
+        self.assertIsNone(ProcfsBackend(self.tmp).probe())
+    
+    def test_probe_lists_gpus_in_bus_order(self):
+        make_procfs(self.tmp, '550.54.14', ['0000:41:00.0', '0000:01:00.0'])
+        snapshot = ProcfsBackend(self.tmp).probe()
+        
+        self.assertEqual(snapshot.driver_version, '550.54.14')
+        self.assertIsNone(snapshot.cuda_version)
+        self.assertEqual([gpu.index for gpu in snapshot.gpus], [0, 1])
+        self.assertEqual(
+            [gpu.pci_bus_id for gpu in snapshot.gpus],
+            ['00000000:01:00.0', '00000000:41:00.0'],
+        )
+        self.assertEqual(snapshot.gpus[0].name, 'NVIDIA A100-SXM4-80GB')
+        self.assertIsNone(snapshot.gpus[0].memory_total)
+    
+    def test_parse_information(self):
+        fields = ProcfsBackend.parse_information("Model: \t\t Tesla T4\nBus Location: \t 0000:3b:00.0\n")
+        self.assertEqual(fields, {'Model': 'Tesla T4', 'Bus Location': '0000:3b:00.0'})
+        self.assertEqual(ProcfsBackend.normalize_bus_id('0000:3b:00.0'), '00000000:3B:00.0')
+
+
+class ZeroForkCheckTest(TempDirTestCase):
+    
+    def test_driver_version_spawns_nothing(self):
+        make_procfs(self.tmp, '550.54.14', ['0000:01:00.0'])
+        checker = NvidiaDriverCheck(root=self.tmp, cache_dir=self.tmp)
+        
+        with mock.patch.object(NvmlBackend, 'probe', side_effect=AssertionError('NVML probed')), \
+                mock.patch.object(NvidiaSmiBackend, 'probe_async', side_effect=AssertionError('nvidia-smi run')):
+            self.assertTrue(checker.check_nvidia_smi())
+            self.assertEqual(checker.get_driver_version(), '550.54.14')
+
+
+if __name__ == '__main__':
+    unittest.main()
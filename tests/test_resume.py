@@ -0,0 +1,102 @@
+"""Resumable downloads: .part files, HTTP Range requests and retries."""
+
+import os
+import unittest
+from unittest import mock
+
+from nvidia_check import NvidiaDriverCheck
+
+from tests.support import FileServer, TempDirTestCase, make_driver_tree, quiet
+
+VERSION = '550.54.14'
+FILENAME = f"NVIDIA-Linux-x86_64-{VERSION}.run"
+PATH = f"/Linux-x86_64/{VERSION}/{FILENAME}"
+
+
+class ResumeTest(TempDirTestCase):
+    
+    def setUp(self):
+        super().setUp()
+        self.payload = os.urandom(3 * 1024 * 1024 + 17)
+        self.sha256 = make_driver_tree(os.path.join(self.tmp, 'tree'), VERSION, self.payload)
+        self.dest = os.path.join(self.tmp, FILENAME)
+        self.part = self.dest + '.part'
+        self.checker = NvidiaDriverCheck(cache_dir=os.path.join(self.tmp, 'cache'), arch='x86_64')
+        # Retry at once instead of backing off
+        patcher = mock.patch.object(NvidiaDriverCheck, '_backoff_delay', return_value=0.0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+    
+    def fetch(self, server: FileServer, **kwargs):
+        with quiet():
+            return self.checker.fetch_driver(server.url + PATH, self.dest, self.sha256, **kwargs)
+    
+    def range_headers(self, server: FileServer):
+        return [headers.get('Range') for method, path, headers in server.requests if method == 'GET']
+    
+    def read(self, path: str) -> bytes:
+        with open(path, 'rb') as f:
+            return f.read()
+    
+    def test_interrupted_download_resumes_on_retry(self):
+        with FileServer(os.path.join(self.tmp, 'tree')) as server:
+            server.truncate[PATH] = 1024 * 1024
+            self.assertEqual(self.fetch(server), self.sha256)
+        
+        self.assertEqual(self.range_headers(server), [None, 'bytes=1048576-'])
+        self.assertEqual(self.read(self.dest), self.payload)
+        self.assertFalse(os.path.exists(self.part))
+    
+    def test_part_file_survives_for_the_next_run(self):
+        with FileServer(os.path.join(self.tmp, 'tree')) as server:
+            server.truncate[PATH] = 1024 * 1024
+            self.assertIsNone(self.fetch(server, retries=0))
+            self.assertEqual(os.path.getsize(self.part), 1024 * 1024)
+            
+            self.assertEqual(self.fetch(server, retries=0), self.sha256)
+        
+        self.assertEqual(self.range_headers(server)[-1], 'bytes=1048576-')
+        self.assertEqual(self.read(self.dest), self.payload)
+    
+    def test_server_without_ranges_restarts_from_scratch(self):
+        with open(self.part, 'wb') as f:
+            f.write(b'stale bytes from another file')
+        with FileServer(os.path.join(self.tmp, 'tree'), ranges=False) as server:
+            self.assertEqual(self.fetch(server), self.sha256)
+        self.assertEqual(self.read(self.dest), self.payload)
+    
+    def test_complete_part_file_is_not_downloaded_again(self):
+        with open(self.part, 'wb') as f:
+            f.write(self.payload)
+        with FileServer(os.path.join(self.tmp, 'tree')) as server:
+            self.assertEqual(self.fetch(server), self.sha256)
+        # One ranged request, answered 416 with the full size: nothing left to send
+        self.assertEqual(self.range_headers(server), [f"bytes={len(self.payload)}-"])
+        self.assertEqual(self.read(self.dest), self.payload)
+    
+    def test_client_errors_are_not_retried(self):
+        with FileServer(os.path.join(self.tmp, 'tree')) as server:
+            server.status[PATH] = 404
+            self.assertIsNone(self.fetch(server))
+        self.assertEqual(server.count(PATH), 1)
+    
+    def test_server_errors_are_retried(self):
+        with FileServer(os.path.join(self.tmp, 'tree')) as server:
+            server.status[PATH] = 503
+            self.assertIsNone(self.fetch(server, retries=2))
+        self.assertEqual(server.count(PATH), 3)
+
+
+class BackoffTest(unittest.TestCase):
+    
+    def test_full_jitter_is_capped(self):
+        checker = NvidiaDriverCheck()
+        for attempt in range(12):
+            delay = checker._backoff_delay(attempt)
+            self.assertGreaterEqual(delay, 0)
+            self.assertLessEqual(delay, min(NvidiaDriverCheck.RETRY_BACKOFF_MAX,
+                                            NvidiaDriverCheck.RETRY_BACKOFF_BASE * 2 ** attempt))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+"""Segmented downloads: concurrent byte ranges into a preallocated .part."""
+
+import os
+import re
+import unittest
+from unittest import mock
+
+from nvidia_check import NvidiaDriverCheck
+
+from tests.support import FileServer, TempDirTestCase, make_driver_tree, quiet
+
+VERSION = '550.54.14'
+FILENAME = f"NVIDIA-Linux-x86_64-{VERSION}.run"
+PATH = f"/Linux-x86_64/{VERSION}/{FILENAME}"
+
+
+class SegmentedDownloadTest(TempDirTestCase):
+    
+    def setUp(self):
+        super().setUp()
+        self.tree = os.path.join(self.tmp, 'tree')
+        self.dest = os.path.join(self.tmp, FILENAME)
+        self.checker = NvidiaDriverCheck(cache_dir=os.path.join(self.tmp, 'cache'), arch='x86_64')
+        patcher = mock.patch.object(NvidiaDriverCheck, '_backoff_delay', return_value=0.0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+    
+    def publish(self, size: int) -> str:
+        self.payload = os.urandom(size)
+        return make_driver_tree(self.tree, VERSION, self.payload)
+    
+    def fetch(self, server: FileServer, sha256: str, segments: int):
+        with quiet():
+            return self.checker.fetch_driver(server.url + PATH, self.dest, sha256, segments=segments)
+    
+    def get_ranges(self, server: FileServer):
+        ranges = []
+        for method, path, headers in server.requests:
+            if method == 'GET':
+                match = re.fullmatch(r'bytes=(\d+)-(\d*)', headers.get('Range', ''))
+                ranges.append((int(match.group(1)), int(match.group(2))) if match else None)
+        return ranges
+    
+    def assert_downloaded(self):
+        with open(self.dest, 'rb') as f:
+            self.assertEqual(f.read(), self.payload)
+        self.assertFalse(os.path.exists(self.dest + '.part'))
+    
+    def test_ranges_cover_the_file_exactly_once(self):
+        sha256 = self.publish(5 * 1024 * 1024 + 3)
+        with FileServer(self.tree) as server:
+            self.assertEqual(self.fetch(server, sha256, segments=4), sha256)
+        
+        self.assert_downloaded()
+        self.assertEqual(server.count(PATH, method='HEAD'), 1)
+        ranges = sorted(self.get_ranges(server))
+        self.assertEqual(len(ranges), 4)
+        self.assertEqual(ranges[0][0], 0)
+        self.assertEqual(ranges[-1][1], len(self.payload) - 1)
+        for (_, end), (next_start, _) in zip(ranges, ranges[1:]):
+            self.assertEqual(next_start, end + 1)
+    
+    def test_broken_segment_resumes_where_it_stopped(self):
+        sha256 = self.publish(4 * 1024 * 1024)
+        with FileServer(self.tree) as server:
+            server.truncate[PATH] = 100 * 1024
+            self.assertEqual(self.fetch(server, sha256, segments=4), sha256)
+        
+        self.assert_downloaded()
+        ranges = self.get_ranges(server)
+        self.assertEqual(len(ranges), 5)
+        segment_starts = {start for start, _ in ranges[:4]}
+        resumed = [r for r in ranges if r[0] not in segment_starts]
+        self.assertEqual(len(resumed), 1)
+        self.assertEqual(resumed[0][0] % (1024 * 1024), 100 * 1024)
+    
+    def test_server_without_ranges_gets_a_single_stream(self):
+        sha256 = self.publish(4 * 1024 * 1024)
+        with FileServer(self.tree, ranges=False) as server:
+            self.assertEqual(self.fetch(server, sha256, segments=4), sha256)
+        self.assert_downloaded()
+        self.assertEqual(self.get_ranges(server), [None])
+    
+    def test_small_file_gets_a_single_stream(self):
+        sha256 = self.publish(NvidiaDriverCheck.MIN_SEGMENT_SIZE)
+        with FileServer(self.tree) as server:
+            self.assertEqual(self.fetch(server, sha256, segments=4), sha256)
+        self.assert_downloaded()
+        self.assertEqual(self.get_ranges(server), [None])
+    
+    def test_failed_segmented_download_leaves_nothing_behind(self):
+        sha256 = self.publish(4 * 1024 * 1024)
+        with FileServer(self.tree) as server:
+            server.status[PATH] = 404
+            # The HEAD probe still sees the file; every ranged GET fails
+            with mock.patch.object(NvidiaDriverCheck, '_probe_ranges', return_value=len(self.payload)):
+                self.assertIsNone(self.fetch(server, sha256, segments=4))
+        self.assertFalse(os.path.exists(self.dest))
+        self.assertFalse(os.path.exists(self.dest + '.part'))
+
+
+if __name__ == '__main__':
+    unittest.main()
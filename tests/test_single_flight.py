@@ -0,0 +1,78 @@
+"""Cross-process single flight: concurrent runs share one download and one metadata fetch."""
+
+import os
+import subprocess
+import sys
+import threading
+import time
+import unittest
+
+from nvidia_check import file_lock
+
+from tests.support import FileServer, TempDirTestCase, make_driver_tree, quiet
+
+VERSION = '550.54.14'
+FILENAME = f"NVIDIA-Linux-x86_64-{VERSION}.run"
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# One "run" of the tool, as cron, a timer and an operator would start it
+RUN = '''
+import sys
+from nvidia_check import NvidiaDriverCheck
+checker = NvidiaDriverCheck(cache_dir=sys.argv[1], mirrors=[sys.argv[2]], arch='x86_64')
+version = checker.get_latest_driver_version()
+path = checker.get_driver_package(version)
+print('RESULT', version, path)
+'''
+
+
+class FileLockTest(TempDirTestCase):
+    
+    def test_second_holder_waits_for_the_first(self):
+        path = os.path.join(self.tmp, 'locks', 'x.lock')
+        events = []
+        
+        def first():
+            with file_lock(path):
+                events.append('first acquired')
+                time.sleep(0.3)
+                events.append('first released')
+        
+        thread = threading.Thread(target=first)
+        thread.start()
+        while not events:
+            time.sleep(0.01)
+        with quiet():
+            with file_lock(path, 'waiting'):
+                events.append('second acquired')
+        thread.join()
+        self.assertEqual(events, ['first acquired', 'first released', 'second acquired'])
+
+
+class ConcurrentRunsTest(TempDirTestCase):
+    
+    def test_concurrent_runs_download_once(self):
+        tree = os.path.join(self.tmp, 'tree')
+        make_driver_tree(tree, VERSION, os.urandom(2 * 1024 * 1024))
+        cache_dir = os.path.join(self.tmp, 'cache')
+        env = dict(os.environ, PYTHONPATH=REPO_ROOT)
+        
+        # Slow answers keep all runs in flight at the same time
+        with FileServer(tree, delay=0.3) as server:
+            runs = [
+                subprocess.Popen([sys.executable, '-c', RUN, cache_dir, server.url],
+                                 stdout=subprocess.PIPE, stderr=subprocess.STDOUT, env=env, text=True)
+                for _ in range(4)
+            ]
+            outputs = [run.communicate(timeout=60)[0] for run in runs]
+        
+        results = {line for output in outputs for line in output.splitlines() if line.startswith('RESULT')}
+        self.assertEqual(len(results), 1, outputs)
+        self.assertIn(VERSION, results.pop())
+        self.assertEqual(server.count('/latest.txt'), 1)
+        self.assertEqual(server.count(f"/{FILENAME}.sha256sum"), 1)
+        self.assertEqual(server.count(f"/{FILENAME}"), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
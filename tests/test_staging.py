@@ -0,0 +1,110 @@
+"""Staging: pre-extracting an installer with --extract-only and installing from the staged tree."""
+
+import os
+import unittest
+from unittest import mock
+
+from nvidia_check import NvidiaDriverCheck
+
+from tests.support import FakeSudo, FileServer, TempDirTestCase, make_driver_tree, quiet
+
+VERSION = '560.35.03'
+BROKEN = '560.28.03'
+
+# A makeself .run as far as staging is concerned: --extract-only --target
+# DIR unpacks a tree with nvidia-installer at its top
+FAKE_RUN = '''#!/bin/sh
+echo "$@" >> "{log}"
+[ "$1" = --extract-only ] && [ "$2" = --target ] || exit 2
+mkdir -p "$3/kernel"
+printf '#!/bin/sh\\nexit 0\\n' > "$3/nvidia-installer"
+chmod 755 "$3/nvidia-installer"
+exit {status}
+'''
+
+
+class StagingTest(TempDirTestCase):
+    
+    def setUp(self):
+        super().setUp()
+        self.run_log = os.path.join(self.tmp, 'run.log')
+        self.tree = os.path.join(self.tmp, 'tree')
+        make_driver_tree(self.tree, VERSION, FAKE_RUN.format(log=self.run_log, status=0).encode())
+        # Unpacks half a tree, then fails
+        make_driver_tree(self.tree, BROKEN, FAKE_RUN.format(log=self.run_log, status=1).encode(), latest=False)
+        self.server = FileServer(self.tree).__enter__()
+        self.addCleanup(self.server.__exit__, None, None, None)
+        self.sudo = FakeSudo(self, self.tmp)
+    
+    def checker(self) -> NvidiaDriverCheck:
+        return NvidiaDriverCheck(cache_dir=os.path.join(self.tmp, 'cache'), mirrors=[self.server.url],
+                                 arch='x86_64', assume_yes=True, concurrency_level=2)
+    
+    def extractions(self) -> int:
+        try:
+            with open(self.run_log) as f:
+                return len(f.readlines())
+        except FileNotFoundError:
+            return 0
+    
+    def leftovers(self, checker: NvidiaDriverCheck):
+        """Temporary extraction directories left next to the staged trees."""
+        parent = os.path.dirname(checker.staging_path(VERSION))
+        return [name for name in os.listdir(parent) if name.startswith('.')]
+    
+    def test_stage_extracts_and_renames_into_place(self):
+        checker = self.checker()
+        with quiet():
+            installer = checker.stage_driver(VERSION)
+        self.assertEqual(installer, os.path.join(checker.staging_path(VERSION), 'nvidia-installer'))
+        self.assertTrue(os.access(installer, os.X_OK))
+        self.assertTrue(os.path.isdir(os.path.join(checker.staging_path(VERSION), 'kernel')))
+        self.assertEqual(self.leftovers(checker), [])
+        self.assertEqual(set(checker.phase_times), {'download', 'extract'})
+        self.assertEqual(checker.staged_installer(VERSION), installer)
+    
+    def test_already_staged_is_skipped(self):
+        with quiet():
+            first = self.checker().stage_driver(VERSION)
+            second = self.checker().stage_driver(VERSION)
+        self.assertEqual(first, second)
+        self.assertEqual(self.extractions(), 1)
+        self.assertEqual(self.server.count(f"NVIDIA-Linux-x86_64-{VERSION}.run"), 1)
+    
+    def test_failed_extraction_leaves_no_tree(self):
+        checker = self.checker()
+        with quiet():
+            self.assertIsNone(checker.stage_driver(BROKEN))
+        self.assertFalse(os.path.exists(checker.staging_path(BROKEN)))
+        self.assertIsNone(checker.staged_installer(BROKEN))
+        self.assertEqual(self.leftovers(checker), [])
+    
+    def test_install_runs_the_staged_installer_in_its_tree(self):
+        with quiet():
+            self.checker().stage_driver(VERSION)
+        
+        checker = self.checker()
+        with mock.patch.object(NvidiaDriverCheck, 'get_driver_package', side_effect=AssertionError('downloaded')), \
+                quiet():
+            self.assertTrue(checker._download_and_install_driver(VERSION))
+        
+        [(argv, cwd)] = self.sudo.calls
+        self.assertEqual(argv[:2], ['-n', os.path.join(checker.staging_path(VERSION), 'nvidia-installer')])
+        self.assertIn('--silent', argv)
+        self.assertEqual(os.path.realpath(cwd), os.path.realpath(checker.staging_path(VERSION)))
+        self.assertIn('install', checker.phase_times)
+        self.assertEqual(checker.installed_version, VERSION)
+    
+    def test_install_without_a_staged_tree_uses_the_run_file(self):
+        checker = self.checker()
+        with quiet():
+            self.assertTrue(checker._download_and_install_driver(VERSION))
+        [(argv, cwd)] = self.sudo.calls
+        self.assertTrue(argv[1].endswith(f"NVIDIA-Linux-x86_64-{VERSION}.run"))
+        self.assertEqual(os.path.realpath(cwd), os.path.realpath(os.getcwd()))
+        self.assertEqual(set(checker.phase_times), {'download', 'install'})
+        self.assertEqual(self.extractions(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+"""Unattended installs: --yes, --install scopes, the sudo command line and exit codes."""
+
+import os
+import unittest
+from unittest import mock
+
+from nvidia_check import NvidiaDriverCheck, main
+
+from tests.support import FakeSudo, FileServer, TempDirTestCase, make_driver_tree, make_pci_device, make_procfs, quiet
+
+INSTALLED = '550.54.14'
+LATEST = '550.67'
+
+
+class InstallerCommandTest(TempDirTestCase):
+    
+    def checker(self, **kwargs) -> NvidiaDriverCheck:
+        return NvidiaDriverCheck(cache_dir=os.path.join(self.tmp, 'cache'), arch='x86_64',
+                                 concurrency_level=4, **kwargs)
+    
+    def test_interactive(self):
+        self.assertEqual(self.checker().installer_command('/cache/driver.run'),
+                         ['sudo', '/cache/driver.run', '--concurrency-level=4'])
+    
+    def test_unattended_never_prompts(self):
+        self.assertEqual(
+            self.checker(assume_yes=True).installer_command('/cache/driver.run'),
+            ['sudo', '-n', '/cache/driver.run', '--concurrency-level=4', '--silent', '--no-questions', '--ui=none'],
+        )
+    
+    def test_unknown_scope_is_rejected_by_the_command_line(self):
+        with mock.patch('sys.argv', ['nvidia_check.py', '--yes', '--install', 'everything']), \
+                mock.patch('sys.stderr'):
+            with self.assertRaises(SystemExit):
+                main()
+
+
+class UnattendedRunTest(TempDirTestCase):
+    
+    def setUp(self):
+        super().setUp()
+        self.tree = os.path.join(self.tmp, 'tree')
+        make_driver_tree(self.tree, LATEST, b'550.67 installer')
+        self.server = FileServer(self.tree).__enter__()
+        self.addCleanup(self.server.__exit__, None, None, None)
+        self.root = os.path.join(self.tmp, 'root')
+        self.sudo = FakeSudo(self, self.tmp)
+        # Never fall back to reading a real terminal
+        patcher = mock.patch('builtins.input', side_effect=AssertionError('prompted'))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+    
+    def run_check(self, **kwargs) -> int:
+        kwargs.setdefault('assume_yes', True)
+        checker = NvidiaDriverCheck(backend='procfs', root=self.root, cache_dir=os.path.join(self.tmp, 'cache'),
+                                    mirrors=[self.server.url], arch='x86_64', **kwargs)
+        with quiet():
+            return checker.run_check()
+    
+    def module_reload_to(self, version: str) -> None:
+        self.sudo.configure(loads=[os.path.join(self.root, 'sys', 'module', 'nvidia', 'version'), version])
+    
+    def test_up_to_date(self):
+        make_procfs(self.root, LATEST)
+        self.assertEqual(self.run_check(), NvidiaDriverCheck.EXIT_OK)
+        self.assertEqual(self.sudo.calls, [])
+    
+    def test_update_loaded_at_once(self):
+        make_procfs(self.root, INSTALLED)
+        self.module_reload_to(LATEST)
+        self.assertEqual(self.run_check(), NvidiaDriverCheck.EXIT_UPDATED)
+        [(argv, cwd)] = self.sudo.calls
+        self.assertEqual(argv[0], '-n')
+        self.assertTrue(argv[1].endswith(f"NVIDIA-Linux-x86_64-{LATEST}.run"))
+        self.assertEqual(argv[-3:], ['--silent', '--no-questions', '--ui=none'])
+    
+    def test_update_needs_a_reboot(self):
+        make_procfs(self.root, INSTALLED)
+        self.assertEqual(self.run_check(), NvidiaDriverCheck.EXIT_REBOOT_REQUIRED)
+        self.assertEqual(len(self.sudo.calls), 1)
+    
+    def test_failed_installer(self):
+        make_procfs(self.root, INSTALLED)
+        self.sudo.configure(returncode=1)
+        self.assertEqual(self.run_check(), NvidiaDriverCheck.EXIT_FAILED)
+    
+    def test_scope_fresh_leaves_existing_drivers_alone(self):
+        make_procfs(self.root, INSTALLED)
+        self.assertEqual(self.run_check(install_scope='fresh'), NvidiaDriverCheck.EXIT_OK)
+        self.assertEqual(self.sudo.calls, [])
+    
+    def test_scope_updates_skips_driverless_hosts(self):
+        make_pci_device(self.root, '0000:01:00.0', 0x10de, 0x2330, 0x030200)
+        self.assertEqual(self.run_check(install_scope='updates'), NvidiaDriverCheck.EXIT_OK)
+        self.assertEqual(self.sudo.calls, [])
+    
+    def test_fresh_install_needs_a_reboot(self):
+        make_pci_device(self.root, '0000:01:00.0', 0x10de, 0x2330, 0x030200)
+        self.assertEqual(self.run_check(install_scope='fresh'), NvidiaDriverCheck.EXIT_REBOOT_REQUIRED)
+        self.assertEqual(len(self.sudo.calls), 1)
+    
+    def test_interactive_decline_installs_nothing(self):
+        make_procfs(self.root, INSTALLED)
+        with mock.patch('builtins.input', return_value='no'):
+            self.assertEqual(self.run_check(assume_yes=False), NvidiaDriverCheck.EXIT_OK)
+        self.assertEqual(self.sudo.calls, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+"""DriverVersion, its strict parsing, and the version helpers built on it."""
+
+import os
+import unittest
+
+from nvidia_check import (
+    DriverVersion, InvalidVersionError, NvidiaDriverCheck, max_version, parse_version,
+    sort_versions, version_key,
+)
+
+from tests.support import TempDirTestCase
+
+
+class DriverVersionTest(unittest.TestCase):
+    
+    def test_numeric_ordering(self):
+        self.assertGreater(DriverVersion('550.100'), DriverVersion('550.54.14'))
+        self.assertLess(DriverVersion('535.216.01'), DriverVersion('550.54'))
+        self.assertGreater(DriverVersion('550.54.14'), DriverVersion('550.54'))
+        self.assertLessEqual(DriverVersion('550.54.14'), DriverVersion('550.54.14'))
+    
+    def test_equality_ignores_zero_padding(self):
+        self.assertEqual(DriverVersion('580.105.08'), DriverVersion('580.105.8'))
+        self.assertEqual(hash(DriverVersion('580.105.08')), hash(DriverVersion('580.105.8')))
+        self.assertNotEqual(DriverVersion('550.54'), DriverVersion('550.54.0'))
+        self.assertNotEqual(DriverVersion('550.54.14'), '550.54.14')
+    
+    def test_original_text_round_trips(self):
+        version = DriverVersion(' 580.105.08\n')
+        self.assertEqual(str(version), '580.105.08')
+        self.assertEqual(version.key, (580, 105, 8))
+        self.assertEqual(version.major, 580)
+        self.assertEqual(repr(version), "DriverVersion('580.105.08')")
+    
+    def test_invalid_text_raises(self):
+        for text in ('', 'abc', '550.', '.550', '550..54', '550.54-beta', 'v550.54.14', '550 54'):
+            with self.subTest(text=text):
+                with self.assertRaises(InvalidVersionError):
+                    DriverVersion(text)
+                with self.assertRaises(InvalidVersionError):
+                    parse_version(text)
+    
+    def test_non_strings_raise(self):
+        for value in (None, 550, 550.54, ['550', '54'], b'550.54.14'):
+            with self.subTest(value=value):
+                with self.assertRaises(InvalidVersionError):
+                    parse_version(value)
+                with self.assertRaises(InvalidVersionError):
+                    version_key(value)
+    
+    def test_invalid_version_error_is_a_value_error(self):
+        self.assertTrue(issubclass(InvalidVersionError, ValueError))
+    
+    def test_parse_is_memoized(self):
+        self.assertIs(parse_version('550.54.14'), parse_version('550.54.14'))
+
+
+class VersionHelpersTest(unittest.TestCase):
+    
+    def test_sort_versions(self):
+        self.assertEqual(
+            sort_versions(['550.100', '535.216.01', '550.54.14', '570.86.10', '550.54']),
+            ['535.216.01', '550.54', '550.54.14', '550.100', '570.86.10'],
+        )
+    
+    def test_max_version(self):
+        self.assertEqual(max_version(['550.54.14', '550.100', '535.216.01']), '550.100')
+        self.assertEqual(max_version(iter(['580.105.08'])), '580.105.08')
+    
+    def test_empty_input(self):
+        self.assertEqual(sort_versions([]), [])
+        self.assertIsNone(max_version([]))
+    
+    def test_bad_input_raises(self):
+        with self.assertRaises(InvalidVersionError):
+            sort_versions(['550.54.14', 'latest'])
+        with self.assertRaises(InvalidVersionError):
+            max_version(['550.54.14', None])
+
+
+class CompareVersionsTest(TempDirTestCase):
+    
+    def setUp(self):
+        super().setUp()
+        self.checker = NvidiaDriverCheck(cache_dir=os.path.join(self.tmp, 'cache'), arch='x86_64')
+    
+    def test_comparison(self):
+        self.assertEqual(self.checker.compare_versions('550.54.14', '550.100'), 1)
+        self.assertEqual(self.checker.compare_versions('550.100', '550.54.14'), -1)
+        self.assertEqual(self.checker.compare_versions('580.105.08', '580.105.8'), 0)
+    
+    def test_bad_input_raises_instead_of_comparing_equal(self):
+        with self.assertRaises(InvalidVersionError):
+            self.checker.compare_versions('550.54.14', 'unknown')
+        with self.assertRaises(InvalidVersionError):
+            self.checker.compare_versions(None, '550.54.14')
+
+
+if __name__ == '__main__':
+    unittest.main()